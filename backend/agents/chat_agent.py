@@ -1,6 +1,5 @@
 from langchain_groq import ChatGroq
 from langchain.schema import HumanMessage, AIMessage
-from langchain.memory import ConversationBufferMemory
 from langchain.prompts import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
@@ -8,24 +7,43 @@ from langchain.prompts import (
     PromptTemplate
 )
 import os
+import re
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from dotenv import load_dotenv
+from agents.session_store import session_store_from_env
+from agents.history import history_manager_from_env
+from models.llm_cache import cached_invoke
+from models.fake_llm import FakeChatModel, FakeResponder, fake_llm_enabled
+from utils.metrics import llm_duration, llm_prompt_chars, llm_completion_chars, track_llm
 
 load_dotenv()
 
 
 # --- LLM Setup ---
-llm = ChatGroq(
-    groq_api_key=os.getenv("GROQ_API_KEY"),
-    
-    model="meta-llama/llama-4-maverick-17b-128e-instruct",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-)
+if fake_llm_enabled():
+    # Offline benchmarks and load tests
+    llm = FakeChatModel(FakeResponder.from_env())
+else:
+    llm = ChatGroq(
+        groq_api_key=os.getenv("GROQ_API_KEY"),
+
+        model="meta-llama/llama-4-maverick-17b-128e-instruct",
+        temperature=0,
+        max_tokens=None,
+        timeout=None,
+        max_retries=2,
+    )
 
 # --- Memory Setup ---
-memory = ConversationBufferMemory(return_messages=True)
+# One bounded conversation per session id; see agents/session_store.py
+# Messages are trimmed only after `history` has folded them into the session summary
+sessions = session_store_from_env(keep_unfolded=True)
+DEFAULT_SESSION = "default"
 
 # --- Prompt Template Setup ---
 system_template = (
@@ -56,26 +74,88 @@ standalone_question_prompt = PromptTemplate(
     )
 )
 
-def get_chat_history_as_text():
-    """Converts memory's chat history to a plain text format for the prompt."""
-    history = memory.chat_memory.messages
-    lines = []
-    for msg in history:
-        if isinstance(msg, HumanMessage):
-            lines.append(f"User: {msg.content}")
-        elif isinstance(msg, AIMessage):
-            lines.append(f"Assistant: {msg.content}")
-    return "\n".join(lines)
-
-def rephrase_to_standalone(user_input: str) -> str:
+# --- Rolling summary of older turns ---
+summary_prompt = PromptTemplate(
+    input_variables=["summary", "new_lines"],
+    template=(
+        "Progressively summarize the conversation, adding onto the previous summary "
+        "and returning a new summary. Keep names, file names, code identifiers and decisions.\n\n"
+        "Current summary:\n{summary}\n\n"
+        "New lines of conversation:\n{new_lines}\n\n"
+        "New summary:"
+    )
+)
+
+def summarize_history(summary: str, new_lines: str) -> str:
+    prompt = summary_prompt.format(summary=summary or "(empty)", new_lines=new_lines)
+    return track_llm("summarize_history", llm.model_name, prompt, lambda: llm.invoke(prompt).content).strip()
+
+history = history_manager_from_env(sessions, summarize_history)
+
+def get_chat_history_as_text(session_id: str = DEFAULT_SESSION):
+    """Converts the session's (compacted) chat history to a plain text format for the prompt."""
+    return history.window_as_text(session_id)
+
+def rephrase_to_standalone(user_input: str, session_id: str = DEFAULT_SESSION) -> str:
     """Rephrases a follow-up question into a standalone question using chat history."""
-    chat_history = get_chat_history_as_text()
+    chat_history = get_chat_history_as_text(session_id)
     prompt = standalone_question_prompt.format(
         chat_history=chat_history,
         input=user_input
     )
-    response = llm.invoke(prompt)
-    return response.content.strip()
+    return cached_invoke(llm, prompt).strip()
+
+# --- Local intent pre-classifier ---
+_ACTION_VERBS = r"(create|write|make|build|add|implement|generate|refactor|fix|rename|delete|remove|update|modify|change|edit|rewrite|scaffold|set up|setup)"
+# A file name with an extension (app.py, src/App.jsx) or a path with a slash (src/components/)
+_FILE_OR_PATH = r"([\w\-./]*\w\w\.[A-Za-z][A-Za-z0-9]{0,4}\b|[\w\-.]+/[\w\-./]*)"
+_IMPERATIVE_ACTION = re.compile(
+    rf"^\s*(please\s+)?((can|could|would|will)\s+you\s+(please\s+)?)?{_ACTION_VERBS}\b.*?(?<![\w.]){_FILE_OR_PATH}",
+    re.IGNORECASE | re.DOTALL,
+)
+_SMALL_TALK = re.compile(
+    r"^\s*(hi|hello|hey|thanks|thank you|thx|ok|okay|cool|great|bye|good (morning|afternoon|evening))"
+    r"(\s+(there|so much|a lot))?[\s!.?]*$",
+    re.IGNORECASE,
+)
+
+_intent_cache: "OrderedDict[str, bool]" = OrderedDict()
+_INTENT_CACHE_SIZE = 256
+_intent_lock = threading.Lock()
+
+def _intent_key(user_message: str) -> str:
+    return " ".join(user_message.lower().split())
+
+def local_intent(user_message: str) -> Optional[bool]:
+    """
+    Answers obvious cases without an LLM call: an imperative action verb with
+    a file name or path is a code action, a bare greeting or thanks is not.
+    Everything else (None) is left to the LLM.
+    """
+    key = _intent_key(user_message)
+    with _intent_lock:
+        if key in _intent_cache:
+            _intent_cache.move_to_end(key)
+            return _intent_cache[key]
+    if _IMPERATIVE_ACTION.search(user_message):
+        return True
+    if _SMALL_TALK.search(user_message):
+        return False
+    return None
+
+def _remember_intent(user_message: str, decision: bool):
+    with _intent_lock:
+        _intent_cache[_intent_key(user_message)] = decision
+        _intent_cache.move_to_end(_intent_key(user_message))
+        while len(_intent_cache) > _INTENT_CACHE_SIZE:
+            _intent_cache.popitem(last=False)
+
+def classify_intent(user_message: str) -> bool:
+    decision = local_intent(user_message)
+    if decision is None:
+        decision = is_code_action_request(user_message)
+        _remember_intent(user_message, decision)
+    return decision
 
 def is_code_action_request(user_message: str) -> bool:
     # Use the LLM to classify intent
@@ -85,39 +165,97 @@ def is_code_action_request(user_message: str) -> bool:
         f"User message: {user_message}\n"
         "Is this a code action request?"
     )
-    response = llm.invoke(intent_prompt)
-    return response.content.strip().lower().startswith("yes")
+    response = cached_invoke(llm, intent_prompt)
+    return response.strip().lower().startswith("yes")
 
-# --- Chat Function with Memory and Standalone Question Rephrasing ---
-def chat_with_memory(user_message: str, custom_instructions: str = "", rephrase: bool = False):
-    # Optionally rephrase the user message to a standalone question
-    if rephrase and memory.chat_memory.messages:
-        user_message = rephrase_to_standalone(user_message)
-
-    # Build the prompt for this turn
+def build_chat_messages(user_message: str, custom_instructions: str = "", session_id: str = DEFAULT_SESSION):
+    """History plus the prompt for this turn, in the order sent to the LLM."""
     messages = chat_prompt.format_messages(
         custom_instructions=custom_instructions,
         user_input=user_message
     )
-    # Add previous conversation history (excluding the current user message)
-    history = memory.chat_memory.messages
-    # Combine history and current prompt
-    full_messages = history + messages
+    # Add previous conversation history (summary + recent turns, excluding the current user message)
+    return history.window(session_id) + messages
+
+def remember_turn(user_message: str, reply: str, session_id: str = DEFAULT_SESSION):
+    sessions.append(session_id, HumanMessage(content=user_message), AIMessage(content=reply))
+    history.schedule_compaction(session_id)
+
+def reset_session(session_id: str = DEFAULT_SESSION):
+    sessions.reset(session_id)
+
+def generate_reply(user_message: str, custom_instructions: str = "", rephrase: bool = False,
+                   session_id: str = DEFAULT_SESSION):
+    """Runs the chat LLM for this turn without touching memory. Returns (user_message, reply)."""
+    # Optionally rephrase the user message to a standalone question
+    if rephrase and sessions.get(session_id).messages:
+        user_message = rephrase_to_standalone(user_message, session_id)
+
+    full_messages = build_chat_messages(user_message, custom_instructions, session_id)
 
     # Get LLM response
-    response = llm.invoke(full_messages)
+    reply = track_llm("generate_reply", llm.model_name, full_messages, lambda: llm.invoke(full_messages).content)
+    return user_message, reply
+
+# --- Chat Function with Memory and Standalone Question Rephrasing ---
+def chat_with_memory(user_message: str, custom_instructions: str = "", rephrase: bool = False,
+                     session_id: str = DEFAULT_SESSION):
+    user_message, reply = generate_reply(user_message, custom_instructions, rephrase, session_id)
     # Update memory with user and AI messages
-    memory.chat_memory.add_message(HumanMessage(content=user_message))
-    memory.chat_memory.add_message(AIMessage(content=response.content))
-    return response.content
-
-def chat_with_memory_with_confirmation(user_message: str, custom_instructions: str = "", rephrase: bool = False):
-    response = chat_with_memory(user_message, custom_instructions, rephrase)
-    if is_code_action_request(user_message):
-        return {
-            "reply": f"Do you want me to execute this task: \"{user_message}\"?",
-            "task": user_message,
-            "show_execute_button": True
-        }
-    return {"reply": response}
+    remember_turn(user_message, reply, session_id)
+    return reply
+
+# --- Streaming variant: yields tokens as the model emits them ---
+async def astream_chat_with_memory(user_message: str, custom_instructions: str = "", rephrase: bool = False,
+                                   session_id: str = DEFAULT_SESSION, remember: bool = True):
+    if rephrase and sessions.get(session_id).messages:
+        user_message = await asyncio.to_thread(rephrase_to_standalone, user_message, session_id)
+
+    full_messages = build_chat_messages(user_message, custom_instructions, session_id)
+
+    parts = []
+    start, outcome = time.perf_counter(), "error"
+    try:
+        async for chunk in llm.astream(full_messages):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+        outcome = "ok"
+    finally:
+        llm_duration.observe(time.perf_counter() - start, site="astream_chat", model=llm.model_name, outcome=outcome)
+        llm_prompt_chars.inc(len(str(full_messages)), site="astream_chat")
+        llm_completion_chars.inc(sum(map(len, parts)), site="astream_chat")
+    # Memory is only updated once the whole reply has been streamed; callers that
+    # may answer with something else pass remember=False and record the turn themselves
+    if remember:
+        remember_turn(user_message, "".join(parts), session_id)
+
+def confirmation_reply(user_message: str) -> dict:
+    return {
+        "reply": f"Do you want me to execute this task: \"{user_message}\"?",
+        "task": user_message,
+        "show_execute_button": True
+    }
+
+_chat_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="chat")
+
+def chat_with_memory_with_confirmation(user_message: str, custom_instructions: str = "", rephrase: bool = False,
+                                       session_id: str = DEFAULT_SESSION):
+    decision = local_intent(user_message)
+    if decision is False:
+        return {"reply": chat_with_memory(user_message, custom_instructions, rephrase, session_id)}
+    if decision is True:
+        confirmation = confirmation_reply(user_message)
+        remember_turn(user_message, confirmation["reply"], session_id)
+        return confirmation
 
+    # Ambiguous: classify and draft the reply concurrently, keep whichever is needed.
+    reply_future = _chat_pool.submit(generate_reply, user_message, custom_instructions, rephrase, session_id)
+    if classify_intent(user_message):
+        reply_future.cancel()
+        confirmation = confirmation_reply(user_message)
+        remember_turn(user_message, confirmation["reply"], session_id)
+        return confirmation
+    user_message_used, reply = reply_future.result()
+    remember_turn(user_message_used, reply, session_id)
+    return {"reply": reply}
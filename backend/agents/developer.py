@@ -1,18 +1,18 @@
 import logging
 import re
-import ast
+import os
 import json
-from typing import List, Optional, TypedDict
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, TypedDict
 from langgraph.graph import StateGraph, END
 from pydantic import BaseModel, Field
-from utils.file_ops import (
-    write_code_file,
-    read_code_file,
-    delete_code_file,
-    apply_change,
-    list_code_files
-)
-from models.groq_llm import chat  # your LLM wrapper
+from utils.workspace import WorkspaceOverlay
+from utils.code_index import code_index, context_budget
+from utils.patching import PatchError, apply_search_replace, parse_search_replace
+from utils.run_events import emit, node_events
+from utils.tracing import span
+from models.groq_llm import chat, MODEL_NAME  # your LLM wrapper
 
 # --- Logging setup ---
 logging.basicConfig(level=logging.INFO)
@@ -27,46 +27,26 @@ class ToolStep(BaseModel):
 # --- Developer state ---
 class DevState(TypedDict, total=False):
     steps: List[ToolStep]
-    current_step: Optional[ToolStep]
     logs: List[str]
+    workspace: WorkspaceOverlay
 
-# --- Step: Pick next step ---
-def pick_next_step(state: DevState) -> DevState:
-    logger.info("[Dev] Picking next step")
-    if not state.get("steps"):
-        return {"current_step": None}
-    step = state["steps"].pop(0)
-    logger.info(f"[Dev] Picked step: {step}")
-    return {"current_step": step}
-
-# --- Step: Validate/fix step via LLM ---
-def validate_step_with_llm(state: DevState) -> DevState:
-    step = state["current_step"]
-    codebase_files = list_code_files()
-    codebase_summary = ""
-    for f in codebase_files:
-        try:
-            code = "".join(read_code_file(f))
-            codebase_summary += f"\n---\nFilename: {f}\n{code}"
-        except:
-            continue
-
-    prompt = f"""
+# --- Validator prompt ---
+TOOLS_DESCRIPTION = """
 You are a code step validator helping an AI developer execute file operations on a local codebase.
 
 Only use one of these tools:
 
 1. **write**
    - Purpose: Create or overwrite an entire file.
-   - Args: {{ "content": "<full file contents>" }}
+   - Args: { "content": "<full file contents>" }
 
 2. **read**
    - Purpose: Read a file and return its line count.
-   - Args: {{}}
+   - Args: {}
 
 3. **delete**
    - Purpose: Remove a file.
-   - Args: {{}}
+   - Args: {}
 
 4. **apply_change**
    - Purpose: Insert, modify, or delete a specific line in an existing file.
@@ -76,22 +56,56 @@ Only use one of these tools:
      - new_code: required if action is "insert" or "modify"
 
 5. **llm_modify**
-   - Reserved for LLM-powered auto-edits (not implemented yet).
-   - Args: {{}}
-
-Given the codebase context and a proposed ToolStep (file, tool, args), correct and return the step.
-
-Only return the corrected ToolStep as a **pure JSON object** (no comments, no Markdown, no Python dicts):
+   - Purpose: Let the LLM edit an existing file from a natural-language instruction (preferred over
+     rewriting a whole file with "write" for small changes to large files).
+   - Args: { "instruction": "<what to change in the file>" }
+"""
 
-{{
+STEP_EXAMPLE = """{
   "file": "example.py",
   "tool": "apply_change",
-  "args": {{
+  "args": {
     "action": "modify",
     "line": 4,
     "new_code": "print('Updated')"
-  }}
-}}
+  }
+}"""
+
+# Validate the whole plan in chunks of this many steps per LLM call (0 = one call per step)
+BATCH_VALIDATION_SIZE = int(os.getenv("DEV_VALIDATION_BATCH_SIZE", "20"))
+# Independent per-file chains (and validation calls) run concurrently, at most this many at a time
+MAX_PARALLEL_CHAINS = int(os.getenv("DEV_MAX_PARALLEL", "4"))
+
+def _strip_fences(response: str) -> str:
+    return re.sub(r"^```[a-zA-Z]*\n?", "", response).replace("```", "").strip()
+
+def overlay_contents(files: List[str], workspace: Optional[WorkspaceOverlay]) -> Dict[str, Optional[str]]:
+    """Current contents of the files this run has already changed (None = deleted); disk is stale for them."""
+    if workspace is None:
+        return {}
+    contents = {}
+    for name in files:
+        if workspace.touched(name):
+            try:
+                contents[os.path.normpath(name)] = "".join(workspace.read_lines(name))
+            except FileNotFoundError:
+                contents[os.path.normpath(name)] = None
+    return contents
+
+def validate_step(step: ToolStep, workspace: Optional[WorkspaceOverlay] = None) -> ToolStep:
+    """Ask the LLM to correct a single step; falls back to the original step."""
+    # The step's target file in full (as this run left it) plus its most relevant neighbours
+    codebase_summary = code_index.render_context(
+        f"{step.file} {json.dumps(step.args)}", context_budget(MODEL_NAME), include_files=[step.file],
+        overrides=overlay_contents([step.file], workspace),
+    )
+
+    prompt = f"""{TOOLS_DESCRIPTION}
+Given the codebase context and a proposed ToolStep (file, tool, args), correct and return the step.
+
+Only return the corrected ToolStep as a **pure JSON object** (no comments, no Markdown, no Python dicts):
+
+{STEP_EXAMPLE}
 
 Here is the codebase context:
 {codebase_summary}
@@ -100,97 +114,267 @@ Planned step:
 {step.model_dump()}
 """
 
-    response = chat(prompt)
+    response = chat(prompt, temperature=0)
     logger.info(f"LLM response for steps: {response}")
 
-    clean = re.sub(r"^```[a-zA-Z]*\n?", "", response).replace("```", "").strip()
-
     try:
-        corrected = json.loads(clean)
-        return {"current_step": ToolStep(**corrected)}
+        corrected = json.loads(_strip_fences(response))
+        return ToolStep(**corrected)
     except Exception as e:
         logger.warning(f"[Dev] Failed to parse corrected step, using original. Error: {e}")
-        return {"current_step": step}  # fallback
+        return step  # fallback
+
+def validate_step_batch(steps: List[ToolStep], workspace: Optional[WorkspaceOverlay] = None) -> List[ToolStep]:
+    """
+    Correct a list of steps with a single LLM call. Steps whose corrected
+    form is missing or fails to parse are validated one by one instead.
+    """
+    files = list(dict.fromkeys(step.file for step in steps))
+    codebase_summary = code_index.render_context(
+        " ".join(f"{step.file} {json.dumps(step.args)}" for step in steps),
+        context_budget(MODEL_NAME),
+        include_files=files,
+        overrides=overlay_contents(files, workspace),
+    )
+    planned = json.dumps([step.model_dump() for step in steps], indent=2)
+
+    prompt = f"""{TOOLS_DESCRIPTION}
+Given the codebase context and a list of {len(steps)} proposed ToolSteps (file, tool, args), correct every step.
+Keep the steps in the same order and return exactly {len(steps)} of them. Consecutive apply_change steps on a file
+are applied together, so their line numbers must all refer to the file as it was before those edits.
+
+Only return the corrected steps as a **pure JSON array** of objects like this one (no comments, no Markdown, no Python dicts):
+
+{STEP_EXAMPLE}
+
+Here is the codebase context:
+{codebase_summary}
+
+Planned steps:
+{planned}
+"""
+
+    response = chat(prompt, temperature=0)
+    logger.info(f"[Dev] Batch-validated {len(steps)} steps")
 
-# --- Step: Run the tool ---
-def run_code_update(state: DevState) -> DevState:
-    step = state["current_step"]
     try:
-        log = perform_tool_action(step)
+        corrected = json.loads(_strip_fences(response))
+        if not isinstance(corrected, list) or len(corrected) != len(steps):
+            raise ValueError(f"expected a list of {len(steps)} steps")
+    except Exception as e:
+        logger.warning(f"[Dev] Failed to parse batch validation, validating steps one by one. Error: {e}")
+        return [validate_step(step, workspace) for step in steps]
+
+    validated = []
+    for original, item in zip(steps, corrected):
+        try:
+            validated.append(ToolStep(**item))
+        except Exception as e:
+            logger.warning(f"[Dev] Failed to parse corrected step {original.file}, validating it alone. Error: {e}")
+            validated.append(validate_step(original, workspace))
+    return validated
+
+# --- Step: Validate the whole plan up front ---
+@node_events
+def validate_all_steps(state: DevState) -> DevState:
+    # Steps are validated before they are grouped into per-file chains, since
+    # the validator may move a step to another file
+    steps = state.get("steps", [])
+    workspace = state.get("workspace")
+    if BATCH_VALIDATION_SIZE > 0:
+        chunks = [steps[i:i + BATCH_VALIDATION_SIZE] for i in range(0, len(steps), BATCH_VALIDATION_SIZE)]
+        validate = validate_step_batch
+    else:
+        chunks = [[step] for step in steps]
+        validate = lambda chunk, ws: [validate_step(chunk[0], ws)]
+    # Chunks are not independent (a later step may use a file an earlier one creates),
+    # but no step has run yet, so every chunk sees the same codebase either way and
+    # validating them concurrently loses nothing over doing it in order
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_PARALLEL_CHAINS, len(chunks)))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, validate, chunk, workspace) for chunk in chunks]
+        validated = [step for future in futures for step in future.result()]
+    return {"steps": validated}
+
+# --- Step execution ---
+def build_step_chains(steps: List[ToolStep]) -> List[List[Tuple[int, ToolStep]]]:
+    """Group steps by target file, keeping plan order within each file (chains ordered by first step)."""
+    chains: Dict[str, List[Tuple[int, ToolStep]]] = {}
+    for index, step in enumerate(steps):
+        chains.setdefault(os.path.normpath(step.file), []).append((index, step))
+    return list(chains.values())
+
+def run_step(index: int, step: ToolStep, workspace: WorkspaceOverlay) -> str:
+    try:
+        with span(step.tool, "step", file=step.file, index=index):
+            log = perform_tool_action(step, workspace)
     except Exception as e:
         log = f"[ERROR] {step.tool} on {step.file} failed: {e}"
-    updated_logs = state.get("logs", []) + [log]
     logger.info(f"[Dev] Log: {log}")
-    return {"logs": updated_logs}
+    emit("log", index=index, message=log, file=step.file, tool=step.tool)
+    return log
+
+def run_edit_group(group: List[Tuple[int, ToolStep]], workspace: WorkspaceOverlay) -> List[Tuple[int, str]]:
+    """Apply consecutive apply_change steps on one file as a single buffered edit."""
+    file = group[0][1].file
+    try:
+        workspace.apply_changes(file, [
+            {"action": step.args["action"], "line": step.args["line"], "new_code": step.args.get("new_code", "")}
+            for _, step in group
+        ])
+        logs = [(i, f"[CHANGE] {step.args['action']} at line {step.args['line']} in {file}") for i, step in group]
+    except Exception as e:
+        logs = [(i, f"[ERROR] {step.tool} on {step.file} failed: {e}") for i, step in group]
+    for index, log in logs:
+        logger.info(f"[Dev] Log: {log}")
+        emit("log", index=index, message=log, file=file, tool="apply_change")
+    return logs
+
+def run_chain(chain: List[Tuple[int, ToolStep]], workspace: WorkspaceOverlay) -> List[Tuple[int, str]]:
+    logs = []
+    edits: List[Tuple[int, ToolStep]] = []
+    for index, step in chain:
+        if step.tool == "apply_change":
+            # Buffered until the run of line edits ends; they all use the same line numbering
+            edits.append((index, step))
+            continue
+        if edits:
+            logs.extend(run_edit_group(edits, workspace))
+            edits = []
+        logs.append((index, run_step(index, step, workspace)))
+        logger.info(f"[Dev] Step completed: {step.tool} on {step.file}")
+    if edits:
+        logs.extend(run_edit_group(edits, workspace))
+    return logs
+
+@node_events
+def execute_steps(state: DevState) -> DevState:
+    chains = build_step_chains(state.get("steps", []))
+    logger.info(f"[Dev] Executing {len(state.get('steps', []))} steps in {len(chains)} independent chains")
+    workspace = state["workspace"]
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_PARALLEL_CHAINS, len(chains)))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, run_chain, chain, workspace) for chain in chains]
+        results = [entry for future in futures for entry in future.result()]
+    # Logs come back in plan order regardless of which chain finished first
+    return {"logs": state.get("logs", []) + [log for _, log in sorted(results)]}
+
+# --- llm_modify: diff-based edits ---
+def llm_modify(file: str, instruction: str, workspace: WorkspaceOverlay) -> str:
+    """
+    Ask the LLM for SEARCH/REPLACE hunks against the current file and apply
+    them locally, so output tokens scale with the size of the change rather
+    than the size of the file. Falls back to a full rewrite if they don't apply.
+    """
+    try:
+        current = "".join(workspace.read_lines(file))
+    except FileNotFoundError:
+        current = ""
+
+    if current:
+        prompt = f"""You are editing the file {file}. Apply this change: {instruction}
+
+Reply ONLY with one or more edit blocks in exactly this format, no explanations:
 
-# --- Step: Feedback/logging ---
-def log_and_feedback(state: DevState) -> DevState:
-    step = state["current_step"]
-    logger.info(f"[Dev] Step completed: {step.tool} on {step.file}")
-    return {}
+<<<<<<< SEARCH
+<exact lines copied from the current file>
+=======
+<the lines that replace them>
+>>>>>>> REPLACE
+
+Keep each SEARCH section short but unique in the file. To add code at the end of the file use an empty SEARCH section.
+
+Current contents of {file}:
+{current}
+"""
+        response = chat(prompt, temperature=0)
+        hunks = parse_search_replace(response)
+        if hunks:
+            try:
+                workspace.write_lines(file, apply_search_replace(current, hunks).splitlines(keepends=True))
+                return f"[LLM_MODIFY] {file}: applied {len(hunks)} hunk(s)"
+            except PatchError as e:
+                logger.warning(f"[Dev] llm_modify hunks did not apply to {file}, rewriting the file. Error: {e}")
+        else:
+            logger.warning(f"[Dev] llm_modify got no edit blocks for {file}, rewriting the file")
+
+    prompt = f"""You are editing the file {file}. Apply this change: {instruction}
+
+Reply ONLY with the complete new contents of the file, no explanations, no Markdown.
+
+Current contents of {file}:
+{current or "(the file is empty or does not exist yet)"}
+"""
+    content = _strip_fences(chat(prompt, temperature=0))
+    workspace.write_lines(file, (content + "\n").splitlines(keepends=True))
+    return f"[LLM_MODIFY] {file}: rewrote file"
 
 # --- Tool dispatcher ---
-def perform_tool_action(step: ToolStep) -> str:
+def perform_tool_action(step: ToolStep, workspace: WorkspaceOverlay) -> str:
+    # All file I/O goes through the run's overlay; nothing touches disk until it is committed
     tool = step.tool
     file = step.file
     args = step.args
 
     if tool == "write":
         content = args.get("content", "")
-        write_code_file(file, content.splitlines(keepends=True))
+        workspace.write_lines(file, content.splitlines(keepends=True))
         return f"[WRITE] {file} written"
 
     elif tool == "read":
-        lines = read_code_file(file)
+        lines = workspace.read_lines(file)
         return f"[READ] {file} has {len(lines)} lines"
 
     elif tool == "delete":
-        delete_code_file(file)
+        workspace.delete(file)
         return f"[DELETE] {file} removed"
 
     elif tool == "apply_change":
-        apply_change(
-            filename=file,
-            action=args["action"],
-            line=args["line"],
-            new_code=args.get("new_code", "")
-        )
+        workspace.apply_changes(file, [
+            {"action": args["action"], "line": args["line"], "new_code": args.get("new_code", "")}
+        ])
         return f"[CHANGE] {args['action']} at line {args['line']} in {file}"
 
     elif tool == "llm_modify":
-        return f"[LLM_MODIFY] Skipped: not implemented yet"
+        return llm_modify(file, args.get("instruction") or args.get("description") or json.dumps(args), workspace)
 
     else:
         raise ValueError(f"Unsupported tool: {tool}")
 
-# --- Loop condition ---
-def has_more_steps(state: DevState) -> str:
-    return "yes" if state.get("steps") else "no"
-
 # --- LangGraph: Build Developer Subgraph ---
 dev_builder = StateGraph(DevState)
 
-dev_builder.add_node("pick_next_step", pick_next_step)
-dev_builder.add_node("validate_step_with_llm", validate_step_with_llm)
-dev_builder.add_node("run_code_update", run_code_update)
-dev_builder.add_node("log_and_feedback", log_and_feedback)
+dev_builder.add_node("validate_all_steps", validate_all_steps)
+dev_builder.add_node("execute_steps", execute_steps)
 
-dev_builder.set_entry_point("pick_next_step")
-dev_builder.add_edge("pick_next_step", "validate_step_with_llm")
-dev_builder.add_edge("validate_step_with_llm", "run_code_update")
-dev_builder.add_edge("run_code_update", "log_and_feedback")
-dev_builder.add_conditional_edges("log_and_feedback", has_more_steps, {
-    "yes": "pick_next_step",
-    "no": END
-})
+dev_builder.set_entry_point("validate_all_steps")
+dev_builder.add_edge("validate_all_steps", "execute_steps")
+dev_builder.add_edge("execute_steps", END)
 
 developer_graph = dev_builder.compile()
 
 # --- Runner ---
-def run_developer_subgraph(steps: List[dict]) -> List[str]:
+def run_developer_subgraph(steps: List[dict], workspace: Optional[WorkspaceOverlay] = None) -> List[str]:
+    """
+    Run the steps against a workspace overlay. With no overlay given, one is
+    created and committed at the end, or discarded if any step failed; a
+    caller-supplied overlay is left pending for the caller to commit.
+    """
+    owned = workspace is None
+    workspace = workspace or WorkspaceOverlay()
     parsed = [ToolStep(**step) for step in steps]
-    result = developer_graph.invoke({"steps": parsed})
-    return result.get("logs", [])
+    try:
+        result = developer_graph.invoke({"steps": parsed, "workspace": workspace})
+    except Exception:
+        if owned:
+            workspace.discard()
+        raise
+    logs = result.get("logs", [])
+    if owned:
+        if any(log.startswith("[ERROR]") for log in logs):
+            logger.warning("[Dev] Some steps failed, discarding the run's changes")
+            workspace.discard()
+        else:
+            workspace.commit()
+    return logs
 
 # --- Local Test ---
 if __name__ == "__main__":
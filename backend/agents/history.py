@@ -0,0 +1,123 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+from langchain.schema import HumanMessage, AIMessage, SystemMessage, BaseMessage
+from agents.session_store import ChatSession, SessionStore
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); good enough for budgeting prompts."""
+    return len(text) // 4 + 1
+
+
+def messages_as_text(messages: List[BaseMessage]) -> str:
+    lines = []
+    for msg in messages:
+        if isinstance(msg, HumanMessage):
+            lines.append(f"User: {msg.content}")
+        elif isinstance(msg, AIMessage):
+            lines.append(f"Assistant: {msg.content}")
+    return "\n".join(lines)
+
+
+# --- History manager ---
+class HistoryManager:
+    """
+    Builds the history sent with each chat prompt.
+
+    The newest `max_turns` turns are kept verbatim as long as they fit in
+    `token_budget`; everything older is represented by a rolling summary.
+    Folding turns into the summary happens on a background thread after the
+    reply has been sent, so the request path never waits on it. Until a
+    message has been folded it stays in the window, even past the limits.
+    """
+
+    def __init__(self, store: SessionStore, summarize: Callable[[str, str], str],
+                 max_turns: int = 6, token_budget: int = 2000):
+        self.store = store
+        self.summarize = summarize
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _unfolded(self, session: ChatSession) -> List[BaseMessage]:
+        return session.messages[max(0, session.folded - session.offset):]
+
+    def _recent(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """Newest messages that fit both the turn limit and the token budget."""
+        budget = self.token_budget
+        recent = []
+        for msg in reversed(messages[-self.max_turns * 2:]):
+            budget -= estimate_tokens(msg.content)
+            if budget < 0 and recent:
+                break
+            recent.append(msg)
+        recent.reverse()
+        return recent
+
+    def window(self, session_id: str) -> List[BaseMessage]:
+        """Summary (as a system message) followed by every message it does not cover yet."""
+        session = self.store.get(session_id)
+        with session.lock:
+            recent = self._unfolded(session)
+            summary = session.summary
+        if summary:
+            return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] + recent
+        return recent
+
+    def window_as_text(self, session_id: str) -> str:
+        session = self.store.get(session_id)
+        with session.lock:
+            recent = self._unfolded(session)
+            summary = session.summary
+        text = messages_as_text(recent)
+        if summary:
+            return f"Summary of the earlier conversation: {summary}\n{text}"
+        return text
+
+    def schedule_compaction(self, session_id: str):
+        """Fold turns that fell out of the verbatim window into the summary, off the request path."""
+        with self._lock:
+            if session_id in self._pending:
+                return
+            self._pending.add(session_id)
+        self._executor.submit(self._compact, session_id)
+
+    def _compact(self, session_id: str):
+        try:
+            session = self.store.get(session_id)
+            with session.lock:
+                unfolded = self._unfolded(session)
+                older = unfolded[:len(unfolded) - len(self._recent(unfolded))]
+                start = max(session.folded, session.offset)
+                summary = session.summary
+            if not older:
+                return
+            updated = self.summarize(summary, messages_as_text(older))
+            with session.lock:
+                if session.folded > start:
+                    return  # someone else folded in the meantime
+                session.summary = updated
+                session.folded = start + len(older)
+            self.store.save_summary(session)
+            logger.debug(f"[History] Folded {len(older)} messages of session {session_id} into its summary")
+        except Exception as e:
+            logger.warning(f"[History] Compaction failed for session {session_id}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(session_id)
+
+
+def history_manager_from_env(store: SessionStore, summarize: Callable[[str, str], str]) -> HistoryManager:
+    return HistoryManager(
+        store,
+        summarize,
+        max_turns=int(os.getenv("CHAT_HISTORY_TURNS", "6")),
+        token_budget=int(os.getenv("CHAT_HISTORY_TOKENS", "2000")),
+    )
@@ -2,15 +2,16 @@ import re
 import ast
 import json
 import argparse
-import requests
 import logging
 import os
-from typing import List, Optional, TypedDict
+from typing import List, TypedDict
 from pydantic import BaseModel, Field, ValidationError
-from models.groq_llm import chat
-from utils.file_ops import list_code_files, read_code_file
+from models.groq_llm import chat, MODEL_NAME
+from utils.codebase_snapshot import codebase_snapshot
+from utils.code_index import code_index, context_budget
+from utils.run_events import emit, node_events
+from utils.search_client import search_client, split_queries
 from langgraph.graph import StateGraph, END
-import time
 import os
 from dotenv import load_dotenv
 
@@ -22,33 +23,12 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # --- Tavily search helper ---
-def tavily_search(query: str, max_results: int = 5, retries: int = 3) -> list:
-    api_key = os.getenv("TAVILY_API_KEY")
-    
-    url = "https://api.tavily.com/search"
-    payload = {
-        "api_key": api_key,
-        "query": query,
-        "search_depth": "basic",
-        "include_answer": True,
-        "include_images": False,
-        "max_results": max_results
-    }
-    for attempt in range(retries):
-        try:
-            resp = requests.post(url, json=payload, timeout=30)
-            resp.raise_for_status()
-            data = resp.json()
-            logger.info(f"Tavily response: {data}")
-            logger.info(f"Tavily returned {len(data.get('results', []))} results.")
-            return data.get("results", [])
-        except requests.exceptions.Timeout:
-            logger.warning(f"Tavily timeout, retrying ({attempt+1}/{retries})...")
-            time.sleep(2)
-        except Exception as e:
-            logger.error(f"Tavily error: {e}")
-            break
-    return []
+def tavily_search(query: str, max_results: int = 5) -> list:
+    # The query may be a comma-separated list; each one is searched concurrently
+    queries = split_queries(query)
+    results = search_client.search_many(queries, max_results)
+    logger.info(f"Tavily returned {len(results)} results for {len(queries)} queries.")
+    return results
 
 # --- ToolStep schema ---
 class ToolStep(BaseModel):
@@ -60,40 +40,44 @@ class ToolStep(BaseModel):
 class PlannerState(TypedDict, total=False):
     task: str
     codebase_summary: str
+    codebase_outline: str
     enhanced_task: str
     use_external: bool
     search_query: str
     external_results: List[dict]
     steps: List[ToolStep]
 
+# "outline" sends AST outlines to the cheap planner calls, "full" sends file bodies
+PLANNER_CONTEXT_MODE = os.getenv("PLANNER_CONTEXT_MODE", "outline").lower()
+
 # --- Node Functions ---
+@node_events
 def summarize_codebase(state: PlannerState) -> PlannerState:
     logger.info("[Node] summarize_codebase")
-    try:
-        files = list_code_files()
-    except Exception:
-        files = []
-    summary = []
-    for f in files:
-        try:
-            content = ''.join(read_code_file(f))
-            summary.append(f"---\nFilename: {f}\n{content}\n")
-        except Exception:
-            summary.append(f"---\nFilename: {f}\n[Unreadable]\n")
-    logger.info(f"Summarized {len(summary)} files.")
-    return {"codebase_summary": "".join(summary)}
+    # Whole codebase when it fits the model's budget, otherwise the files and
+    # functions most relevant to the task
+    summary = code_index.render_context(state["task"], context_budget(MODEL_NAME))
+    # enhance_prompt/decide_search_source only need the structure of the code
+    if PLANNER_CONTEXT_MODE == "outline":
+        outline = code_index.render_outline(state["task"], context_budget(MODEL_NAME))
+    else:
+        outline = summary
+    logger.info(f"Summarized {len(codebase_snapshot.files())} files.")
+    return {"codebase_summary": summary, "codebase_outline": outline}
 
+@node_events
 def enhance_prompt(state: PlannerState) -> PlannerState:
     logger.info("[Node] enhance_prompt")
     prompt = (
-        f"You are aware of the following codebase:\n{state['codebase_summary']}\n"
+        f"You are aware of the following codebase (structural outline):\n{state['codebase_outline']}\n"
         f"Enhance this task for clarity: {state['task']} Do not give any code just imrpove the task language"
         f"Just give the enhanced task nothing else no additional information"
     )
-    enhanced = chat(prompt)
+    enhanced = chat(prompt, temperature=0)
     logger.info(f"Enhanced task: {enhanced.strip()}")
     return {"enhanced_task": enhanced}
 
+@node_events
 def generate_search_query(state: PlannerState) -> PlannerState:
     logger.info("[Node] generate_search_query")
     prompt = (
@@ -107,25 +91,32 @@ def generate_search_query(state: PlannerState) -> PlannerState:
     logger.info(f"Generated search query: {query}")
     return {"search_query": query}
 
+@node_events
 def decide_search_source(state: PlannerState) -> PlannerState:
     logger.info("[Node] decide_search_source")
     prompt = (
         f"Given the task and codebase context, should we fetch external docs?\n"
-        f"Task: {state['task']}\nCodebase: {state['codebase_summary']}\n"
+        f"Task: {state['task']}\nCodebase outline: {state['codebase_outline']}\n"
         f"Answer with EXTERNAL or INTERNAL."
     )
-    result = chat(prompt).strip().upper()
+    result = chat(prompt, temperature=0).strip().upper()
     logger.info(f"Decision from LLM: {result}")
     return {"use_external": result == "EXTERNAL"}
 
+def join_context(state: PlannerState) -> PlannerState:
+    # Waits for both parallel branches before routing on use_external
+    return {}
+
+@node_events
 def search_external(state: PlannerState) -> PlannerState:
     logger.info("[Node] search_external")
-    logger.info(f"State keys at search_external: {list(state.keys())}")
+    logger.debug(f"State keys at search_external: {list(state.keys())}")
     query = state.get("search_query", state["task"])
     logger.info(f"Query passed to Tavily: {query}")
     results = tavily_search(query)
     return {"external_results": results}
 
+@node_events
 def generate_steps(state: PlannerState) -> PlannerState:
     logger.info("[Node] generate_steps")
     external_results = state.get('external_results', [])
@@ -142,9 +133,12 @@ Generate a python list of steps , Each step must mention:
 - "tool": one of ["read", "write", "delete", "apply_change", "llm_modify"]
 - "args": a dict of arguments for the tool (e.g., code, line number, function name, etc.)
 
+To change an existing file prefer "llm_modify" with args {{"instruction": "<what to change>"}} over re-emitting the whole file with "write"; use "write" for new files.
+
 Choose the file type and language that best fits the task. If the task involves web, use .html, .js, .css as needed. If the task is for Python, use .py. If the codebase is empty, create all necessary files from scratch.
 
 Be specific: reference real files, functions, and lines. Do not use placeholders like '...' or generic names. If a file does not exist, create it. If you need to add a function or code, specify its full code. If you need to modify a line, specify the line number and the new code.
+Consecutive apply_change steps on a file are applied together, so their line numbers must all refer to the file as it was before those edits (earlier edits do not shift the numbering of later ones).
 
 Output ONLY a valid Python list of steps, no explanations, no markdown, no extra text.
 
@@ -171,9 +165,11 @@ If you cannot determine the steps, output an empty list: []
     steps: List[ToolStep] = []
     for item in steps_raw:
         try:
-            steps.append(ToolStep(**item))
+            step = ToolStep(**item)
         except ValidationError as e:
             raise RuntimeError(f"Step validation failed: {e}")
+        emit("step_planned", index=len(steps), step=step.model_dump())
+        steps.append(step)
     logger.info(f"Generated {len(steps)} steps.")
     return {"steps": steps}
 
@@ -184,24 +180,28 @@ builder.add_node("summarize_codebase", summarize_codebase)
 builder.add_node("enhance_prompt", enhance_prompt)
 builder.add_node("generate_search_query", generate_search_query)
 builder.add_node("decide_search_source", decide_search_source)
+builder.add_node("join_context", join_context)
 builder.add_node("search_external", search_external)
 builder.add_node("generate_steps", generate_steps)
 
-# Edges
+# Edges: enhance_prompt and decide_search_source only need the task and the
+# codebase summary, so they run in parallel; the search query is only
+# generated when the EXTERNAL branch is taken.
 builder.set_entry_point("summarize_codebase")
 builder.add_edge("summarize_codebase", "enhance_prompt")
-builder.add_edge("enhance_prompt", "generate_search_query")
-builder.add_edge("generate_search_query", "decide_search_source")
+builder.add_edge("summarize_codebase", "decide_search_source")
+builder.add_edge(["enhance_prompt", "decide_search_source"], "join_context")
 
 builder.add_conditional_edges(
-    "decide_search_source",
+    "join_context",
     lambda state: "external" if state["use_external"] else "internal",
     {
-        "external": "search_external",
+        "external": "generate_search_query",
         "internal": "generate_steps"
     }
 )
 
+builder.add_edge("generate_search_query", "search_external")
 builder.add_edge("search_external", "generate_steps")
 builder.add_edge("generate_steps", END)
 
@@ -0,0 +1,209 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+from langchain.schema import HumanMessage, AIMessage, BaseMessage
+from langchain.memory import ConversationBufferMemory
+
+logger = logging.getLogger(__name__)
+
+
+# --- One conversation ---
+class ChatSession:
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.memory = ConversationBufferMemory(return_messages=True)
+        self.last_used = time.time()
+        self.lock = threading.Lock()
+        # Rolling summary of older turns, see agents/history.py. Positions are
+        # counted over every message the session ever had: `offset` is the
+        # position of messages[0], `folded` how many leading ones the summary covers.
+        self.summary = ""
+        self.offset = 0
+        self.folded = 0
+        # Set by SessionStore.reset so late writers (e.g. a compaction in flight) leave the new conversation alone
+        self.discarded = False
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return self.memory.chat_memory.messages
+
+
+# --- Optional SQLite persistence ---
+class SQLiteSessionBackend:
+    """Keeps every session's messages in a local SQLite file so evicted sessions can be reloaded."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_messages ("
+            " session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL,"
+            " content TEXT NOT NULL, created_at REAL NOT NULL,"
+            " PRIMARY KEY (session_id, seq))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_summaries ("
+            " session_id TEXT PRIMARY KEY, summary TEXT NOT NULL, folded INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def load(self, session: ChatSession, keep_last: int):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, role, content FROM chat_messages WHERE session_id = ? ORDER BY seq",
+                (session.id,),
+            ).fetchall()[-keep_last:]
+            summary = self._conn.execute(
+                "SELECT summary, folded FROM chat_summaries WHERE session_id = ?", (session.id,)
+            ).fetchone()
+        session.memory.chat_memory.messages = [
+            HumanMessage(content=c) if role == "human" else AIMessage(content=c) for _, role, c in rows
+        ]
+        if rows:
+            session.offset = rows[0][0]
+        if summary:
+            session.summary, session.folded = summary
+
+    def save_summary(self, session_id: str, summary: str, folded: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_summaries VALUES (?, ?, ?)", (session_id, summary, folded)
+            )
+            self._conn.commit()
+
+    def append(self, session_id: str, messages: List[BaseMessage], keep_last: int):
+        now = time.time()
+        with self._lock:
+            (last,) = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) FROM chat_messages WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            self._conn.executemany(
+                "INSERT INTO chat_messages VALUES (?, ?, ?, ?, ?)",
+                [
+                    (session_id, last + 1 + i, "human" if isinstance(m, HumanMessage) else "ai", m.content, now)
+                    for i, m in enumerate(messages)
+                ],
+            )
+            self._conn.execute(
+                "DELETE FROM chat_messages WHERE session_id = ? AND seq <= ?",
+                (session_id, last + len(messages) - keep_last),
+            )
+            self._conn.commit()
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM chat_summaries WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+
+# --- Session store ---
+class SessionStore:
+    """
+    Session-keyed conversation memory.
+
+    Each session keeps at most `max_messages` messages. Sessions idle for more
+    than `ttl_seconds` are evicted, and beyond `max_sessions` the least
+    recently used session goes first. With a SQLite backend evicted sessions
+    are reloaded from disk on their next request.
+
+    With `keep_unfolded`, messages the rolling summary does not cover yet are
+    only trimmed once they have been folded into it (see agents/history.py),
+    up to a hard cap of twice `max_messages`.
+    """
+
+    def __init__(self, max_sessions: int = 500, ttl_seconds: float = 3600, max_messages: int = 100,
+                 backend: Optional[SQLiteSessionBackend] = None, keep_unfolded: bool = False):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.backend = backend
+        self.keep_unfolded = keep_unfolded
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - session.last_used <= self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            logger.debug(f"[Sessions] Evicted session {session_id}")
+
+    def _trim(self, session: ChatSession):
+        overflow = len(session.messages) - self.max_messages
+        if self.keep_unfolded and overflow > 0:
+            folded = max(0, session.folded - session.offset)
+            hard_overflow = len(session.messages) - 2 * self.max_messages
+            if hard_overflow > folded:
+                logger.warning(f"[Sessions] Session {session.id} dropped {hard_overflow - folded} "
+                               f"messages before they were summarized")
+            overflow = min(overflow, max(folded, hard_overflow))
+        if overflow > 0:
+            del session.messages[:overflow]
+            session.offset += overflow
+
+    def get(self, session_id: str) -> ChatSession:
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = ChatSession(session_id)
+                if self.backend is not None:
+                    self.backend.load(session, self.max_messages * (2 if self.keep_unfolded else 1))
+                    self._trim(session)
+                self._sessions[session_id] = session
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+            return session
+
+    def append(self, session_id: str, *messages: BaseMessage):
+        session = self.get(session_id)
+        with session.lock:
+            for message in messages:
+                session.memory.chat_memory.add_message(message)
+            self._trim(session)
+            keep = len(session.messages)
+        if self.backend is not None:
+            self.backend.append(session_id, list(messages), keep)
+
+    def save_summary(self, session: ChatSession):
+        """Persist the session's summary, unless it was reset or evicted since it was loaded."""
+        if self.backend is None:
+            return
+        with session.lock:
+            with self._lock:
+                live = self._sessions.get(session.id) is session
+            if session.discarded or not live:
+                logger.debug(f"[Sessions] Not saving the summary of replaced session {session.id}")
+                return
+            self.backend.save_summary(session.id, session.summary, session.folded)
+
+    def reset(self, session_id: str):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            with session.lock:
+                session.discarded = True
+        if self.backend is not None:
+            self.backend.clear(session_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+def session_store_from_env(keep_unfolded: bool = False) -> SessionStore:
+    db_path = os.getenv("CHAT_SESSION_DB")
+    return SessionStore(
+        max_sessions=int(os.getenv("CHAT_MAX_SESSIONS", "500")),
+        ttl_seconds=float(os.getenv("CHAT_SESSION_TTL", "3600")),
+        max_messages=int(os.getenv("CHAT_MAX_MESSAGES", "100")),
+        backend=SQLiteSessionBackend(db_path) if db_path else None,
+        keep_unfolded=keep_unfolded,
+    )
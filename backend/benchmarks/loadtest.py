@@ -0,0 +1,277 @@
+"""
+Concurrent load test for /chat, /run-task and /fs/*.
+
+    cd backend
+    python -m benchmarks.loadtest --duration 30 --concurrency 50 --out load.json
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --mix chat=1,fs=4
+
+By default the FastAPI app is driven in-process through httpx's ASGI
+transport with the fake LLM (lognormal latency around --llm-latency-ms) and
+the stub search backend, against a scratch codebase. With --url the traffic
+goes to a running server instead, which must have been started with the
+backend it should be measured with (e.g. LLM_BACKEND=fake); its /run-task
+calls will write to that server's codebase.
+
+The report gives per-endpoint throughput, p50/p95/p99 latency and status
+counts, plus event-loop lag sampled while the load runs (the server's own
+loop in-process; only the client's loop with --url). Agent runs are timed
+from the job's own timestamps ("end-to-end" includes the queue wait,
+"execution" does not); runs whose commit lost a race with another run's
+are listed separately as "(commit conflict)".
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import shutil
+from collections import defaultdict
+from typing import Dict, List
+
+CHAT_MESSAGES = [
+    "What is the difference between a list and a tuple in Python?",
+    "Explain how the event loop works in asyncio",
+    "Create a function that parses ISO dates and add tests for it",
+    "Why does my recursive function hit the recursion limit?",
+    "Add input validation to the order parsing helpers",
+    "hi",
+]
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def latency_stats(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    return {
+        "p50_ms": round(percentile(ordered, 50), 2),
+        "p95_ms": round(percentile(ordered, 95), 2),
+        "p99_ms": round(percentile(ordered, 99), 2),
+        "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint: str, start: float, status):
+        self.record_ms(endpoint, (time.perf_counter() - start) * 1000, status)
+
+    def record_ms(self, endpoint: str, elapsed_ms: float, status):
+        self.latencies[endpoint].append(elapsed_ms)
+        self.statuses[endpoint][str(status)] += 1
+
+    def report(self, elapsed: float) -> Dict[str, dict]:
+        out = {}
+        for endpoint in sorted(self.latencies):
+            samples = self.latencies[endpoint]
+            statuses = dict(self.statuses[endpoint])
+            errors = sum(n for code, n in statuses.items() if not code.startswith(("2", "3")))
+            out[endpoint] = {
+                "requests": len(samples),
+                "errors": errors,
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "statuses": statuses,
+                **latency_stats(samples),
+            }
+        return out
+
+
+# --- Traffic ---
+async def chat(client, rec: Recorder, rng: random.Random, worker: int):
+    start = time.perf_counter()
+    try:
+        resp = await client.post("/chat", json={"message": rng.choice(CHAT_MESSAGES), "session_id": f"load-{worker}"})
+        rec.record("POST /chat", start, resp.status_code)
+    except Exception as e:
+        rec.record("POST /chat", start, type(e).__name__)
+
+
+async def run_task(client, rec: Recorder, rng: random.Random, worker: int, poll_interval: float = 1.0):
+    # Polls like the frontend's waitForJob (once a second); the run's own duration
+    # comes from the job's timestamps so it is not rounded to the poll interval
+    start = time.perf_counter()
+    try:
+        resp = await client.post("/run-task", json={"task": "Add a helper that formats order totals"})
+        rec.record("POST /run-task", start, resp.status_code)
+        if resp.status_code != 202:
+            return
+        job_id = resp.json()["job_id"]
+        while True:
+            poll = time.perf_counter()
+            result = await client.get(f"/jobs/{job_id}/result")
+            rec.record("GET /jobs/{id}/result", poll, result.status_code)
+            if result.status_code != 202:
+                record_run(rec, result.status_code, result.json())
+                return
+            await asyncio.sleep(poll_interval)
+    except Exception as e:
+        rec.record("POST /run-task", start, type(e).__name__)
+
+
+def record_run(rec: Recorder, http_status: int, job: dict):
+    """Queue wait plus run time, and run time alone, from the job's timestamps."""
+    outcome = job.get("result") or {}
+    if outcome.get("conflicts"):
+        # Every fake plan writes the same files, so concurrent runs race to commit them;
+        # the losers are reported on their own instead of as failed runs
+        suffix, status = " (commit conflict)", 409
+    else:
+        suffix = ""
+        status = "run_error" if (outcome.get("status") or job.get("status")) == "error" else http_status
+    if job.get("finished_at") is None:
+        return
+    if job.get("created_at") is not None:
+        rec.record_ms("run-task end-to-end" + suffix, (job["finished_at"] - job["created_at"]) * 1000, status)
+    if job.get("started_at") is not None:
+        rec.record_ms("run-task execution" + suffix, (job["finished_at"] - job["started_at"]) * 1000, status)
+
+
+async def fs(client, rec: Recorder, rng: random.Random, worker: int, files: List[str] = ()):
+    kind = rng.choice(["list", "read", "tree"])
+    start = time.perf_counter()
+    try:
+        if kind == "list":
+            resp = await client.get("/fs/list", params={"path": "."})
+            rec.record("GET /fs/list", start, resp.status_code)
+        elif kind == "tree":
+            resp = await client.get("/fs/tree", params={"path": "", "depth": 2})
+            rec.record("GET /fs/tree", start, resp.status_code)
+        else:
+            path = rng.choice(files) if files else "."
+            resp = await client.get("/fs/read", params={"path": path})
+            rec.record("GET /fs/read", start, resp.status_code)
+    except Exception as e:
+        rec.record(f"GET /fs/{kind}", start, type(e).__name__)
+
+
+async def monitor_loop_lag(samples: List[float], stop: asyncio.Event, interval: float = 0.05):
+    """How late the loop wakes a sleeping task: a blocked loop shows up directly as lag."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, (time.perf_counter() - start - interval) * 1000))
+
+
+async def drive(client, args, files: List[str]) -> dict:
+    mix = {}
+    for part in args.mix.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    actions = {"chat": chat, "run_task": run_task, "fs": fs}
+    unknown = set(mix) - set(actions)
+    if unknown:
+        raise SystemExit(f"unknown traffic type(s): {', '.join(sorted(unknown))}")
+    names, weights = list(mix), list(mix.values())
+
+    rec = Recorder()
+    lag: List[float] = []
+    stop = asyncio.Event()
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(index: int):
+        rng = random.Random(args.seed * 10_007 + index)
+        while time.perf_counter() < deadline:
+            action = rng.choices(names, weights)[0]
+            if action == "fs":
+                await fs(client, rec, rng, index, files)
+            else:
+                await actions[action](client, rec, rng, index)
+            if args.think_ms:
+                await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+
+    started = time.perf_counter()
+    monitor = asyncio.create_task(monitor_loop_lag(lag, stop))
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+
+    endpoints = rec.report(elapsed)
+    total = sum(e["requests"] for name, e in endpoints.items() if not name.startswith("run-task "))
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "total_requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+        "event_loop_lag": {"samples": len(lag), **latency_stats(lag)},
+    }
+
+
+def _configure_env(workdir: str, args):
+    os.environ["AGENT_CODEBASE_DIR"] = workdir
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["SEARCH_BACKEND"] = "stub"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ.setdefault("FAKE_LLM_LATENCY_DIST", "lognormal")
+    # Every simulated user repeats the same few prompts; with the response cache on
+    # most LLM calls would skip the simulated latency after the first run
+    os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+    os.environ.setdefault("LLM_CACHE_DB", "off")
+    os.environ.setdefault("FS_WATCH", "0")
+    os.environ.setdefault("GROQ_API_KEY", "offline")
+
+
+async def main_async(args) -> dict:
+    import httpx
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+            listing = (await client.get("/fs/list", params={"path": "."})).json()
+            files = [e["name"] for e in listing if e.get("type") == "file"][:50]
+            return await drive(client, args, files)
+
+    workdir = tempfile.mkdtemp(prefix="agent-load-")
+    try:
+        _configure_env(workdir, args)
+        from benchmarks.synthetic import generate_codebase
+        generate_codebase(workdir, args.files)
+        import main  # after the environment is set up
+        logging.getLogger().setLevel(logging.WARNING)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            files = sorted(os.listdir(workdir))[:50]
+            report = await drive(client, args, files)
+        main.job_queue.shutdown()
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Drive mixed /chat, /run-task and /fs traffic at the backend.")
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent simulated users")
+    parser.add_argument("--mix", default="chat=5,run_task=1,fs=4", help="Relative weights of chat, run_task and fs")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Mean pause between a user's requests")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Median fake LLM latency (in-process)")
+    parser.add_argument("--files", type=int, default=50, help="Synthetic codebase size (in-process)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = {"config": vars(args), **asyncio.run(main_async(args))}
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[load] {report['total_requests']} requests, {report['throughput_rps']} req/s -> {args.out}",
+              file=sys.stderr)
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
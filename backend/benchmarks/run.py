@@ -0,0 +1,115 @@
+"""
+Offline micro-benchmarks for the agent backend.
+
+    cd backend
+    python -m benchmarks.run --out bench.json
+    python -m benchmarks.run --suites summarize --sizes 10,100,1000,10000 --baseline bench.json
+
+Everything runs against a scratch codebase (AGENT_CODEBASE_DIR) with the
+deterministic fake LLM (LLM_BACKEND=fake) and the stub search backend, so
+no API keys or network are needed. Results are written as JSON; with
+--baseline each result also gets its mean relative to the matching result
+in an earlier file.
+"""
+import os
+import sys
+import json
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+
+def _configure_env(workdir: str, llm_latency_ms: float):
+    os.environ["AGENT_CODEBASE_DIR"] = workdir
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["SEARCH_BACKEND"] = "stub"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(llm_latency_ms)
+    # Measure the work itself, not the response cache or background services
+    os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+    os.environ.setdefault("LLM_CACHE_DB", "off")
+    os.environ.setdefault("FS_WATCH", "0")
+    os.environ.setdefault("GROQ_API_KEY", "offline")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def _compare(results: list, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["suite"], r["name"], json.dumps(r["params"], sort_keys=True)): r
+                    for r in json.load(f)["results"]}
+    for r in results:
+        previous = baseline.get((r["suite"], r["name"], json.dumps(r["params"], sort_keys=True)))
+        if previous and previous.get("mean_ms"):
+            r["baseline_mean_ms"] = previous["mean_ms"]
+            r["ratio"] = round(r["mean_ms"] / previous["mean_ms"], 3)
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Run the offline backend benchmarks.")
+    parser.add_argument("--suites", default="graphs,file_ops,fs,summarize",
+                        help="Comma-separated suites: graphs, file_ops, fs, summarize")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="Codebase sizes (files) for summarize")
+    parser.add_argument("--steps", default="1,10,50", help="Plan sizes for the graph suite")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0,
+                        help="Fake LLM latency; 0 measures pure framework overhead")
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch codebase directory")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="agent-bench-")
+    _configure_env(workdir, args.llm_latency_ms)
+    from benchmarks.suites import SUITES  # after the environment is set up
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = []
+    try:
+        for name in [s.strip() for s in args.suites.split(",") if s.strip()]:
+            if name not in SUITES:
+                parser.error(f"unknown suite {name!r} (choose from {', '.join(SUITES)})")
+            print(f"[bench] {name}...", file=sys.stderr)
+            if name == "summarize":
+                results += SUITES[name]([int(n) for n in args.sizes.split(",")], args.repeat)
+            elif name == "graphs":
+                results += SUITES[name]([int(n) for n in args.steps.split(",")], args.repeat)
+            else:
+                results += SUITES[name](args.repeat)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.baseline:
+        _compare(results, args.baseline)
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[bench] wrote {len(results)} results to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
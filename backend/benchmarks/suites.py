@@ -0,0 +1,171 @@
+import os
+import time
+import statistics
+from typing import Callable, Dict, List
+
+# Imported by benchmarks.run after it has pointed AGENT_CODEBASE_DIR at a scratch
+# directory and selected the fake LLM and stub search backends.
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import models.groq_llm as groq_llm
+from agents.planner import summarize_codebase, run_planner_subgraph
+from agents.developer import run_developer_subgraph
+from utils.codebase_snapshot import codebase_snapshot
+from utils.code_index import code_index
+from utils.file_cache import file_cache
+from utils.file_ops import BASE_DIR, router, apply_change, apply_changes, write_code_file
+from benchmarks.synthetic import generate_codebase
+
+TASK = "Add input validation to the order parsing helpers and report invalid records"
+
+
+# --- Timing helpers ---
+def measure(fn: Callable[[], object], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "p50_ms": round(ordered[len(ordered) // 2], 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        "min_ms": round(ordered[0], 4),
+        "max_ms": round(ordered[-1], 4),
+    }
+
+
+def result(suite: str, name: str, stats: dict, **params) -> dict:
+    return {"suite": suite, "name": name, "params": params, **stats}
+
+
+def reset_caches():
+    """Forget everything derived from the codebase so the next call starts cold."""
+    codebase_snapshot.invalidate()
+    code_index.clear()
+    file_cache.invalidate()
+
+
+def _remove(files: List[str]):
+    for name in files:
+        path = os.path.join(BASE_DIR, name)
+        if os.path.exists(path):
+            os.remove(path)
+    codebase_snapshot.refresh()
+
+
+# --- Suites ---
+def bench_summarize(sizes: List[int], repeat: int) -> List[dict]:
+    """summarize_codebase (snapshot + BM25 packing + outlines) on growing synthetic codebases."""
+    results = []
+    for size in sizes:
+        generate_codebase(BASE_DIR, size)
+        state = {"task": TASK}
+        cold_repeat = 1 if size >= 1000 else repeat
+
+        def cold():
+            reset_caches()
+            summarize_codebase(state)
+
+        output = summarize_codebase(state)
+        results.append(result("summarize_codebase", "cold", measure(cold, cold_repeat, warmup=0), files=size))
+        results.append(result("summarize_codebase", "warm", measure(lambda: summarize_codebase(state), repeat),
+                              files=size, summary_chars=len(output["codebase_summary"]),
+                              outline_chars=len(output["codebase_outline"])))
+    return results
+
+
+def bench_graphs(step_counts: List[int], repeat: int) -> List[dict]:
+    """Planner and developer graph wall time with the fake LLM; per-step overhead for the developer."""
+    results = []
+    responder = groq_llm.model.responder
+    generate_codebase(BASE_DIR, 10)
+    for steps in step_counts:
+        responder.steps = steps
+        stats = measure(lambda: run_planner_subgraph(TASK), repeat)
+        results.append(result("graph", "planner", stats, steps=steps, llm_latency_ms=responder.latency_ms))
+
+        plan = [{"file": f"bench_dev_{i}.py", "tool": "write", "args": {"content": f"value = {i}\n"}}
+                for i in range(steps)]
+        stats = measure(lambda: run_developer_subgraph(plan), repeat)
+        stats["per_step_ms"] = round(stats["mean_ms"] / steps, 4)
+        results.append(result("graph", "developer", stats, steps=steps, llm_latency_ms=responder.latency_ms))
+        _remove([f"bench_dev_{i}.py" for i in range(steps)] + [f"fake_module_{i}.py" for i in range(steps)])
+    return results
+
+
+def bench_file_ops(repeat: int, lines: int = 1000, ops: int = 200) -> List[dict]:
+    """Throughput of the line-edit and whole-file write primitives."""
+    name = "bench_edit.txt"
+    content = [f"line {i}\n" for i in range(lines)]
+    write_code_file(name, content)
+    results = []
+
+    def single_edits():
+        for i in range(ops):
+            apply_change(name, "modify", (i % lines) + 1, f"edited {i}")
+
+    def batched_edits():
+        apply_changes(name, [{"action": "modify", "line": (i % lines) + 1, "new_code": f"edited {i}"}
+                             for i in range(ops)])
+
+    def writes():
+        for _ in range(ops):
+            write_code_file(name, content)
+
+    for label, fn in (("apply_change", single_edits), ("apply_changes_batch", batched_edits),
+                      ("write_code_file", writes)):
+        stats = measure(fn, repeat)
+        stats["ops_per_sec"] = round(ops / (stats["mean_ms"] / 1000), 1)
+        results.append(result("file_ops", label, stats, lines=lines, edits=ops))
+    _remove([name])
+    return results
+
+
+def bench_fs_endpoints(repeat: int) -> List[dict]:
+    """Latency of the /fs/* routes through the ASGI stack (in-process, no network)."""
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    generate_codebase(BASE_DIR, 10)
+    small, large = "bench_small.txt", "bench_large.txt"
+    write_code_file(small, [f"line {i}\n" for i in range(200)])
+    write_code_file(large, [f"{i:08d} " + "x" * 90 + "\n" for i in range(20000)])  # ~2 MB, streamed
+    etag = client.get("/fs/read", params={"path": small}).headers["etag"]
+
+    def save_delta():
+        current = client.get("/fs/read", params={"path": small}).headers["etag"]
+        client.post("/fs/save", json={"path": small, "base_etag": current,
+                                      "edits": [{"offset": 0, "length": 4, "text": "LINE"}]})
+
+    cases = {
+        "list": lambda: client.get("/fs/list", params={"path": "."}),
+        "tree_depth2": lambda: client.get("/fs/tree", params={"path": "", "depth": 2}),
+        "read_small": lambda: client.get("/fs/read", params={"path": small}),
+        "read_not_modified": lambda: client.get("/fs/read", params={"path": small},
+                                                headers={"If-None-Match": etag}),
+        "read_large": lambda: client.get("/fs/read", params={"path": large}),
+        "read_range": lambda: client.get("/fs/read", params={"path": large},
+                                         headers={"Range": "bytes=0-65535"}),
+        "save_full": lambda: client.post("/fs/save", json={"path": small, "content": "x\n" * 200}),
+        "save_delta": save_delta,
+    }
+    results = [result("fs_endpoints", name, measure(fn, repeat * 4)) for name, fn in cases.items()]
+    _remove([small, large])
+    return results
+
+
+SUITES = {
+    "graphs": bench_graphs,
+    "file_ops": bench_file_ops,
+    "fs": bench_fs_endpoints,
+    "summarize": bench_summarize,
+}
@@ -0,0 +1,63 @@
+import os
+import random
+
+# Synthetic codebases for the benchmarks: top-level Python and JavaScript files
+# (the snapshot only tracks top-level files) with functions, classes and docstrings.
+
+_WORDS = ["user", "order", "cache", "parse", "render", "token", "index", "route", "query", "event",
+          "session", "config", "buffer", "stream", "report", "metric", "worker", "schema"]
+
+
+def _python_module(rng: random.Random, index: int, functions: int) -> str:
+    lines = [f'"""Synthetic module {index}."""', "import os", "import json", ""]
+    for f in range(functions):
+        name = f"{rng.choice(_WORDS)}_{rng.choice(_WORDS)}_{f}"
+        lines += [
+            f"def {name}(data, limit={rng.randint(1, 100)}):",
+            f'    """Process {rng.choice(_WORDS)} records for {rng.choice(_WORDS)}."""',
+            "    result = []",
+            "    for item in data[:limit]:",
+            f"        if item.get('{rng.choice(_WORDS)}'):",
+            f"            result.append(json.dumps(item))",
+            "    return result",
+            "",
+        ]
+    lines += [f"class {rng.choice(_WORDS).title()}Service{index}:",
+              '    """Synthetic service."""',
+              "    def run(self):",
+              f"        return os.getenv('{rng.choice(_WORDS).upper()}')",
+              ""]
+    return "\n".join(lines)
+
+
+def _js_module(rng: random.Random, index: int, functions: int) -> str:
+    lines = [f"// Synthetic module {index}"]
+    for f in range(functions):
+        name = f"{rng.choice(_WORDS)}{rng.choice(_WORDS).title()}{f}"
+        lines += [
+            f"export function {name}(items) {{",
+            f"  return items.filter(x => x.{rng.choice(_WORDS)}).map(x => x.{rng.choice(_WORDS)});",
+            "}",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def generate_codebase(root: str, files: int, functions_per_file: int = 6, seed: int = 0) -> int:
+    """
+    Grow `root` to `files` synthetic files (existing ones are kept, so sizes
+    can be stepped up without regenerating). Returns the number written.
+    """
+    os.makedirs(root, exist_ok=True)
+    written = 0
+    for index in range(files):
+        ext = "js" if index % 5 == 4 else "py"
+        path = os.path.join(root, f"module_{index:05d}.{ext}")
+        if os.path.exists(path):
+            continue
+        rng = random.Random(seed * 1_000_003 + index)
+        body = (_js_module if ext == "js" else _python_module)(rng, index, functions_per_file)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(body)
+        written += 1
+    return written
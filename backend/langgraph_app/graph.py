@@ -1,7 +1,9 @@
 from langgraph.graph import StateGraph
 from typing import TypedDict
+from utils.workspace import WorkspaceOverlay
 from agents.planner import run_planner_subgraph as planner_agent
 from agents.developer import run_developer_subgraph as developer_agent
+from utils.run_events import node_events
 import logging
 
 # Logging setup
@@ -15,12 +17,14 @@ class OverallState(TypedDict, total=False):
     code: dict
     status: str
     error: str
+    workspace: WorkspaceOverlay  # pending edits for this run; committed by the caller
 
 # --- Build Main LangGraph ---
 def setup_graph():
     graph = StateGraph(OverallState)
 
     # --- Node 1: Planner ---
+    @node_events
     def planner_node(state: OverallState) -> dict:
         logger.info(f"[Planner Node] Received task: {state['task']}")
         try:
@@ -36,15 +40,17 @@ def setup_graph():
             }
 
     # --- Node 2: Developer ---
+    @node_events
     def developer_node(state: OverallState) -> dict:
-        logger.info(f"[Developer Node] Received steps: {state.get('steps')}")
+        logger.info(f"[Developer Node] Received {len(state.get('steps') or [])} steps")
+        logger.debug(f"[Developer Node] Steps: {state.get('steps')}")
         if not state.get("steps"):
             return {
                 "error": "No steps found",
                 "status": "error"
             }
         try:
-            dev_result = developer_agent(state["steps"])  # invokes the developer subgraph
+            dev_result = developer_agent(state["steps"], workspace=state.get("workspace"))  # invokes the developer subgraph
             return {
                 "code": dev_result,
                 "status": "development_complete"
@@ -1,12 +1,26 @@
-from fastapi import FastAPI, Request, Body
+import os
+import uuid
+import json
+import asyncio
+import logging
+from fastapi import FastAPI, Request, Body, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from agents.chat_agent import chat_with_memory, memory ,chat_with_memory_with_confirmation # Import your chat agent
+from agents.chat_agent import chat_with_memory, reset_session, DEFAULT_SESSION, chat_with_memory_with_confirmation, astream_chat_with_memory, classify_intent, local_intent, confirmation_reply, remember_turn # Import your chat agent
 from langgraph_app.graph import setup_graph
 from utils.file_ops import router as file_ops_router
 from fastapi import WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, PlainTextResponse
+from utils.job_queue import JobQueue, QueueFullError
+from utils.run_events import run_events, run_context
+from utils.workspace import WorkspaceOverlay, WorkspaceConflict, pending_workspaces
+from utils.fs_watcher import fs_watcher
+from utils.metrics import metrics, MetricsMiddleware
+from utils.tracing import tracer, span
+from models.llm_cache import llm_cache
 
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
@@ -19,34 +33,261 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request timings per route for /metrics (a no-op when METRICS_ENABLED=0)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(file_ops_router)
 
 class ChatRequest(BaseModel): 
     message: str
     custom_instructions: str = "Behave like a helpful assitant please"  # Default instructions
+    session_id: str = DEFAULT_SESSION
 
 @app.post("/chat")
 async def chat_endpoint(req: ChatRequest):
-    reply = chat_with_memory_with_confirmation(req.message, req.custom_instructions)
+    reply = await run_in_threadpool(
+        chat_with_memory_with_confirmation, req.message, req.custom_instructions, session_id=req.session_id
+    )
     return reply
 
+# --- Streaming chat ---
+async def stream_chat_events(req: ChatRequest):
+    """Yields {"type": "token"} events while the reply streams, then one {"type": "done"} event."""
+    if local_intent(req.message):
+        confirmation = confirmation_reply(req.message)
+        remember_turn(req.message, confirmation["reply"], req.session_id)
+        yield {"type": "done", **confirmation}
+        return
+    intent = asyncio.create_task(asyncio.to_thread(classify_intent, req.message))
+    parts = []
+    try:
+        async for token in astream_chat_with_memory(req.message, req.custom_instructions,
+                                                    session_id=req.session_id, remember=False):
+            parts.append(token)
+            yield {"type": "token", "content": token}
+        done = {"type": "done", "reply": "".join(parts)}
+        if await intent:
+            done.update(confirmation_reply(req.message))
+        # Memory keeps whatever reply the client ends up with, as in the non-streaming path
+        remember_turn(req.message, done["reply"], req.session_id)
+        yield done
+    finally:
+        intent.cancel()
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest):
+    async def sse():
+        async for event in stream_chat_events(req):
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    return StreamingResponse(sse(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/jobs/{job_id}/trace")
+async def job_trace_endpoint(job_id: str):
+    """The run's spans (graph nodes, steps, LLM calls, searches, file ops) as a Chrome trace-event file."""
+    trace = tracer.chrome_trace(job_id)
+    if not any(event["ph"] == "X" for event in trace["traceEvents"]):
+        raise HTTPException(status_code=404, detail="No trace recorded for this job")
+    return JSONResponse(trace, headers={"Content-Disposition": f'attachment; filename="trace-{job_id}.json"'})
+
+# --- Preview runs: inspect, then commit or discard the staged edits ---
+@app.get("/jobs/{job_id}/diff")
+async def job_diff_endpoint(job_id: str):
+    workspace = pending_workspaces.get(job_id)
+    if workspace is None:
+        raise HTTPException(status_code=404, detail="No pending changes for this job")
+    return {"files": workspace.pending(), "diff": workspace.diff()}
+
+@app.post("/jobs/{job_id}/commit")
+async def job_commit_endpoint(job_id: str):
+    workspace = pending_workspaces.pop(job_id)
+    if workspace is None:
+        raise HTTPException(status_code=404, detail="No pending changes for this job")
+    try:
+        changes = await run_in_threadpool(workspace.commit)
+    except WorkspaceConflict as e:
+        # Nothing was written; keep the changes pending so they can be discarded or retried
+        pending_workspaces.put(job_id, workspace)
+        raise HTTPException(status_code=409, detail={"error": str(e), "files": e.files})
+    return {"status": "committed", "files": changes}
+
+@app.post("/jobs/{job_id}/discard")
+async def job_discard_endpoint(job_id: str):
+    workspace = pending_workspaces.pop(job_id)
+    if workspace is None:
+        raise HTTPException(status_code=404, detail="No pending changes for this job")
+    changes = workspace.pending()
+    workspace.discard()
+    return {"status": "discarded", "files": changes}
+
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                req = ChatRequest.model_validate_json(message)
+                async for event in stream_chat_events(req):
+                    await websocket.send_json(event)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+    except WebSocketDisconnect:
+        pass
+
+class ResetRequest(BaseModel):
+    session_id: str = DEFAULT_SESSION
+
 @app.post("/reset")
-async def reset_endpoint():
-    memory.clear()
+async def reset_endpoint(req: ResetRequest = Body(default=ResetRequest())):
+    reset_session(req.session_id)
     return {"status": "memory reset"}
 
 
 
 
+# --- Background agent runs ---
+job_queue = JobQueue(
+    max_workers=int(os.getenv("AGENT_MAX_WORKERS", "2")),
+    max_queued=int(os.getenv("AGENT_MAX_QUEUED_JOBS", "16")),
+)
+
+# --- Metrics ---
+metrics.gauge("agent_jobs", "Agent runs by state.", lambda: {
+    "queued": job_queue.stats()["queued"], "running": job_queue.stats()["running"]}, ("state",))
+metrics.gauge("llm_cache_entries", "Responses held in the in-memory LLM cache.",
+              lambda: llm_cache.stats()["memory_entries"])
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def run_task(task: str, run_id: str = None, preview: bool = False) -> dict:
+    """
+    Run the agent graph with every file edit staged in a workspace overlay.
+
+    The overlay is committed when the run succeeds and dropped when it fails.
+    In preview mode it is kept under the run id instead, to be inspected with
+    /jobs/{id}/diff and then committed or discarded explicitly.
+    """
+    run_id = run_id or uuid.uuid4().hex
+    events = run_events.get_or_create(run_id)
+    workspace = WorkspaceOverlay()
+    try:
+        with run_context(events), span("run_task", "run", task_chars=len(task)):
+            events.emit("run_start", task=task)
+            workflow = setup_graph()
+            result = workflow.invoke({"task": task, "workspace": workspace})
+            outcome = {
+                "status": result.get("status"),
+                "error": result.get("error"),
+                "steps": result.get("steps", []),
+                "logs": result.get("code", []),
+                "changes": workspace.pending(),
+            }
+            failed = outcome["status"] == "error" or any(
+                str(log).startswith("[ERROR]") for log in outcome["logs"]
+            )
+            if preview:
+                pending_workspaces.put(run_id, workspace)
+                outcome["committed"] = False
+            elif failed:
+                workspace.discard()
+                outcome["committed"] = False
+            else:
+                try:
+                    workspace.commit()
+                    outcome["committed"] = True
+                except WorkspaceConflict as e:
+                    workspace.discard()
+                    outcome.update(status="error", error=str(e), committed=False, conflicts=e.files)
+            events.emit("run_finish", status=outcome["status"], error=outcome["error"])
+            return outcome
+    except Exception as e:
+        workspace.discard()
+        events.emit("run_finish", status="error", error=str(e))
+        raise
+    finally:
+        events.close()
+
+@app.on_event("shutdown")
+def shutdown_job_queue():
+    job_queue.shutdown()
+
+# --- Filesystem change notifications ---
+FS_WATCH_ENABLED = os.getenv("FS_WATCH", "1") != "0"
+
+@app.on_event("startup")
+def start_fs_watcher():
+    if FS_WATCH_ENABLED:
+        fs_watcher.start()
+
+@app.on_event("shutdown")
+def stop_fs_watcher():
+    fs_watcher.stop()
+
+@app.websocket("/ws/fs")
+async def fs_websocket(websocket: WebSocket, path: str = ""):
+    """Pushes debounced `fs_changes` batches, optionally limited to paths under `path`."""
+    await websocket.accept()
+    # "./src/", "/src" and "src" all mean the same folder; "." and "" mean everything
+    prefix = os.path.normpath(path.replace("\\", "/")).replace(os.sep, "/").lstrip("/")
+    if prefix == ".":
+        prefix = ""
+    await websocket.send_json({"type": "hello", "version": fs_watcher.version, "backend": fs_watcher.backend})
+    try:
+        async for event in fs_watcher.subscribe():
+            changes = [c for c in event["changes"]
+                       if not prefix or c["path"] == prefix or c["path"].startswith(prefix + "/")]
+            if changes:
+                await websocket.send_json({**event, "changes": changes})
+    except WebSocketDisconnect:
+        pass
+
 @app.post("/run-task")
 async def run_task_endpoint(data: dict = Body(...)):
-    print("run-task called with:", data)
+    logger.debug(f"run-task called with: {data}")
     task = data.get("task")
     if not task:
         return {"error": "No task provided"}
-    workflow = setup_graph()
-    result = workflow.invoke({"task": task})
-    return {
-        "status": "success",
-    }
+    try:
+        run_id = uuid.uuid4().hex
+        job = job_queue.submit(run_task, task, run_id, bool(data.get("preview")), name="run-task", job_id=run_id)
+        run_events.get_or_create(run_id)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return JSONResponse(status_code=202, content={"status": "queued", "job_id": job.id})
+
+@app.get("/jobs")
+async def jobs_stats_endpoint():
+    return job_queue.stats()
+
+@app.get("/jobs/{job_id}")
+async def job_status_endpoint(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/result")
+async def job_result_endpoint(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job.done:
+        return JSONResponse(status_code=202, content=job.to_dict())
+    return {**job.to_dict(), "result": job.result}
+
+@app.get("/jobs/{job_id}/events")
+async def job_events_endpoint(job_id: str):
+    """Server-sent events for a run: node start/finish with timings, planned steps and developer logs."""
+    events = run_events.get(job_id)
+    if events is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    async def sse():
+        async for event in events.subscribe():
+            yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+    return StreamingResponse(sse(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
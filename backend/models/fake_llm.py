@@ -0,0 +1,144 @@
+import os
+import ast
+import json
+import time
+import random
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, List
+
+from langchain.schema import AIMessage
+from langchain_core.messages import AIMessageChunk
+
+# Offline stand-ins for the Gemini and Groq clients, selected with LLM_BACKEND=fake.
+# Responses are derived from the prompt so every run of a benchmark or load test
+# does the same work; latency is drawn from a per-prompt seeded distribution.
+
+
+def _prompt_text(prompt: Any) -> str:
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, (list, tuple)):
+        return "\n".join(_prompt_text(p) for p in prompt)
+    return str(getattr(prompt, "content", prompt))
+
+
+class FakeResponder:
+    """
+    Deterministic answers for every prompt shape the agents send.
+
+    `latency_ms` is the median call latency; with `distribution="lognormal"`
+    calls are spread around it with a long right tail (sigma `jitter`), which
+    is closer to real model latency than a constant delay.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter: float = 0.5, distribution: str = "fixed",
+                 output_chars: int = 400, steps: int = 3, decision: str = "INTERNAL"):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.distribution = distribution
+        self.output_chars = output_chars
+        self.steps = steps
+        self.decision = decision
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeResponder":
+        return cls(
+            latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "0")),
+            jitter=float(os.getenv("FAKE_LLM_JITTER", "0.5")),
+            distribution=os.getenv("FAKE_LLM_LATENCY_DIST", "fixed"),
+            output_chars=int(os.getenv("FAKE_LLM_OUTPUT_CHARS", "400")),
+            steps=int(os.getenv("FAKE_LLM_STEPS", "3")),
+            decision=os.getenv("FAKE_LLM_DECISION", "INTERNAL").upper(),
+        )
+
+    def _rng(self, text: str) -> random.Random:
+        return random.Random(hashlib.sha1(text.encode("utf-8", "ignore")).digest()[:8])
+
+    def latency(self, text: str) -> float:
+        """Seconds this prompt should take."""
+        if self.latency_ms <= 0:
+            return 0.0
+        if self.distribution == "lognormal":
+            return self._rng(text).lognormvariate(0, self.jitter) * self.latency_ms / 1000
+        return self.latency_ms / 1000
+
+    def filler(self, text: str, chars: int = None) -> str:
+        chars = self.output_chars if chars is None else chars
+        words = self._rng(text).choices(["alpha", "beta", "gamma", "delta", "value", "result", "item"], k=chars // 6 + 1)
+        return " ".join(words)[:chars]
+
+    def _code(self, name: str, text: str) -> str:
+        body = "".join(f"    total += {i}  # {w}\n" for i, w in enumerate(self.filler(text).split()[:20]))
+        return f"def {name}():\n    total = 0\n{body}    return total\n"
+
+    def respond(self, prompt: Any) -> str:
+        self.calls += 1
+        text = _prompt_text(prompt)
+        if "Planned steps:\n" in text:
+            # Batch validation: hand the plan back unchanged
+            return text.split("Planned steps:\n", 1)[1].strip()
+        if "Planned step:\n" in text:
+            return json.dumps(ast.literal_eval(text.split("Planned step:\n", 1)[1].strip()))
+        if "Answer with EXTERNAL or INTERNAL" in text:
+            return self.decision
+        if "break it down into the smallest possible, atomic steps" in text:
+            steps = []
+            for i in range(self.steps):
+                name = f"fake_module_{i}"
+                steps.append({"file": f"{name}.py", "tool": "write", "args": {"content": self._code(name, text)}})
+            if steps:
+                steps.append({"file": steps[0]["file"], "tool": "llm_modify",
+                              "args": {"instruction": "add a docstring"}})
+            return repr(steps)
+        if "<<<<<<< SEARCH" in text:
+            return f"<<<<<<< SEARCH\n=======\n# {self.filler(text, 60)}\n>>>>>>> REPLACE"
+        if "Reply ONLY with the complete new contents" in text:
+            return self._code("rewritten", text)
+        if "web search query" in text:
+            return "fake query one, fake query two"
+        if "Enhance this task" in text:
+            return "Enhanced task: " + self.filler(text)
+        if "Is this a code action request?" in text:
+            return "yes" if any(w in text.lower() for w in ("create", "add", "fix", "write", "implement")) else "no"
+        if "Standalone Question:" in text:
+            return text.rsplit("Follow Up Input:", 1)[-1].split("\n", 1)[0].strip()
+        return self.filler(text)
+
+
+# --- Gemini stand-in (models.groq_llm) ---
+class FakeGeminiModel:
+    def __init__(self, responder: FakeResponder):
+        self.responder = responder
+
+    def generate_content(self, prompt: Any, generation_config: dict = None):
+        time.sleep(self.responder.latency(_prompt_text(prompt)))
+        return type("FakeResponse", (), {"text": self.responder.respond(prompt)})()
+
+
+# --- ChatGroq stand-in (agents.chat_agent) ---
+class FakeChatModel:
+    model_name = "fake-chat"
+    temperature = 0
+    max_tokens = None
+
+    def __init__(self, responder: FakeResponder, chunk_chars: int = 16):
+        self.responder = responder
+        self.chunk_chars = chunk_chars
+
+    def invoke(self, prompt: Any) -> AIMessage:
+        time.sleep(self.responder.latency(_prompt_text(prompt)))
+        return AIMessage(content=self.responder.respond(prompt))
+
+    async def astream(self, prompt: Any) -> AsyncIterator[AIMessageChunk]:
+        text = self.responder.respond(prompt)
+        chunks: List[str] = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)] or [""]
+        delay = self.responder.latency(_prompt_text(prompt)) / len(chunks)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield AIMessageChunk(content=chunk)
+
+
+def fake_llm_enabled() -> bool:
+    return os.getenv("LLM_BACKEND", "").lower() == "fake"
@@ -1,14 +1,31 @@
 import os
+import sys
 import google.generativeai as genai
 from dotenv import load_dotenv
+from models.llm_cache import cached_call
+from models.fake_llm import FakeGeminiModel, FakeResponder, fake_llm_enabled
 
 load_dotenv()
 
 
 genai.configure(api_key=os.getenv("GOOGLE_GENAI_API_KEY"))
 
-model = genai.GenerativeModel("gemini-2.5-flash")
+MODEL_NAME = "gemini-2.5-flash"
+if fake_llm_enabled():
+    # Offline benchmarks and load tests
+    model = FakeGeminiModel(FakeResponder.from_env())
+else:
+    model = genai.GenerativeModel(MODEL_NAME)
 
-def chat(prompt: str) -> str:
-    response = model.generate_content(prompt)
-    return response.text.strip()
+def chat(prompt: str, temperature: float = None, use_cache: bool = True, site: str = None) -> str:
+    # Deterministic (temperature=0) calls are served from the response cache when possible.
+    # Metrics are labelled with `site`, by default the calling function's name.
+    site = site or sys._getframe(1).f_code.co_name
+    params = {"temperature": temperature}
+
+    def generate() -> str:
+        generation_config = {"temperature": temperature} if temperature is not None else None
+        response = model.generate_content(prompt, generation_config=generation_config)
+        return response.text.strip()
+
+    return cached_call(MODEL_NAME, params, prompt, generate, use_cache, site)
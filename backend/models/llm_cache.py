@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+from utils.metrics import llm_cache_hits, track_llm
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_fingerprint(prompt: Any) -> Any:
+    """JSON-friendly form of a prompt: a string, or a list of chat messages."""
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, (list, tuple)):
+        return [prompt_fingerprint(p) for p in prompt]
+    if hasattr(prompt, "content"):
+        return [getattr(prompt, "type", type(prompt).__name__), prompt.content]
+    return str(prompt)
+
+
+# --- Two-tier response cache ---
+class LLMCache:
+    """
+    Response cache for deterministic LLM calls.
+
+    Keys are a hash of model + parameters + prompt. Lookups hit an in-memory
+    LRU first and fall back to a SQLite file; both tiers honour the TTL and
+    their own size limit. The disk tier is pruned every `prune_every` inserts
+    rather than on each one, so it may briefly hold a few extra rows.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 7 * 24 * 3600,
+                 db_path: Optional[str] = None, max_db_entries: int = 10000, prune_every: int = 100):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_db_entries = max_db_entries
+        self.prune_every = max(1, prune_every)
+        self._inserts = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            try:
+                self._conn = sqlite3.connect(db_path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    " key TEXT PRIMARY KEY, model TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_created_at ON llm_cache (created_at)")
+                self._prune(time.time())
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"[LLMCache] Disk tier disabled, cannot open {db_path}: {e}")
+                self._conn = None
+
+    @staticmethod
+    def key(model: str, params: dict, prompt: Any) -> str:
+        payload = json.dumps([model, params, prompt_fingerprint(prompt)], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._memory[key]
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl_seconds:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def _remember(self, key: str, value: str, created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def set(self, key: str, value: str, model: str = ""):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, model, value, now)
+                )
+                self._inserts += 1
+                if self._inserts % self.prune_every == 0:
+                    self._prune(now)
+                self._conn.commit()
+
+    def _prune(self, now: float):
+        """Drop expired rows, then the oldest ones beyond max_db_entries (both use the created_at index)."""
+        self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        if count > self.max_db_entries:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at <= ("
+                " SELECT created_at FROM llm_cache ORDER BY created_at LIMIT 1 OFFSET ?)",
+                (count - self.max_db_entries - 1,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_cache")
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "memory_entries": len(self._memory),
+            }
+
+
+def _cache_from_env() -> LLMCache:
+    default_db = os.path.join(os.path.dirname(__file__), "..", ".llm_cache.sqlite")
+    db_path = os.getenv("LLM_CACHE_DB", default_db)
+    return LLMCache(
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")),
+        ttl_seconds=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+        db_path=None if db_path.lower() in ("", "off", "none") else db_path,
+        max_db_entries=int(os.getenv("LLM_CACHE_MAX_DB_ENTRIES", "10000")),
+        prune_every=int(os.getenv("LLM_CACHE_PRUNE_EVERY", "100")),
+    )
+
+
+llm_cache = _cache_from_env()
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+
+
+def cached_call(model: str, params: dict, prompt: Any, call, use_cache: bool = True,
+                site: str = "unknown") -> str:
+    """
+    Return `call()`'s text, served from the cache when possible.
+
+    Only deterministic calls (temperature 0) are cached; `use_cache=False`
+    bypasses the cache for a single call. Calls that reach the model are
+    recorded in the LLM metrics under `site`.
+    """
+    with span(site, "llm", model=model) as s:
+        if s is not None:
+            s.args["prompt_chars"] = len(str(prompt))
+        if not (use_cache and CACHE_ENABLED and params.get("temperature") == 0):
+            value = track_llm(site, model, prompt, call)
+        else:
+            key = llm_cache.key(model, params, prompt)
+            value = llm_cache.get(key)
+            if value is not None:
+                llm_cache_hits.inc(site=site)
+                if s is not None:
+                    s.args["cached"] = True
+            else:
+                value = track_llm(site, model, prompt, call)
+                llm_cache.set(key, value, model)
+        if s is not None:
+            s.args["completion_chars"] = len(value or "")
+        return value
+
+
+def cached_invoke(llm, prompt: Any, use_cache: bool = True, site: Optional[str] = None) -> str:
+    """
+    `llm.invoke(prompt).content` for LangChain chat models, cached when the
+    model runs at temperature 0. `site` defaults to the calling function's name.
+    """
+    site = site or sys._getframe(1).f_code.co_name
+    params = {"temperature": getattr(llm, "temperature", None), "max_tokens": getattr(llm, "max_tokens", None)}
+    model = getattr(llm, "model_name", None) or type(llm).__name__
+    return cached_call(model, params, prompt, lambda: llm.invoke(prompt).content, use_cache, site)
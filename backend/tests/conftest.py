@@ -0,0 +1,42 @@
+import os
+import sys
+import shutil
+import tempfile
+
+import pytest
+
+# Everything runs offline against a scratch codebase. These have to be set
+# before the backend modules are imported, since they read them at import time.
+CODEBASE = tempfile.mkdtemp(prefix="agent-tests-")
+os.environ["AGENT_CODEBASE_DIR"] = CODEBASE
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["SEARCH_BACKEND"] = "stub"
+os.environ["LLM_CACHE_DB"] = "off"
+os.environ["FS_WATCH"] = "0"
+os.environ.setdefault("GROQ_API_KEY", "offline")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def codebase():
+    """The scratch codebase directory, emptied before each test."""
+    for name in os.listdir(CODEBASE):
+        path = os.path.join(CODEBASE, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    return CODEBASE
+
+
+def write(root: str, name: str, content: str) -> str:
+    path = os.path.join(root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(CODEBASE, ignore_errors=True)
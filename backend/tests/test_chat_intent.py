@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import uuid
+
+import pytest
+
+import main
+from agents import chat_agent
+from agents.chat_agent import chat_with_memory_with_confirmation, local_intent, sessions
+
+
+@pytest.fixture(autouse=True)
+def clear_intent_cache():
+    chat_agent._intent_cache.clear()
+
+
+def new_session() -> str:
+    return f"intent-{uuid.uuid4().hex}"
+
+
+@pytest.mark.parametrize("message", [
+    "Add a login page to app.py",
+    "please create src/components/Nav.jsx",
+    "Can you fix the bug in utils/",
+    "Update README.md with the new setup steps",
+])
+def test_imperative_verb_with_a_file_is_a_code_action(message):
+    assert local_intent(message) is True
+
+
+@pytest.mark.parametrize("message", ["hi", "Hello!", "Thanks!", "thank you so much", "ok", "good morning"])
+def test_greetings_and_thanks_are_chat(message):
+    assert local_intent(message) is False
+
+
+@pytest.mark.parametrize("message", [
+    "Make sense of this code for me",
+    "Write me a poem about code",
+    "Update me on the classes you know",
+    "Is it possible to add a login page to app.py?",
+    "What if you add tests for weather_app.py",
+    "Fix the error, e.g. the crash on startup",
+    "hello, can you help me?",
+])
+def test_everything_else_is_left_to_the_llm(message):
+    assert local_intent(message) is None
+
+
+def test_llm_decisions_are_cached(monkeypatch):
+    calls = []
+    monkeypatch.setattr(chat_agent, "is_code_action_request", lambda message: calls.append(message) or True)
+    assert chat_agent.classify_intent("What if you add tests for weather_app.py")
+    assert local_intent("what if you  add tests for weather_app.py") is True
+    assert len(calls) == 1
+
+
+def _ambiguous_setup(monkeypatch, decision: bool):
+    """The LLM intent check waits until the reply draft has started, so both really run at once."""
+    drafting = threading.Event()
+
+    def generate_reply(user_message, custom_instructions, rephrase, session_id):
+        drafting.set()
+        return user_message, "drafted reply"
+
+    def is_code_action_request(message):
+        assert drafting.wait(timeout=2)
+        return decision
+
+    monkeypatch.setattr(chat_agent, "generate_reply", generate_reply)
+    monkeypatch.setattr(chat_agent, "is_code_action_request", is_code_action_request)
+
+
+def test_ambiguous_chat_message_uses_the_concurrent_draft(monkeypatch):
+    _ambiguous_setup(monkeypatch, decision=False)
+    session_id = new_session()
+    result = chat_with_memory_with_confirmation("Make sense of this code for me", session_id=session_id)
+    assert result == {"reply": "drafted reply"}
+    assert [m.content for m in sessions.get(session_id).messages] == ["Make sense of this code for me", "drafted reply"]
+
+
+def test_ambiguous_code_action_asks_for_confirmation(monkeypatch):
+    _ambiguous_setup(monkeypatch, decision=True)
+    session_id = new_session()
+    message = "Is it possible to add a login page to app.py?"
+    result = chat_with_memory_with_confirmation(message, session_id=session_id)
+    assert result["show_execute_button"] and result["task"] == message
+    assert [m.content for m in sessions.get(session_id).messages] == [message, result["reply"]]
+
+
+@pytest.mark.parametrize("decision", [True, False])
+def test_streamed_turn_remembers_the_reply_the_client_gets(monkeypatch, decision):
+    monkeypatch.setattr(main, "classify_intent", lambda message: decision)
+    session_id = new_session()
+    req = main.ChatRequest(message="Make sense of this code for me", session_id=session_id)
+
+    async def collect():
+        return [event async for event in main.stream_chat_events(req)]
+
+    events = asyncio.run(collect())
+    done = events[-1]
+    assert done["type"] == "done" and len(events) > 1
+    assert done.get("show_execute_button", False) is decision
+    assert [m.content for m in sessions.get(session_id).messages] == [req.message, done["reply"]]
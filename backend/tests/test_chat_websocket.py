@@ -0,0 +1,25 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+
+client = TestClient(main.app)
+
+
+def test_invalid_frames_get_an_error_and_keep_the_socket_open():
+    with client.websocket_connect("/ws/chat") as ws:
+        ws.send_text("not json")
+        assert ws.receive_json()["type"] == "error"
+
+        ws.send_text(json.dumps({"custom_instructions": "no message field"}))
+        error = ws.receive_json()
+        assert error["type"] == "error"
+        assert "message" in error["detail"]
+
+        ws.send_text(json.dumps({"message": "What is a tuple?", "session_id": "ws-test"}))
+        events = []
+        while not events or events[-1]["type"] != "done":
+            events.append(ws.receive_json())
+        assert all(e["type"] == "token" for e in events[:-1])
+        assert events[-1]["reply"] == "".join(e["content"] for e in events[:-1])
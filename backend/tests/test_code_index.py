@@ -0,0 +1,90 @@
+from conftest import write
+from utils.code_index import CodeIndex, chunk_file, estimate_tokens, tokenize
+from utils.codebase_snapshot import CodebaseSnapshot
+
+
+def test_tokenize_splits_identifiers():
+    assert tokenize("parseHTTPRequest_v2") == ["parsehttprequest_v2", "parse", "http", "request", "v", "2"]
+    assert tokenize("x = 1") == ["x"]
+
+
+def test_python_files_are_chunked_by_top_level_definition():
+    code = "import os\n\n@decorator\ndef first():\n    return 1\n\nclass Second:\n    pass\n\nVALUE = 2\n"
+    chunks = chunk_file("mod.py", code)
+    assert [(c.name, c.start, c.end) for c in chunks] == [
+        ("first", 3, 5), ("Second", 7, 8), ("<module>", 1, 10),
+    ]
+    assert chunks[0].text.startswith("@decorator")
+
+
+def test_unparseable_and_other_files_use_line_windows():
+    code = "".join(f"line {i}\n" for i in range(130))
+    chunks = chunk_file("notes.txt", code)
+    assert [(c.start, c.end) for c in chunks] == [(1, 60), (61, 120), (121, 130)]
+    assert [c.start for c in chunk_file("broken.py", "def (:\n")] == [1]
+
+
+def test_search_ranks_the_matching_function_first(codebase):
+    write(codebase, "orders.py", "def parse_order(raw):\n    return raw.split(',')\n\ndef unrelated():\n    pass\n")
+    write(codebase, "users.py", "def load_user(uid):\n    return {'id': uid}\n")
+    index = CodeIndex(CodebaseSnapshot())
+    results = index.search("parse the order")
+    assert results[0][1].name == "parse_order"
+    assert all(chunk.name != "load_user" for _, chunk in results)
+
+
+def test_render_context_returns_everything_when_it_fits(codebase):
+    write(codebase, "a.py", "x = 1\n")
+    snapshot = CodebaseSnapshot()
+    assert CodeIndex(snapshot).render_context("x", 1000) == snapshot.summary()
+
+
+def test_render_context_packs_included_files_then_excerpts(codebase):
+    write(codebase, "target.py", "def edit_me():\n    return 1\n")
+    write(codebase, "helpers.py", "def format_total(x):\n    return x\n\n" + "# filler\n" * 400)
+    write(codebase, "other.py", "def nothing_relevant():\n    pass\n" + "# filler\n" * 400)
+    snapshot = CodebaseSnapshot()
+    budget = estimate_tokens(snapshot.summary()) // 2
+    context = CodeIndex(snapshot).render_context("format_total", budget, include_files=["target.py"])
+
+    assert context.startswith("---\nFilename: target.py\n")
+    assert "Filename: helpers.py (excerpts)" in context
+    assert "# lines 1-2\ndef format_total" in context
+    assert "Other files in the codebase (not shown): other.py" in context
+    assert estimate_tokens(context) <= budget + 20
+
+
+def test_index_follows_file_changes(codebase):
+    write(codebase, "a.py", "def alpha():\n    pass\n")
+    index = CodeIndex(CodebaseSnapshot())
+    assert index.search("alpha")
+    write(codebase, "a.py", "def beta():\n    pass\n\n")
+    assert not index.search("alpha")
+    assert index.search("beta")[0][1].name == "beta"
+
+
+def test_render_outline_packs_the_most_relevant_outlines(codebase):
+    write(codebase, "billing.py", "def charge_card(amount):\n    return amount\n" + "# filler\n" * 10)
+    for i in range(30):
+        write(codebase, f"mod{i:02d}.py", "".join(f"def helper_{i}_{j}():\n    pass\n" for j in range(20)))
+    snapshot = CodebaseSnapshot()
+    index = CodeIndex(snapshot)
+    assert index.render_outline("anything", 10 ** 6) == snapshot.outline_summary()
+
+    budget = estimate_tokens(snapshot.outline_summary()) // 4
+    outline = index.render_outline("charge the card", budget)
+    assert outline.startswith("---\nFilename: billing.py (outline)\n")
+    assert "Other files in the codebase (not shown): mod00.py" in outline
+    assert estimate_tokens(outline) <= budget
+
+    tight = index.render_outline("charge the card", 60)
+    assert estimate_tokens(tight) <= 60
+    assert tight.rstrip().endswith("more")
+
+
+def test_render_context_keeps_the_file_list_within_budget(codebase):
+    for i in range(200):
+        write(codebase, f"module_with_a_long_name_{i:03d}.py", f"def f{i}():\n    pass\n")
+    context = CodeIndex(CodebaseSnapshot()).render_context("nothing matches", 300)
+    assert estimate_tokens(context) <= 300
+    assert context.rstrip().endswith("more")
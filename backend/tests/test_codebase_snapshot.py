@@ -0,0 +1,69 @@
+import os
+
+from conftest import write
+from utils.codebase_snapshot import CodebaseSnapshot
+
+
+def test_refresh_tracks_added_modified_and_removed_files(codebase):
+    write(codebase, "a.py", "x = 1\n")
+    snapshot = CodebaseSnapshot()
+    assert snapshot.refresh() is True
+    assert snapshot.files() == ["a.py"]
+    assert snapshot.refresh() is False
+
+    write(codebase, "b.py", "y = 2\n")
+    assert snapshot.refresh() is True
+    assert snapshot.files() == ["a.py", "b.py"]
+
+    path = write(codebase, "a.py", "x = 10\n")
+    os.utime(path, ns=(1, 1))  # make sure the stat fingerprint moves
+    assert snapshot.refresh() is True
+    assert "x = 10" in snapshot.get("a.py").content
+
+    os.remove(os.path.join(codebase, "b.py"))
+    assert snapshot.refresh() is True
+    assert snapshot.files() == ["a.py"]
+
+
+def test_touch_without_content_change_keeps_version(codebase):
+    path = write(codebase, "a.py", "x = 1\n")
+    snapshot = CodebaseSnapshot()
+    snapshot.refresh()
+    version, entry = snapshot.version, snapshot.get("a.py")
+
+    os.utime(path, ns=(1, 1))
+    assert snapshot.refresh() is False
+    assert snapshot.version == version
+    assert snapshot.get("a.py") is entry
+    assert entry.mtime_ns == 1
+
+
+def test_summary_is_rebuilt_only_after_changes(codebase):
+    write(codebase, "a.py", "x = 1\n")
+    snapshot = CodebaseSnapshot()
+    first = snapshot.summary()
+    assert first == "---\nFilename: a.py\nx = 1\n\n"
+    assert snapshot.summary() is first
+
+    write(codebase, "b.js", "export function f() {}\n")
+    summary = snapshot.summary()
+    assert summary is not first
+    assert summary.index("Filename: a.py") < summary.index("Filename: b.js")
+
+
+def test_outline_summary_and_invalidate(codebase):
+    write(codebase, "a.py", 'def f(x):\n    """Double it."""\n    return x * 2\n')
+    snapshot = CodebaseSnapshot()
+    outline = snapshot.outline_summary()
+    assert "Filename: a.py (outline)" in outline
+    assert "def f(x)  [L1-3]" in outline
+    assert "return x * 2" not in outline
+
+    snapshot.invalidate("a.py")
+    assert snapshot.refresh() is True
+
+
+def test_subdirectories_are_not_tracked(codebase):
+    write(codebase, "pkg/inner.py", "z = 3\n")
+    write(codebase, "top.py", "z = 4\n")
+    assert CodebaseSnapshot().files() == ["top.py"]
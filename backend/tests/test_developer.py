@@ -0,0 +1,152 @@
+import json
+import time
+
+import pytest
+
+from agents import developer
+from agents.developer import (
+    ToolStep, build_step_chains, execute_steps, llm_modify, run_chain, validate_step_batch,
+)
+from conftest import write
+from utils.workspace import WorkspaceOverlay
+
+
+def scripted_chat(monkeypatch, *replies):
+    """Make the developer's LLM answer with `replies` in order, recording the prompts."""
+    prompts, queue = [], list(replies)
+    monkeypatch.setattr(developer, "chat", lambda prompt, **kwargs: prompts.append(prompt) or queue.pop(0))
+    return prompts
+
+
+# --- llm_modify ---
+def test_llm_modify_applies_search_replace_hunks(codebase, monkeypatch):
+    write(codebase, "app.py", "max = 10\nx = 1\n")
+    prompts = scripted_chat(monkeypatch, "<<<<<<< SEARCH\nx = 1\n=======\ny = 2\n>>>>>>> REPLACE")
+    ws = WorkspaceOverlay(codebase)
+    assert llm_modify("app.py", "rename x", ws) == "[LLM_MODIFY] app.py: applied 1 hunk(s)"
+    assert ws.read_lines("app.py") == ["max = 10\n", "y = 2\n"]
+    assert len(prompts) == 1 and "x = 1" in prompts[0]
+
+
+def test_llm_modify_rewrites_when_hunks_do_not_apply(codebase, monkeypatch):
+    write(codebase, "app.py", "max = 10\n")
+    prompts = scripted_chat(monkeypatch,
+                            "<<<<<<< SEARCH\nx = 1\n=======\ny = 2\n>>>>>>> REPLACE",
+                            "```python\nmax = 20\n```")
+    ws = WorkspaceOverlay(codebase)
+    assert llm_modify("app.py", "raise the limit", ws) == "[LLM_MODIFY] app.py: rewrote file"
+    assert ws.read_lines("app.py") == ["max = 20\n"]
+    assert "complete new contents" in prompts[1]
+
+
+def test_llm_modify_rewrites_when_there_are_no_edit_blocks(codebase, monkeypatch):
+    write(codebase, "app.py", "a = 1\n")
+    scripted_chat(monkeypatch, "Sure! Here is the change.", "a = 2")
+    ws = WorkspaceOverlay(codebase)
+    assert llm_modify("app.py", "bump a", ws) == "[LLM_MODIFY] app.py: rewrote file"
+    assert ws.read_lines("app.py") == ["a = 2\n"]
+
+
+def test_llm_modify_writes_new_files_in_one_call(codebase, monkeypatch):
+    prompts = scripted_chat(monkeypatch, "print('hi')")
+    ws = WorkspaceOverlay(codebase)
+    assert llm_modify("new.py", "say hi", ws) == "[LLM_MODIFY] new.py: rewrote file"
+    assert ws.read_lines("new.py") == ["print('hi')\n"]
+    assert len(prompts) == 1
+
+
+# --- Chains and execution order ---
+def step(file, tool="read", **args):
+    return ToolStep(file=file, tool=tool, args=args)
+
+
+def test_build_step_chains_groups_by_normalized_file_in_plan_order():
+    steps = [step("a.py"), step("b.py"), step("./a.py", "delete"), step("c/../b.py", "write", content="x")]
+    chains = build_step_chains(steps)
+    assert [[index for index, _ in chain] for chain in chains] == [[0, 2], [1, 3]]
+
+
+def test_consecutive_line_edits_share_the_original_numbering(codebase):
+    write(codebase, "a.py", "one\ntwo\nthree\n")
+    ws = WorkspaceOverlay(codebase)
+    chain = list(enumerate([
+        step("a.py", "apply_change", action="insert", line=0, new_code="zero"),
+        step("a.py", "apply_change", action="modify", line=3, new_code="THREE"),  # still "three"
+        step("a.py", "read"),
+        step("a.py", "apply_change", action="delete", line=1),  # numbering after the read: "zero"
+    ]))
+    logs = run_chain(chain, ws)
+    assert [index for index, _ in logs] == [0, 1, 2, 3]
+    assert logs[2][1] == "[READ] a.py has 4 lines"
+    assert ws.read_lines("a.py") == ["one\n", "two\n", "THREE\n"]
+
+
+def test_logs_come_back_in_plan_order(codebase, monkeypatch):
+    finished = []
+
+    def perform(step, workspace):
+        if step.file == "slow.py":
+            time.sleep(0.05)
+        finished.append(step.file)
+        return f"done {step.file}"
+
+    monkeypatch.setattr(developer, "perform_tool_action", perform)
+    steps = [step("slow.py"), step("fast.py"), step("slow.py")]
+    result = execute_steps({"steps": steps, "workspace": WorkspaceOverlay(codebase), "logs": ["earlier"]})
+    assert finished[0] == "fast.py"
+    assert result["logs"] == ["earlier", "done slow.py", "done fast.py", "done slow.py"]
+
+
+def test_steps_are_validated_before_they_are_grouped(codebase, monkeypatch):
+    # The validator moves the second step onto a.py; it must then run in a.py's chain, after step one
+    monkeypatch.setattr(developer, "BATCH_VALIDATION_SIZE", 0)
+    monkeypatch.setattr(developer, "validate_step", lambda s, ws=None: s.model_copy(update={"file": "a.py"}))
+    steps = [step("a.py", "write", content="one\n"), step("typo.py", "apply_change", action="modify", line=1,
+                                                            new_code="ONE")]
+    ws = WorkspaceOverlay(codebase)
+    result = developer.developer_graph.invoke({"steps": steps, "workspace": ws})
+    assert [s.file for s in result["steps"]] == ["a.py", "a.py"]
+    assert ws.read_lines("a.py") == ["ONE\n"]
+    assert not ws.touched("typo.py")
+
+
+# --- Batch validation fallbacks ---
+def test_batch_validation_corrects_every_step(codebase, monkeypatch):
+    steps = [step("a.py"), step("b.py")]
+    corrected = [{"file": "a.py", "tool": "read", "args": {}}, {"file": "src/b.py", "tool": "read", "args": {}}]
+    prompts = scripted_chat(monkeypatch, "```json\n" + json.dumps(corrected) + "\n```")
+    assert [s.file for s in validate_step_batch(steps)] == ["a.py", "src/b.py"]
+    assert len(prompts) == 1
+
+
+@pytest.mark.parametrize("reply", [
+    json.dumps([{"file": "a.py", "tool": "read", "args": {}}]),  # wrong length
+    json.dumps({"file": "a.py", "tool": "read", "args": {}}),    # not a list
+    "I could not validate these steps",                          # not JSON
+])
+def test_bad_batch_replies_fall_back_to_one_call_per_step(codebase, monkeypatch, reply):
+    steps = [step("a.py"), step("b.py")]
+    single = [json.dumps({"file": f"fixed_{name}", "tool": "read", "args": {}}) for name in ("a.py", "b.py")]
+    prompts = scripted_chat(monkeypatch, reply, *single)
+    assert [s.file for s in validate_step_batch(steps)] == ["fixed_a.py", "fixed_b.py"]
+    assert len(prompts) == 3 and "Planned step:" in prompts[1]
+
+
+def test_one_unparseable_item_is_validated_alone(codebase, monkeypatch):
+    steps = [step("a.py"), step("b.py"), step("c.py")]
+    batch = [{"file": "a.py", "tool": "read", "args": {}}, {"tool": "read"},
+             {"file": "c.py", "tool": "read", "args": {}}]
+    prompts = scripted_chat(monkeypatch, json.dumps(batch), "still not a step")
+    validated = validate_step_batch(steps)
+    assert validated == steps  # the lone re-validation failed too, so b.py keeps its original form
+    assert len(prompts) == 2 and "'file': 'b.py'" in prompts[1]
+
+
+def test_validate_all_steps_keeps_plan_order_across_chunks(codebase, monkeypatch):
+    monkeypatch.setattr(developer, "BATCH_VALIDATION_SIZE", 2)
+    monkeypatch.setattr(developer, "validate_step_batch",
+                        lambda chunk, ws=None: [s.model_copy(update={"args": {"seen": True}}) for s in chunk])
+    steps = [step(f"f{i}.py") for i in range(5)]
+    validated = developer.validate_all_steps({"steps": steps})["steps"]
+    assert [s.file for s in validated] == [s.file for s in steps]
+    assert all(s.args == {"seen": True} for s in validated)
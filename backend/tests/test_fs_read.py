@@ -0,0 +1,122 @@
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from conftest import write
+from utils import file_ops
+from utils.file_cache import FileContentCache, file_etag
+from utils.file_ops import _parse_range, router
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=5-", (5, 99)),          # open-ended
+    ("bytes=-10", (90, 99)),        # suffix: the last 10 bytes
+    ("bytes=-500", (0, 99)),        # suffix longer than the file
+    ("bytes=90-500", (90, 99)),     # end clamped to the file
+    ("bytes=99-99", (99, 99)),
+    (None, None),
+    ("", None),
+    ("items=0-5", None),            # unknown unit: serve everything
+    ("bytes=0-1,5-6", None),        # multi-range is not supported
+])
+def test_parse_range(header, expected):
+    assert _parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=150-200", "bytes=10-5", "bytes=-0", "bytes=a-b", "bytes=-"])
+def test_parse_range_unsatisfiable_or_malformed(header):
+    with pytest.raises(ValueError):
+        _parse_range(header, 100)
+
+
+def test_parse_range_on_an_empty_file():
+    with pytest.raises(ValueError):
+        _parse_range("bytes=0-", 0)
+    with pytest.raises(ValueError):
+        _parse_range("bytes=-5", 0)
+
+
+def test_file_cache_serves_only_matching_stats(tmp_path):
+    path = str(tmp_path / "f.txt")
+    with open(path, "w") as f:
+        f.write("abc")
+    cache = FileContentCache(max_entries=2, max_file_bytes=10)
+    st = os.stat(path)
+    assert cache.read(path, st) == b"abc"
+    assert cache.get(path, st) == b"abc"
+
+    with open(path, "w") as f:
+        f.write("abcd")
+    assert cache.get(path, os.stat(path)) is None  # stale entry is never served
+
+    big = os.stat(path)
+    small_cache = FileContentCache(max_file_bytes=3)
+    assert not small_cache.cacheable(big)
+
+
+def test_file_cache_lru_and_directory_invalidation(tmp_path):
+    cache = FileContentCache(max_entries=2)
+    paths = []
+    for name in ("d/a", "d/b", "c"):
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(name)
+        paths.append(str(path))
+        cache.read(str(path), os.stat(path))
+    assert cache.stats()["entries"] == 2
+    assert cache.get(paths[0], os.stat(paths[0])) is None  # evicted
+
+    cache.invalidate(str(tmp_path / "d"))
+    assert cache.get(paths[1], os.stat(paths[1])) is None
+    assert cache.get(paths[2], os.stat(paths[2])) == b"c"
+
+
+def test_read_sends_validators_and_honours_them(codebase):
+    path = write(codebase, "a.txt", "hello world")
+    resp = client.get("/fs/read", params={"path": "a.txt"})
+    assert resp.status_code == 200 and resp.text == "hello world"
+    etag = resp.headers["etag"]
+    assert etag == file_etag(os.stat(path))
+
+    assert client.get("/fs/read", params={"path": "a.txt"}, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/fs/read", params={"path": "a.txt"},
+                      headers={"If-Modified-Since": resp.headers["last-modified"]}).status_code == 304
+    assert client.get("/fs/read", params={"path": "a.txt"}, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_read_ranges(codebase):
+    write(codebase, "a.txt", "0123456789")
+    resp = client.get("/fs/read", params={"path": "a.txt"}, headers={"Range": "bytes=-3"})
+    assert resp.status_code == 206
+    assert resp.text == "789"
+    assert resp.headers["content-range"] == "bytes 7-9/10"
+
+    resp = client.get("/fs/read", params={"path": "a.txt"}, headers={"Range": "bytes=20-"})
+    assert resp.status_code == 416
+    assert resp.headers["content-range"] == "bytes */10"
+
+    # If-Range with a stale validator ignores the range and sends the whole file
+    resp = client.get("/fs/read", params={"path": "a.txt"}, headers={"Range": "bytes=0-1", "If-Range": '"old"'})
+    assert resp.status_code == 200 and resp.text == "0123456789"
+
+
+def test_large_files_are_streamed(codebase, monkeypatch):
+    monkeypatch.setattr(file_ops, "READ_CHUNK_SIZE", 4)
+    monkeypatch.setattr(file_ops.file_cache, "max_file_bytes", 8)
+    write(codebase, "big.txt", "x" * 10 + "y" * 10)
+    resp = client.get("/fs/read", params={"path": "big.txt"}, headers={"Range": "bytes=8-13"})
+    assert resp.status_code == 206
+    assert resp.text == "xxyyyy"
+    assert resp.headers["content-length"] == "6"
+
+
+def test_missing_files_and_traversal(codebase):
+    assert client.get("/fs/read", params={"path": "nope.txt"}).status_code == 404
+    assert client.get("/fs/read", params={"path": "../../etc/passwd"}).status_code == 403
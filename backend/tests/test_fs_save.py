@@ -0,0 +1,82 @@
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from conftest import write
+from utils.file_cache import file_etag
+from utils.file_ops import TextEdit, apply_text_edits, router
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+
+def test_offset_edits_apply_in_sequence():
+    text = "hello world"
+    edits = [TextEdit(offset=0, length=5, text="goodbye"), TextEdit(offset=8, length=5, text="moon")]
+    # The second edit is positioned against "goodbye world"
+    assert apply_text_edits(text, edits) == "goodbye moon"
+
+
+def test_overlapping_edits_see_the_previous_result():
+    edits = [TextEdit(offset=2, length=3, text="XY"), TextEdit(offset=1, length=3, text="-")]
+    assert apply_text_edits("abcdefg", edits) == "a-fg"
+
+
+def test_offsets_count_utf16_code_units():
+    # Monaco counts the emoji as two units, so offset 2 is the "a"
+    assert apply_text_edits("😀abc", [TextEdit(offset=2, length=1, text="X")]) == "😀Xbc"
+    assert apply_text_edits("😀abc", [TextEdit(offset=0, length=2, text="")]) == "abc"
+    assert apply_text_edits("a😀b", [TextEdit(offset=3, length=1, text="c")]) == "a😀c"
+
+
+def test_columns_count_utf16_code_units():
+    edit = TextEdit(start_line=2, start_column=3, end_line=2, end_column=4, text="X")
+    assert apply_text_edits("x\n😀abc\n", [edit]) == "x\n😀Xbc\n"
+
+
+@pytest.mark.parametrize("edit", [
+    TextEdit(offset=1, length=1),            # splits the surrogate pair
+    TextEdit(offset=4, length=2),            # past the end
+    TextEdit(offset=-1, length=1),
+    TextEdit(offset=0, length=-1),
+    TextEdit(start_line=3, start_column=1, end_line=3, end_column=1),
+    TextEdit(start_line=1, start_column=9, end_line=1, end_column=9),
+    TextEdit(start_line=1, start_column=3, end_line=1, end_column=1),
+    TextEdit(text="no position"),
+])
+def test_invalid_edits_are_rejected(edit):
+    with pytest.raises(ValueError):
+        apply_text_edits("😀abc", [edit])
+
+
+def test_save_with_edits_needs_a_matching_base_version(codebase):
+    path = write(codebase, "app.py", "x = 1\n")
+    etag = file_etag(os.stat(path))
+    edits = [{"offset": 4, "length": 1, "text": "2"}]
+
+    assert client.post("/fs/save", json={"path": "app.py", "edits": edits}).status_code == 428
+    stale = client.post("/fs/save", json={"path": "app.py", "edits": edits, "base_etag": '"stale"'})
+    assert stale.status_code == 409
+    assert stale.json()["detail"]["etag"] == etag
+
+    resp = client.post("/fs/save", json={"path": "app.py", "edits": edits}, headers={"If-Match": etag})
+    assert resp.status_code == 200
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "x = 2\n"
+    assert resp.json()["etag"] == file_etag(os.stat(path))
+
+    # The old version is now stale
+    assert client.post("/fs/save", json={"path": "app.py", "edits": edits, "base_etag": etag}).status_code == 409
+
+
+def test_save_rejects_bad_edits_without_writing(codebase):
+    path = write(codebase, "app.py", "x = 1\n")
+    etag = file_etag(os.stat(path))
+    resp = client.post("/fs/save", json={"path": "app.py", "base_etag": etag,
+                                         "edits": [{"offset": 50, "length": 1, "text": "y"}]})
+    assert resp.status_code == 400
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "x = 1\n"
@@ -0,0 +1,106 @@
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from conftest import write
+from utils import file_ops
+from utils.file_ops import router
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+
+def make_tree(root):
+    for name in ("a.py", "b/c.py", "b/d/e.py", "b/f.py", "g.py", "node_modules/x.js", ".tmp-123a.py"):
+        write(root, name, name)
+
+
+def get_tree(**params):
+    resp = client.get("/fs/tree", params=params)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def paths(body):
+    return [e["path"] for e in body["entries"]]
+
+
+def test_depth_ignore_and_entry_fields(codebase):
+    make_tree(codebase)
+    assert paths(get_tree(depth=1)) == ["a.py", "b", "g.py"]
+    assert paths(get_tree(depth=3)) == ["a.py", "b", "b/c.py", "b/d", "b/d/e.py", "b/f.py", "g.py"]
+    assert paths(get_tree(depth=3, ignore="d,*.py")) == ["b"]
+
+    entries = {e["path"]: e for e in get_tree(path="b", depth=2)["entries"]}
+    assert entries["d"]["type"] == "folder" and entries["d"]["size"] is None
+    assert entries["d/e.py"] == {**entries["d/e.py"], "type": "file", "size": len("b/d/e.py"), "depth": 2}
+
+
+def test_pages_cover_the_walk_exactly_once(codebase):
+    make_tree(codebase)
+    full = paths(get_tree(depth=3))
+    seen, cursor, pages = [], "", 0
+    while True:
+        body = get_tree(depth=3, limit=2, cursor=cursor)
+        seen += paths(body)
+        pages += 1
+        if not body["next_cursor"]:
+            break
+        assert body["version"] is None or pages == 1
+        cursor = body["next_cursor"]
+    assert seen == full
+    assert pages == 4
+
+
+def test_a_page_stops_scanning_after_its_limit(codebase, monkeypatch):
+    make_tree(codebase)
+    yielded = []
+    walk = file_ops._walk_tree
+
+    def counting_walk(*args):
+        for item in walk(*args):
+            yielded.append(item[0])
+            yield item
+
+    monkeypatch.setattr(file_ops, "_walk_tree", counting_walk)
+    body = get_tree(depth=3, limit=2)
+    assert paths(body) == ["a.py", "b"]
+    assert body["next_cursor"] == "b"
+    assert len(set(yielded)) == 3  # the page plus one entry to know there is more
+
+
+def test_version_tracks_added_removed_renamed_and_rewritten_entries(codebase):
+    make_tree(codebase)
+    version = get_tree(depth=3)["version"]
+    assert get_tree(depth=3, if_version=version) == {
+        "path": "", "version": version, "unchanged": True, "entries": [], "next_cursor": None,
+    }
+    assert get_tree(depth=1)["version"] != version  # different listing, different version
+
+    write(codebase, "b/d/new.py", "")
+    changed = get_tree(depth=3, if_version=version)
+    assert changed["unchanged"] is False and "b/d/new.py" in paths(changed)
+
+    version = changed["version"]
+    os.rename(os.path.join(codebase, "b/f.py"), os.path.join(codebase, "b/f2.py"))
+    assert get_tree(depth=3)["version"] != version
+
+    # An in-place rewrite keeps the directory's mtime but changes the file's size and mtime
+    version = get_tree(depth=3)["version"]
+    with open(os.path.join(codebase, "a.py"), "w") as f:
+        f.write("a much longer body than before\n")
+    changed = get_tree(depth=3, if_version=version)
+    assert changed["unchanged"] is False
+    assert next(e for e in changed["entries"] if e["path"] == "a.py")["size"] == 31
+
+    # A new file below the listed depth does not change a shallow listing
+    shallow = get_tree(depth=1)["version"]
+    write(codebase, "b/d/deeper.py", "")
+    assert get_tree(depth=1)["version"] == shallow
+
+
+def test_missing_folder(codebase):
+    assert client.get("/fs/tree", params={"path": "nope"}).status_code == 404
+    assert client.get("/fs/list", params={"path": "."}).status_code == 200
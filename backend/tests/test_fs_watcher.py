@@ -0,0 +1,110 @@
+import os
+import time
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from conftest import write
+from utils import fs_watcher as fs_watcher_module
+from utils.file_ops import TEMP_FILE_PATTERN
+from utils.fs_watcher import (
+    ADDED, MODIFIED, DELETED, FileWatcher, PollingSource, fs_watcher, invalidate_caches, merge_change,
+)
+
+client = TestClient(main.app)
+
+
+@pytest.mark.parametrize("previous, current, merged", [
+    (None, ADDED, ADDED),
+    (None, DELETED, DELETED),
+    (ADDED, MODIFIED, ADDED),
+    (ADDED, DELETED, None),
+    (MODIFIED, MODIFIED, MODIFIED),
+    (MODIFIED, DELETED, DELETED),
+    (DELETED, ADDED, MODIFIED),
+    (DELETED, DELETED, DELETED),
+])
+def test_merge_change(previous, current, merged):
+    assert merge_change(previous, current) == merged
+
+
+def test_merge_drops_paths_that_cancel_out():
+    pending = {}
+    FileWatcher._merge(pending, {"new.py": ADDED, "old.py": MODIFIED})
+    FileWatcher._merge(pending, {"new.py": DELETED, "old.py": DELETED})
+    assert pending == {"old.py": DELETED}
+
+
+def test_dispatch_bumps_version_and_notifies_listeners():
+    watcher = FileWatcher(PollingSource("/nonexistent", []))
+    received = []
+    watcher.add_listener(received.append)
+    watcher.add_listener(lambda changes: 1 / 0)  # a failing listener does not stop the others
+    event = watcher.dispatch({"b.py": MODIFIED, "a.py": ADDED})
+    assert event["version"] == watcher.version == 1
+    assert received == [[{"path": "a.py", "change": ADDED}, {"path": "b.py", "change": MODIFIED}]]
+
+
+def test_invalidate_caches_only_touches_the_snapshot_for_top_level_files(monkeypatch):
+    dropped, snapshot_dropped = [], []
+    monkeypatch.setattr(fs_watcher_module.file_cache, "invalidate", dropped.append)
+    monkeypatch.setattr(fs_watcher_module.codebase_snapshot, "invalidate", snapshot_dropped.append)
+    invalidate_caches([{"path": "app.py", "change": MODIFIED}, {"path": "pkg/mod.py", "change": DELETED}])
+    assert dropped == [os.path.join(fs_watcher_module.BASE_DIR, "app.py"),
+                       os.path.join(fs_watcher_module.BASE_DIR, "pkg/mod.py")]
+    assert snapshot_dropped == ["app.py"]
+
+
+def test_polling_source_ignores_temp_files(tmp_path):
+    root = str(tmp_path)
+    write(root, "app.py", "x = 1\n")
+    write(root, "pkg/.tmp-abc123.py", "partial")
+    assert TEMP_FILE_PATTERN in fs_watcher.source.ignore
+    source = PollingSource(root, fs_watcher.source.ignore, interval=0.02)
+    assert set(source._scan()) == {"app.py", "pkg"}
+
+    batches, stop = [], threading.Event()
+    thread = threading.Thread(target=source.run, args=(batches.append, stop), daemon=True)
+    thread.start()
+    try:
+        time.sleep(0.05)
+        write(root, ".tmp-def456.py", "partial")
+        write(root, "new.py", "y = 2\n")
+        deadline = time.monotonic() + 2
+        while not batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        stop.set()
+        thread.join(timeout=2)
+    assert batches and batches[0] == {"new.py": ADDED}
+
+
+def _wait_for_subscriber(before: int):
+    deadline = time.monotonic() + 2
+    while len(fs_watcher._subscribers) <= before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(fs_watcher._subscribers) > before
+
+
+@pytest.mark.parametrize("path", [".github", "./.github/", "/.github"])
+def test_fs_websocket_filters_by_normalized_prefix(path):
+    before = len(fs_watcher._subscribers)
+    with client.websocket_connect(f"/ws/fs?path={path}") as ws:
+        assert ws.receive_json()["type"] == "hello"
+        _wait_for_subscriber(before)
+        fs_watcher.dispatch({".github/workflows/ci.yml": ADDED, "github.py": MODIFIED, ".githubx": ADDED})
+        fs_watcher.dispatch({".github": MODIFIED})
+        first, second = ws.receive_json(), ws.receive_json()
+    assert first["changes"] == [{"path": ".github/workflows/ci.yml", "change": ADDED}]
+    assert second["changes"] == [{"path": ".github", "change": MODIFIED}]
+
+
+def test_fs_websocket_without_path_gets_everything():
+    before = len(fs_watcher._subscribers)
+    with client.websocket_connect("/ws/fs?path=.") as ws:
+        ws.receive_json()
+        _wait_for_subscriber(before)
+        fs_watcher.dispatch({"a.py": ADDED, "b/c.py": DELETED})
+        assert [c["path"] for c in ws.receive_json()["changes"]] == ["a.py", "b/c.py"]
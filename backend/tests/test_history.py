@@ -0,0 +1,105 @@
+from langchain.schema import HumanMessage, AIMessage, SystemMessage
+
+from agents.history import HistoryManager
+from agents.session_store import SessionStore
+
+
+def summarize(summary: str, new_lines: str) -> str:
+    return f"{summary} | {new_lines}" if summary else new_lines
+
+
+def add_turns(store: SessionStore, count: int, start: int = 0, session_id: str = "s"):
+    for i in range(start, start + count):
+        store.append(session_id, HumanMessage(content=f"q{i}"), AIMessage(content=f"a{i}"))
+
+
+def contents(messages):
+    return [m.content for m in messages]
+
+
+def test_messages_stay_in_the_window_until_folded():
+    store = SessionStore(keep_unfolded=True)
+    history = HistoryManager(store, summarize, max_turns=1)
+    add_turns(store, 3)
+    # Compaction has not run yet: nothing may fall out of the prompt
+    assert contents(history.window("s")) == ["q0", "a0", "q1", "a1", "q2", "a2"]
+
+    history._compact("s")
+    window = history.window("s")
+    assert isinstance(window[0], SystemMessage)
+    assert "User: q0" in window[0].content and "Assistant: a1" in window[0].content
+    assert contents(window[1:]) == ["q2", "a2"]
+    assert "q2" not in history.window_as_text("s").split("\n", 1)[0]
+
+
+def test_token_budget_limits_what_stays_verbatim():
+    store = SessionStore()
+    history = HistoryManager(store, summarize, max_turns=6, token_budget=10)
+    store.append("s", HumanMessage(content="x" * 400), AIMessage(content="short"))
+    history._compact("s")
+    assert contents(history.window("s")[1:]) == ["short"]
+
+
+def test_unfolded_messages_are_not_trimmed_before_compaction():
+    store = SessionStore(max_messages=4, keep_unfolded=True)
+    history = HistoryManager(store, summarize, max_turns=1)
+    add_turns(store, 3)
+    session = store.get("s")
+    assert len(session.messages) == 6 and session.offset == 0
+
+    history._compact("s")
+    assert session.folded == 4
+    assert "q0" in session.summary and "a1" in session.summary
+
+    add_turns(store, 1, start=3)  # now the folded messages can go
+    assert contents(session.messages) == ["q2", "a2", "q3", "a3"]
+    assert session.offset == 4
+    history._compact("s")
+    assert "q2" in session.summary and "q3" not in session.summary
+    assert contents(history.window("s")[1:]) == ["q3", "a3"]
+
+
+def test_hard_cap_drops_unfolded_messages_when_compaction_falls_behind():
+    store = SessionStore(max_messages=2, keep_unfolded=True)
+    add_turns(store, 3)
+    session = store.get("s")
+    assert contents(session.messages) == ["q1", "a1", "q2", "a2"]
+    assert session.offset == 2
+
+
+def test_compaction_after_a_gap_starts_at_the_oldest_kept_message():
+    store = SessionStore(max_messages=3)
+    history = HistoryManager(store, summarize, max_turns=1)
+    add_turns(store, 3)  # without keep_unfolded the oldest messages are simply trimmed
+    history._compact("s")
+    session = store.get("s")
+    assert session.offset == 3
+    assert session.summary == "Assistant: a1"
+    assert session.folded == 4
+
+
+def test_compaction_in_flight_does_not_resurrect_a_reset_session(tmp_path):
+    import threading
+    from agents.session_store import SQLiteSessionBackend
+
+    store = SessionStore(max_messages=10, backend=SQLiteSessionBackend(str(tmp_path / "s.sqlite")),
+                         keep_unfolded=True)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_summarize(summary, new_lines):
+        started.set()
+        release.wait(timeout=2)
+        return summarize(summary, new_lines)
+
+    history = HistoryManager(store, slow_summarize, max_turns=1)
+    add_turns(store, 3)
+    history.schedule_compaction("s")
+    assert started.wait(timeout=2)
+    store.reset("s")
+    add_turns(store, 2, start=10)  # the new conversation
+    release.set()
+    history._executor.submit(lambda: None).result()  # wait for the compaction to finish
+
+    reloaded = SessionStore(max_messages=10, backend=store.backend, keep_unfolded=True)
+    assert (reloaded.get("s").summary, reloaded.get("s").folded) == ("", 0)
+    assert contents(HistoryManager(reloaded, summarize).window("s")) == ["q10", "a10", "q11", "a11"]
@@ -0,0 +1,74 @@
+import time
+import threading
+
+import pytest
+
+from utils.job_queue import JobQueue, QueueFullError
+
+
+def wait_for(queue: JobQueue, job_id: str, condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if condition(job):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not reach the expected state")
+
+
+def wait_done(queue: JobQueue, job_id: str):
+    return wait_for(queue, job_id, lambda job: job.done)
+
+
+def test_job_result_and_failure():
+    queue = JobQueue(max_workers=1)
+    ok = queue.submit(lambda a, b: a + b, 2, 3, name="add")
+    bad = queue.submit(lambda: 1 / 0, name="boom")
+    assert wait_done(queue, ok.id).result == 5
+    failed = wait_done(queue, bad.id)
+    assert failed.status == "failed"
+    assert "division by zero" in failed.error
+    assert failed.finished_at >= failed.started_at
+    queue.shutdown(wait=True)
+
+
+def test_queue_depth_limit():
+    release = threading.Event()
+    queue = JobQueue(max_workers=1, max_queued=1)
+    running = queue.submit(release.wait)
+    wait_for(queue, running.id, lambda job: job.status == "running")
+    queue.submit(release.wait)
+    with pytest.raises(QueueFullError):
+        queue.submit(release.wait)
+    assert queue.stats()["queued"] == 1
+    release.set()
+    queue.shutdown(wait=True)
+
+
+def test_shutdown_cancels_waiting_jobs():
+    release = threading.Event()
+    queue = JobQueue(max_workers=1, max_queued=4)
+    running = queue.submit(release.wait)
+    waiting = [queue.submit(lambda: "never") for _ in range(3)]
+    wait_for(queue, running.id, lambda job: job.status == "running")
+
+    queue.shutdown()
+    for job in waiting:
+        assert job.status == "cancelled"
+        assert job.done and job.result is None
+    release.set()
+    assert wait_done(queue, running.id).status == "succeeded"
+    assert all(queue.get(job.id).status == "cancelled" for job in waiting)
+
+
+def test_finished_jobs_are_evicted_oldest_first():
+    queue = JobQueue(max_workers=1, max_finished=2)
+    jobs = []
+    for i in range(4):
+        jobs.append(queue.submit(lambda i=i: i))
+        wait_done(queue, jobs[-1].id)
+    queue.submit(lambda: None)
+    assert queue.get(jobs[0].id) is None
+    assert queue.get(jobs[1].id) is None
+    assert queue.get(jobs[3].id) is not None
+    queue.shutdown(wait=True)
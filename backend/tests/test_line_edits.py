@@ -0,0 +1,79 @@
+import os
+import stat
+
+import pytest
+
+from conftest import write
+from utils import file_ops
+from utils.file_ops import apply_changes, atomic_write, list_code_files, resolve_line_edits
+
+LINES = ["a\n", "b\n", "c\n"]
+
+
+def edit(action, line, new_code=""):
+    return {"action": action, "line": line, "new_code": new_code}
+
+
+def test_edits_use_the_original_numbering():
+    result = resolve_line_edits(LINES, [edit("insert", 0, "top"), edit("delete", 1), edit("modify", 3, "C")])
+    assert result == ["top\n", "b\n", "C\n"]
+
+
+def test_overlapping_edits_on_one_line():
+    # The last modify/delete of a line wins; inserts after it are kept in order
+    result = resolve_line_edits(LINES, [
+        edit("modify", 2, "first"), edit("modify", 2, "second"),
+        edit("insert", 2, "x"), edit("insert", 2, "y"),
+    ])
+    assert result == ["a\n", "second\n", "x\n", "y\n", "c\n"]
+    assert resolve_line_edits(LINES, [edit("modify", 2, "B"), edit("delete", 2)]) == ["a\n", "c\n"]
+    # Deleting a line keeps what was inserted after it
+    assert resolve_line_edits(LINES, [edit("insert", 2, "x"), edit("delete", 2)]) == ["a\n", "x\n", "c\n"]
+
+
+def test_out_of_range_lines():
+    with pytest.raises(IndexError):
+        resolve_line_edits(LINES, [edit("modify", 4, "x")])
+    with pytest.raises(IndexError):
+        resolve_line_edits(LINES, [edit("delete", 0)])
+    with pytest.raises(IndexError):
+        resolve_line_edits([], [edit("modify", 1, "x")])
+    # Inserts are clamped to the ends of the file
+    assert resolve_line_edits(LINES, [edit("insert", 99, "end"), edit("insert", -5, "start")]) == \
+        ["start\n", "a\n", "b\n", "c\n", "end\n"]
+
+
+def test_unknown_action():
+    with pytest.raises(ValueError):
+        resolve_line_edits(LINES, [edit("replace", 1, "x")])
+
+
+def test_apply_changes_writes_the_file_once(codebase):
+    write(codebase, "f.py", "a\nb\nc\n")
+    apply_changes("f.py", [edit("modify", 1, "A"), edit("insert", 3, "d")])
+    with open(os.path.join(codebase, "f.py")) as f:
+        assert f.read() == "A\nb\nc\nd\n"
+
+
+def test_atomic_write_gives_new_files_the_umask_mode(codebase):
+    path = os.path.join(codebase, "new.txt")
+    atomic_write(path, "x")
+    assert stat.S_IMODE(os.stat(path).st_mode) == file_ops.NEW_FILE_MODE
+    assert file_ops.NEW_FILE_MODE == 0o666 & ~file_ops._current_umask()
+
+    os.chmod(path, 0o755)
+    atomic_write(path, "y")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o755
+
+
+def test_atomic_write_leaves_no_temp_file_on_failure(codebase):
+    path = os.path.join(codebase, "f.txt")
+    with pytest.raises(UnicodeEncodeError):
+        atomic_write(path, "\ud800")
+    assert os.listdir(codebase) == []
+
+
+def test_temp_files_are_not_listed(codebase):
+    write(codebase, "real.py", "")
+    write(codebase, ".tmp-abc123real.py", "")
+    assert list_code_files() == ["real.py"]
@@ -0,0 +1,82 @@
+import sqlite3
+
+from models import llm_cache as llm_cache_module
+from models.llm_cache import LLMCache, cached_call
+
+
+def rows(path) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+def test_key_depends_on_model_params_and_prompt():
+    key = LLMCache.key("m", {"temperature": 0}, "hello")
+    assert key == LLMCache.key("m", {"temperature": 0}, "hello")
+    assert key != LLMCache.key("other", {"temperature": 0}, "hello")
+    assert key != LLMCache.key("m", {"temperature": 0.5}, "hello")
+    assert key != LLMCache.key("m", {"temperature": 0}, "hello!")
+
+
+def test_memory_tier_is_lru_bounded():
+    cache = LLMCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache_module.time, "time", lambda: now[0])
+    cache = LLMCache(ttl_seconds=60)
+    cache.set("a", "1")
+    now[0] += 61
+    assert cache.get("a") is None
+    assert cache.stats()["memory_entries"] == 0
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    LLMCache(db_path=path).set("a", "answer", model="m")
+    fresh = LLMCache(db_path=path)
+    assert fresh.get("a") == "answer"
+    assert fresh.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_is_pruned_periodically(tmp_path, monkeypatch):
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(llm_cache_module.time, "time", lambda: float(next(clock)))
+    path = str(tmp_path / "cache.sqlite")
+    cache = LLMCache(db_path=path, max_db_entries=5, prune_every=4)
+    for i in range(7):
+        cache.set(f"k{i}", str(i))
+    assert rows(path) == 7  # no prune yet on the 5th-7th insert
+    cache.set("k7", "7")  # 8th insert prunes back to the cap, oldest first
+    assert rows(path) == 5
+    assert LLMCache(db_path=path).get("k2") is None
+    assert LLMCache(db_path=path).get("k3") == "3"
+
+
+def test_disk_tier_uses_the_created_at_index(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    LLMCache(db_path=path)
+    with sqlite3.connect(path) as conn:
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT key FROM llm_cache ORDER BY created_at").fetchall()
+    assert any("llm_cache_created_at" in str(row) for row in plan)
+
+
+def test_cached_call_only_caches_deterministic_calls(monkeypatch):
+    monkeypatch.setattr(llm_cache_module, "llm_cache", LLMCache())
+    calls = []
+
+    def call():
+        calls.append(1)
+        return f"reply {len(calls)}"
+
+    assert cached_call("m", {"temperature": 0}, "p", call) == "reply 1"
+    assert cached_call("m", {"temperature": 0}, "p", call) == "reply 1"
+    assert cached_call("m", {"temperature": 0.7}, "p", call) == "reply 2"
+    assert cached_call("m", {"temperature": 0}, "p", call, use_cache=False) == "reply 3"
+    assert len(calls) == 3
@@ -0,0 +1,97 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from utils import metrics as metrics_module
+from utils.metrics import MetricsMiddleware, MetricsRegistry, http_duration, track_llm
+
+
+def test_counter_renders_labelled_series():
+    registry = MetricsRegistry()
+    hits = registry.counter("hits_total", "Hits.", ("site",))
+    hits.inc(site="plan")
+    hits.inc(2, site="plan")
+    hits.inc(site='say "hi"\n')
+    text = registry.render()
+    assert "# HELP hits_total Hits.\n# TYPE hits_total counter" in text
+    assert 'hits_total{site="plan"} 3' in text
+    assert 'hits_total{site="say \\"hi\\"\\n"} 1' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 3.650000" in lines
+    assert "latency_seconds_count 4" in lines
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    hits = registry.counter("hits_total", "Hits.")
+    latency = registry.histogram("latency_seconds", "Latency.")
+    hits.inc()
+    with latency.time():
+        pass
+    assert hits.render() == [] and latency.render() == []
+
+
+def test_gauge_reads_at_scrape_time_and_survives_failures():
+    registry = MetricsRegistry()
+    state = {"queued": 1, "running": 0}
+    registry.gauge("jobs", "Jobs.", lambda: dict(state), ("state",))
+    registry.gauge("broken", "Broken.", lambda: 1 / 0)
+    state["running"] = 2
+    text = registry.render()
+    assert 'jobs{state="queued"} 1' in text and 'jobs{state="running"} 2' in text
+    assert "# TYPE broken gauge" in text
+
+
+def test_track_llm_records_outcome_and_sizes(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics_module, "metrics", registry)
+    monkeypatch.setattr(metrics_module, "llm_duration", registry.histogram("d", "", ("site", "model", "outcome")))
+    monkeypatch.setattr(metrics_module, "llm_prompt_chars", registry.counter("p", "", ("site",)))
+    monkeypatch.setattr(metrics_module, "llm_completion_chars", registry.counter("c", "", ("site",)))
+
+    assert track_llm("plan", "m", "12345", lambda: "abc") == "abc"
+    with pytest.raises(RuntimeError):
+        track_llm("plan", "m", "12", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+
+    text = registry.render()
+    assert 'd_count{site="plan",model="m",outcome="ok"} 1' in text
+    assert 'd_count{site="plan",model="m",outcome="error"} 1' in text
+    assert 'p{site="plan"} 7' in text
+    assert 'c{site="plan"} 3' in text
+
+
+def test_middleware_labels_requests_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: str):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    client.get("/items/a")
+    client.get("/items/b")
+    client.get("/nowhere")
+    lines = http_duration.render()
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 2' in lines
+    assert any(line.startswith('http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}')
+               for line in lines)
+
+
+def test_metrics_endpoint_serves_the_text_format():
+    resp = TestClient(main.app).get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert "# TYPE llm_request_duration_seconds histogram" in resp.text
+    assert 'agent_jobs{state="queued"}' in resp.text
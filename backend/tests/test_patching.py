@@ -0,0 +1,63 @@
+import pytest
+
+from utils.patching import PatchError, apply_search_replace, parse_search_replace
+
+CODE = "def add(a, b):\n    return a + b\n\n\ndef sub(a, b):\n    return a - b\n"
+
+
+def test_parse_search_replace_blocks():
+    text = (
+        "Here you go:\n<<<<<<< SEARCH\nold line\n=======\nnew line\n>>>>>>> REPLACE\n"
+        "<<<<<<< SEARCH\n=======\nappended\n>>>>>>> REPLACE"
+    )
+    assert parse_search_replace(text) == [("old line", "new line"), ("", "appended")]
+    assert parse_search_replace("no blocks here") == []
+
+
+def test_exact_hunks_apply_in_order():
+    hunks = [("    return a + b", "    return b + a"), ("def sub(a, b):", "def subtract(a, b):")]
+    assert apply_search_replace(CODE, hunks) == CODE.replace("a + b", "b + a").replace("def sub", "def subtract")
+
+
+def test_empty_search_appends():
+    assert apply_search_replace("x = 1", [("", "y = 2")]) == "x = 1\ny = 2\n"
+    assert apply_search_replace("", [("  ", "y = 2")]) == "y = 2\n"
+
+
+def test_whitespace_differences_are_tolerated():
+    result = apply_search_replace(CODE, [("  return a - b  ", "    return b - a")])
+    assert "    return b - a\n" in result and "a - b" not in result
+
+
+def test_fuzzy_match_for_a_slightly_wrong_anchor():
+    result = apply_search_replace(CODE, [("def sub(a, c):\n    return a - b", "def sub(a, b):\n    return 0")])
+    assert result.endswith("def sub(a, b):\n    return 0\n")
+
+
+def test_missing_anchor_raises():
+    with pytest.raises(PatchError, match="Could not find"):
+        apply_search_replace(CODE, [("def mul(x, y):\n    return x * y", "")])
+
+
+def test_search_only_matches_whole_lines():
+    assert apply_search_replace("max = 10\nx = 1\n", [("x = 1", "y = 2")]) == "max = 10\ny = 2\n"
+    with pytest.raises(PatchError, match="Could not find"):
+        apply_search_replace("max = 10\n", [("x = 1", "y = 2")])
+
+
+def test_ambiguous_exact_anchor_raises():
+    with pytest.raises(PatchError, match="matches 2 places"):
+        apply_search_replace("x = 1\ny = 2\nx = 1\n", [("x = 1", "x = 3")])
+
+
+def test_ambiguous_whitespace_anchor_raises():
+    code = "if x:\n    go()\nelse:\n  go()\n"
+    with pytest.raises(PatchError, match="matches 2 places"):
+        apply_search_replace(code, [("go() ", "stop()")])
+
+
+def test_ambiguous_fuzzy_anchor_raises():
+    code = "value = compute(1)\nother = 0\nvalue = compute(2)\n"
+    with pytest.raises(PatchError, match="equally close"):
+        apply_search_replace(code, [("value = compute(3)", "value = 3")])
+
@@ -0,0 +1,80 @@
+from utils.search_client import (
+    RetryableSearchError, SearchClient, StubSearchBackend, dedupe_by_url, split_queries,
+)
+
+
+def test_split_queries_handles_lists_numbering_and_duplicates():
+    text = '1. "fastapi websockets"\n2) Pydantic v2 migration\n- FastAPI WebSockets\n* sse starlette, , '
+    assert split_queries(text) == ["fastapi websockets", "Pydantic v2 migration", "sse starlette"]
+
+
+def test_split_queries_empty_input():
+    assert split_queries("") == []
+    assert split_queries(None) == []
+    assert split_queries(" ,\n, ") == []
+
+
+def test_split_queries_keeps_numbers_inside_a_query():
+    assert split_queries("python 3.12 release notes, http 2 push") == ["python 3.12 release notes", "http 2 push"]
+
+
+def test_dedupe_by_url_keeps_first_and_urlless_results():
+    results = [{"url": "a", "n": 1}, {"url": "b"}, {"url": "a", "n": 2}, {"title": "no url"}, {"title": "also none"}]
+    assert dedupe_by_url(results) == [{"url": "a", "n": 1}, {"url": "b"}, {"title": "no url"}, {"title": "also none"}]
+
+
+class FlakyBackend:
+    def __init__(self, failures: int, error=RetryableSearchError):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def search(self, query, max_results):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error("temporary")
+        return [{"url": f"https://example.com/{query}"}]
+
+
+def test_retries_transient_errors_then_succeeds():
+    backend = FlakyBackend(failures=2)
+    client = SearchClient(backend, retries=3, backoff=0)
+    assert client.search("q") == [{"url": "https://example.com/q"}]
+    assert backend.calls == 3
+
+
+def test_gives_up_after_retries_and_on_other_errors():
+    backend = FlakyBackend(failures=5)
+    assert SearchClient(backend, retries=3, backoff=0).search("q") == []
+    assert backend.calls == 3
+
+    backend = FlakyBackend(failures=5, error=ValueError)
+    assert SearchClient(backend, retries=3, backoff=0).search("q") == []
+    assert backend.calls == 1
+
+
+def test_results_are_cached_per_normalized_query():
+    backend = StubSearchBackend()
+    client = SearchClient(backend)
+    first = client.search("FastAPI ", 2)
+    assert client.search("fastapi", 2) is first
+    client.search("fastapi", 3)
+    assert backend.calls == ["FastAPI ", "fastapi"]
+
+
+def test_expired_entries_are_fetched_again():
+    backend = StubSearchBackend()
+    client = SearchClient(backend, cache_ttl=-1)
+    client.search("q")
+    client.search("q")
+    assert len(backend.calls) == 2
+
+
+def test_search_many_merges_and_dedupes():
+    backend = StubSearchBackend()
+    client = SearchClient(backend)
+    results = client.search_many(["alpha", "beta", "ALPHA"], max_results=2)
+    assert [r["url"] for r in results] == [
+        "https://example.com/alpha/1", "https://example.com/alpha/2",
+        "https://example.com/beta/1", "https://example.com/beta/2",
+    ]
@@ -0,0 +1,84 @@
+import pytest
+from langchain.schema import HumanMessage, AIMessage
+
+from agents import session_store
+from agents.session_store import SessionStore, SQLiteSessionBackend
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store.time, "time", clock)
+    return clock
+
+
+def test_least_recently_used_session_is_evicted(clock):
+    store = SessionStore(max_sessions=2)
+    a = store.get("a")
+    store.get("b")
+    assert store.get("a") is a  # "a" is now the most recent
+    store.get("c")
+    assert len(store) == 2
+    assert store.get("a") is a
+    assert store._sessions.keys() == {"a", "c"}
+
+
+def test_idle_sessions_expire_after_ttl(clock):
+    store = SessionStore(ttl_seconds=60)
+    a = store.get("a")
+    clock.now += 30
+    store.get("b")
+    clock.now += 45  # "a" idle for 75s, "b" for 45s
+    store.get("c")
+    assert store._sessions.keys() == {"b", "c"}
+    assert store.get("a") is not a  # a fresh, empty session
+
+
+def test_ttl_boundary_is_inclusive(clock):
+    store = SessionStore(ttl_seconds=60)
+    a = store.get("a")
+    clock.now += 60
+    store.get("b")
+    assert store.get("a") is a
+
+
+def test_append_keeps_the_newest_messages_and_advances_offset(clock):
+    store = SessionStore(max_messages=3)
+    for i in range(5):
+        store.append("s", HumanMessage(content=f"m{i}"))
+    session = store.get("s")
+    assert [m.content for m in session.messages] == ["m2", "m3", "m4"]
+    assert session.offset == 2
+
+
+def test_reset_forgets_the_session(clock):
+    store = SessionStore()
+    store.append("s", HumanMessage(content="hi"))
+    store.reset("s")
+    assert store.get("s").messages == []
+
+
+def test_sqlite_backend_reloads_evicted_sessions(clock, tmp_path):
+    backend = SQLiteSessionBackend(str(tmp_path / "sessions.sqlite"))
+    store = SessionStore(max_sessions=1, max_messages=3, backend=backend)
+    for i in range(4):
+        store.append("a", HumanMessage(content=f"q{i}"), AIMessage(content=f"r{i}"))
+    session = store.get("a")
+    session.summary, session.folded = "earlier talk", 5
+    store.save_summary(session)
+
+    store.get("b")  # evicts "a"
+    reloaded = store.get("a")
+    assert reloaded is not session
+    assert [m.content for m in reloaded.messages] == ["r2", "q3", "r3"]
+    assert isinstance(reloaded.messages[0], AIMessage)
+    assert reloaded.offset == 5
+    assert (reloaded.summary, reloaded.folded) == ("earlier talk", 5)
@@ -0,0 +1,116 @@
+import contextvars
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils.tracing import Tracer, span, trace_run, tracer
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+
+def test_spans_outside_a_run_record_nothing():
+    with span("orphan", "test") as s:
+        assert s is None
+
+
+def test_nested_spans_link_to_their_parent():
+    run_id = new_run_id()
+    with trace_run(run_id):
+        with span("node", "graph") as outer:
+            with span("llm", "llm", prompt_chars=10) as inner:
+                inner.args["completion_chars"] = 4
+        with span("sibling", "graph"):
+            pass
+    spans = {s.name: s for s in tracer.spans_for(run_id)}
+    assert spans["llm"].parent_id == outer.span_id
+    assert spans["node"].parent_id is None and spans["sibling"].parent_id is None
+    assert spans["llm"].args == {"prompt_chars": 10, "completion_chars": 4}
+    assert spans["node"].dur_us >= spans["llm"].dur_us
+
+
+def test_failed_spans_keep_the_error():
+    run_id = new_run_id()
+    with trace_run(run_id), pytest.raises(ValueError):
+        with span("write", "file"):
+            raise ValueError("disk full")
+    [s] = tracer.spans_for(run_id)
+    assert s.args["error"] == "disk full"
+
+
+def test_spans_follow_the_context_into_worker_threads():
+    run_id = new_run_id()
+    with trace_run(run_id), span("parent", "graph") as parent:
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(contextvars.copy_context().run, _child_span).result()
+    children = [s for s in tracer.spans_for(run_id) if s.name == "threaded"]
+    assert children and children[0].parent_id == parent.span_id
+
+
+def _child_span():
+    with span("threaded", "llm"):
+        pass
+
+
+def test_ring_buffer_drops_the_oldest_spans():
+    small = Tracer(max_spans=3)
+    run_id = new_run_id()
+    with trace_run(run_id):
+        for i in range(5):
+            with span(f"s{i}", "test") as s:
+                pass
+            small.record(s)
+    assert [s.name for s in small.spans_for(run_id)] == ["s2", "s3", "s4"]
+
+
+def test_chrome_trace_format():
+    run_id = new_run_id()
+    with trace_run(run_id), span("run_task", "run"):
+        with span("plan", "graph"):
+            pass
+    trace = tracer.chrome_trace(run_id)
+    assert trace["otherData"] == {"run_id": run_id}
+    metadata = [e for e in trace["traceEvents"] if e["ph"] == "M"]
+    complete = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert metadata and metadata[0]["name"] == "thread_name"
+    assert [e["name"] for e in complete] == ["run_task", "plan"]
+    assert complete[1]["args"]["parent_id"] == complete[0]["args"]["span_id"]
+    assert all({"ts", "dur", "pid", "tid"} <= e.keys() for e in complete)
+
+
+def test_trace_endpoint():
+    client = TestClient(main.app)
+    assert client.get(f"/jobs/{new_run_id()}/trace").status_code == 404
+    run_id = new_run_id()
+    with trace_run(run_id), span("run_task", "run"):
+        pass
+    resp = client.get(f"/jobs/{run_id}/trace")
+    assert resp.status_code == 200
+    assert f"trace-{run_id}.json" in resp.headers["content-disposition"]
+    assert resp.json()["traceEvents"][-1]["name"] == "run_task"
+
+
+def test_external_search_spans_join_the_run_trace(codebase, monkeypatch):
+    from models import groq_llm
+    from utils.workspace import pending_workspaces
+
+    monkeypatch.setattr(groq_llm.model.responder, "decision", "EXTERNAL")
+    run_id = new_run_id()
+    main.run_task("Add a weather widget", run_id, preview=True)
+    pending_workspaces.pop(run_id)
+
+    spans = tracer.spans_for(run_id)
+    searches = [s for s in spans if s.cat == "search"]
+    assert len(searches) >= 2
+    assert {s.thread for s in searches} != {"MainThread"}
+    root = {s.span_id: s for s in spans}
+    for s in searches:
+        ancestors = []
+        while s.parent_id is not None:
+            s = root[s.parent_id]
+            ancestors.append(s.name)
+        assert ancestors[-1] == "run_task" and "search_external" in ancestors
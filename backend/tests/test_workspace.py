@@ -0,0 +1,140 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from agents import developer
+from agents.developer import ToolStep, validate_step
+from conftest import write
+from utils.workspace import WorkspaceConflict, WorkspaceOverlay, pending_workspaces
+
+
+def read(root, name):
+    with open(os.path.join(root, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_edits_stay_in_memory_until_commit(codebase):
+    write(codebase, "a.py", "one\ntwo\n")
+    write(codebase, "gone.py", "x\n")
+    ws = WorkspaceOverlay(codebase)
+    ws.apply_changes("a.py", [{"action": "modify", "line": 2, "new_code": "TWO"}])
+    ws.write_lines("new.py", ["print(1)\n"])
+    ws.delete("gone.py")
+
+    assert read(codebase, "a.py") == "one\ntwo\n"
+    assert ws.read_lines("a.py") == ["one\n", "TWO\n"]
+    with pytest.raises(FileNotFoundError):
+        ws.read_lines("gone.py")
+    assert ws.pending() == [
+        {"file": "a.py", "status": "modified"},
+        {"file": "gone.py", "status": "deleted"},
+        {"file": "new.py", "status": "created"},
+    ]
+    diff = ws.diff()
+    assert "-two\n+TWO\n" in diff and "+++ b/new.py" in diff and "+++ /dev/null" in diff
+
+    assert len(ws.commit()) == 3
+    assert read(codebase, "a.py") == "one\nTWO\n"
+    assert read(codebase, "new.py") == "print(1)\n"
+    assert not os.path.exists(os.path.join(codebase, "gone.py"))
+    assert ws.pending() == []
+
+
+def test_unchanged_and_discarded_files_are_not_pending(codebase):
+    write(codebase, "a.py", "x\n")
+    ws = WorkspaceOverlay(codebase)
+    ws.write_lines("a.py", ["x\n"])
+    assert ws.pending() == []
+    ws.write_lines("b.py", ["y\n"])
+    ws.discard()
+    assert ws.pending() == []
+    assert not os.path.exists(os.path.join(codebase, "b.py"))
+
+
+def test_paths_outside_the_root_are_rejected(codebase):
+    ws = WorkspaceOverlay(codebase)
+    with pytest.raises(PermissionError):
+        ws.write_lines("../escape.py", ["x\n"])
+
+
+@pytest.mark.parametrize("disk_change", ["modify", "delete", "create"])
+def test_commit_refuses_to_overwrite_files_changed_on_disk(codebase, disk_change):
+    write(codebase, "a.py", "original\n")
+    write(codebase, "b.py", "untouched\n")
+    ws = WorkspaceOverlay(codebase)
+    ws.write_lines("a.py", ["from run\n"])
+    ws.write_lines("b.py", ["also from run\n"])
+    ws.write_lines("c.py", ["created by run\n"])
+
+    if disk_change == "modify":
+        write(codebase, "a.py", "saved by the user\n")
+        conflicted = ["a.py"]
+    elif disk_change == "delete":
+        os.remove(os.path.join(codebase, "a.py"))
+        conflicted = ["a.py"]
+    else:
+        write(codebase, "c.py", "created by the user\n")
+        conflicted = ["c.py"]
+
+    before = {name: read(codebase, name) for name in sorted(os.listdir(codebase))}
+    with pytest.raises(WorkspaceConflict) as err:
+        ws.commit()
+    assert err.value.files == conflicted
+    assert {name: read(codebase, name) for name in sorted(os.listdir(codebase))} == before
+    assert len(ws.pending()) == 3  # still pending, nothing was written
+
+
+def test_commit_endpoint_returns_409_and_keeps_the_changes(codebase):
+    write(codebase, "a.py", "original\n")
+    ws = WorkspaceOverlay(codebase)
+    ws.write_lines("a.py", ["from run\n"])
+    pending_workspaces.put("conflict-job", ws)
+    write(codebase, "a.py", "saved by the user\n")
+
+    client = TestClient(main.app)
+    resp = client.post("/jobs/conflict-job/commit")
+    assert resp.status_code == 409
+    assert resp.json()["detail"]["files"] == ["a.py"]
+    assert read(codebase, "a.py") == "saved by the user\n"
+
+    assert client.post("/jobs/conflict-job/discard").json()["files"] == [{"file": "a.py", "status": "modified"}]
+    assert client.post("/jobs/conflict-job/commit").status_code == 404
+
+
+def test_step_validation_sees_files_created_earlier_in_the_run(codebase, monkeypatch):
+    write(codebase, "big.py", "# filler\n" * 4000)  # keeps the full summary over budget
+    prompts = []
+    monkeypatch.setattr(developer, "chat", lambda prompt, **kwargs: prompts.append(prompt) or "not json")
+    monkeypatch.setenv("CONTEXT_TOKEN_BUDGET", "2000")
+    ws = WorkspaceOverlay(codebase)
+    ws.write_lines("fresh.py", ["def made_by_step_one():\n", "    return 1\n"])
+
+    step = ToolStep(file="fresh.py", tool="apply_change", args={"action": "modify", "line": 2, "new_code": "    return 2"})
+    assert validate_step(step, ws) == step
+    assert "Filename: fresh.py\ndef made_by_step_one():" in prompts[-1]
+
+    validate_step(step)  # without the overlay the validator only knows the disk
+    assert "made_by_step_one" not in prompts[-1]
+
+
+def test_step_validation_uses_overlay_when_everything_fits(codebase, monkeypatch):
+    write(codebase, "a.py", "old = 1\n")
+    prompts = []
+    monkeypatch.setattr(developer, "chat", lambda prompt, **kwargs: prompts.append(prompt) or "not json")
+    ws = WorkspaceOverlay(codebase)
+    ws.write_lines("a.py", ["new = 2\n"])
+    validate_step(ToolStep(file="a.py", tool="read"), ws)
+    assert "new = 2" in prompts[-1] and "old = 1" not in prompts[-1]
+
+
+def test_run_task_reports_commit_conflicts(codebase, monkeypatch):
+    def conflict(self):
+        raise WorkspaceConflict(["fake_module_0.py"])
+
+    monkeypatch.setattr(WorkspaceOverlay, "commit", conflict)
+    outcome = main.run_task("Add a helper that formats order totals")
+    assert outcome["status"] == "error" and outcome["committed"] is False
+    assert outcome["conflicts"] == ["fake_module_0.py"]
+    assert not os.path.exists(os.path.join(codebase, "fake_module_0.py"))
@@ -0,0 +1,287 @@
+import os
+import re
+import ast
+import math
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+from utils.codebase_snapshot import CodebaseSnapshot, codebase_snapshot, render_file_block
+
+logger = logging.getLogger(__name__)
+
+# Prompt budget for codebase context, per model (estimated tokens).
+CONTEXT_TOKEN_BUDGETS = {
+    "gemini-2.5-flash": 32000,
+    "meta-llama/llama-4-maverick-17b-128e-instruct": 16000,
+}
+DEFAULT_CONTEXT_TOKEN_BUDGET = 16000
+WINDOW_LINES = 60
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def context_budget(model: str) -> int:
+    override = os.getenv("CONTEXT_TOKEN_BUDGET")
+    if override:
+        return int(override)
+    return CONTEXT_TOKEN_BUDGETS.get(model, DEFAULT_CONTEXT_TOKEN_BUDGET)
+
+
+_IDENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Identifier-aware tokens: `parseHTTPRequest_v2` -> parsehttprequest_v2, parse, http, request, v, 2."""
+    tokens = []
+    for ident in _IDENT.findall(text):
+        lower = ident.lower()
+        tokens.append(lower)
+        parts = [p.lower() for piece in ident.split("_") for p in _CAMEL.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+# --- Chunks ---
+class Chunk:
+    __slots__ = ("file", "name", "start", "end", "text", "tokens")
+
+    def __init__(self, file: str, name: str, start: int, end: int, text: str):
+        self.file = file
+        self.name = name
+        self.start = start
+        self.end = end
+        self.text = text
+        # File name and symbol name are repeated so they weigh more than body text
+        self.tokens = Counter(tokenize(text) + tokenize(file) * 3 + tokenize(name) * 3)
+
+
+def chunk_file(filename: str, content: str) -> List[Chunk]:
+    """Split a file into functions/classes (Python) or fixed line windows (everything else)."""
+    lines = content.splitlines(keepends=True)
+    if filename.endswith(".py"):
+        try:
+            tree = ast.parse(content)
+        except SyntaxError:
+            tree = None
+        if tree is not None:
+            chunks = []
+            covered = set()
+            for node in tree.body:
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+                    end = node.end_lineno
+                    chunks.append(Chunk(filename, node.name, start, end, "".join(lines[start - 1:end])))
+                    covered.update(range(start, end + 1))
+            rest = [i for i in range(1, len(lines) + 1) if i not in covered]
+            if rest:
+                text = "".join(lines[i - 1] for i in rest)
+                if text.strip():
+                    chunks.append(Chunk(filename, "<module>", rest[0], rest[-1], text))
+            return chunks
+    return [
+        Chunk(filename, f"lines {i + 1}-{min(i + WINDOW_LINES, len(lines))}", i + 1,
+              min(i + WINDOW_LINES, len(lines)), "".join(lines[i:i + WINDOW_LINES]))
+        for i in range(0, len(lines), WINDOW_LINES)
+        if "".join(lines[i:i + WINDOW_LINES]).strip()
+    ]
+
+
+# --- BM25 index ---
+class CodeIndex:
+    """
+    BM25 retrieval over the codebase snapshot.
+
+    Files are re-chunked only when their content hash changes; corpus
+    statistics are recomputed when the snapshot version moves.
+    """
+
+    k1 = 1.5
+    b = 0.75
+
+    def __init__(self, snapshot: CodebaseSnapshot = codebase_snapshot):
+        self.snapshot = snapshot
+        self._files: Dict[str, tuple] = {}  # filename -> (digest, chunks)
+        self._df: Counter = Counter()
+        self._avgdl = 1.0
+        self._version = -1
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        self.snapshot.refresh()
+        with self._lock:
+            if self._version == self.snapshot.version:
+                return
+            entries = {e.name: e for e in self.snapshot.entries()}
+            for name in list(self._files):
+                if name not in entries:
+                    del self._files[name]
+            for name, entry in entries.items():
+                cached = self._files.get(name)
+                if cached is None or cached[0] != entry.digest:
+                    self._files[name] = (entry.digest, chunk_file(name, entry.content or ""))
+            chunks = self.chunks()
+            self._df = Counter(token for c in chunks for token in c.tokens)
+            self._avgdl = (sum(sum(c.tokens.values()) for c in chunks) / len(chunks)) if chunks else 1.0
+            self._version = self.snapshot.version
+
+    def clear(self):
+        """Drop every chunk so the next refresh rebuilds the index from scratch."""
+        with self._lock:
+            self._files.clear()
+            self._df = Counter()
+            self._version = -1
+
+    def chunks(self) -> List[Chunk]:
+        return [c for _, chunks in self._files.values() for c in chunks]
+
+    def _score(self, chunk: Chunk, query: Counter, n: int) -> float:
+        dl = sum(chunk.tokens.values())
+        score = 0.0
+        for token in query:
+            tf = chunk.tokens.get(token)
+            if not tf:
+                continue
+            idf = math.log(1 + (n - self._df[token] + 0.5) / (self._df[token] + 0.5))
+            score += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * dl / self._avgdl))
+        return score
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[tuple]:
+        """(score, chunk) pairs for the query, best first."""
+        self.refresh()
+        with self._lock:
+            chunks = self.chunks()
+            terms = Counter(tokenize(query))
+            scored = [(self._score(c, terms, len(chunks)), c) for c in chunks]
+        scored = [pair for pair in scored if pair[0] > 0]
+        scored.sort(key=lambda pair: -pair[0])
+        return scored[:limit] if limit else scored
+
+    def _summary_with(self, overrides: Dict[str, Optional[str]]) -> str:
+        blocks = {e.name: e.rendered for e in self.snapshot.entries()}
+        for name, content in overrides.items():
+            if content is None:
+                blocks.pop(name, None)
+            else:
+                blocks[name] = render_file_block(name, content)
+        return "".join(blocks[name] for name in sorted(blocks))
+
+    def render_context(self, query: str, token_budget: int, include_files: Iterable[str] = (),
+                       overrides: Optional[Dict[str, Optional[str]]] = None) -> str:
+        """
+        Codebase context for a prompt within `token_budget` tokens.
+
+        If the whole codebase fits it is returned as is. Otherwise the files in
+        `include_files` come first in full, then the chunks most relevant to
+        `query`, and the remaining file names are listed so the model knows
+        they exist. `overrides` maps file names to contents that replace what
+        is on disk (None = deleted), e.g. a run's uncommitted edits.
+        """
+        overrides = overrides or {}
+        full = self._summary_with(overrides) if overrides else self.snapshot.summary()
+        if estimate_tokens(full) <= token_budget:
+            return full
+
+        files = sorted(f for f in set(self.snapshot.files()) | set(overrides) if overrides.get(f, "") is not None)
+        # Keep room for the list of files that are left out
+        budget = token_budget - min(estimate_tokens(_others_note(files)), token_budget // 4)
+        parts = []
+        included = set()
+        for name in include_files:
+            if name in overrides:
+                if overrides[name] is None or name in included:
+                    continue
+                block = render_file_block(name, overrides[name])
+            else:
+                entry = self.snapshot.get(name)
+                if entry is None or name in included:
+                    continue
+                block = entry.rendered
+            if estimate_tokens(block) > budget:
+                continue
+            parts.append(block)
+            included.add(name)
+            budget -= estimate_tokens(block)
+
+        picked: Dict[str, List[Chunk]] = {}
+        for _, chunk in self.search(query):
+            if chunk.file in included or chunk.file in overrides:
+                continue
+            cost = estimate_tokens(chunk.text) + 10
+            if cost > budget:
+                continue
+            picked.setdefault(chunk.file, []).append(chunk)
+            budget -= cost
+            if budget <= 0:
+                break
+        for name, chunks in picked.items():
+            chunks.sort(key=lambda c: c.start)
+            body = "".join(f"# lines {c.start}-{c.end}\n{c.text}" for c in chunks)
+            parts.append(render_file_block(f"{name} (excerpts)", body))
+
+        used = sum(estimate_tokens(p) for p in parts)
+        others = [f for f in files if f not in included and f not in picked]
+        if others:
+            parts.append(_others_note(others, token_budget - used))
+        logger.info(f"[Index] Packed {len(included)} full files and {sum(map(len, picked.values()))} excerpts "
+                    f"into {used}/{token_budget} tokens.")
+        return "".join(parts)
+
+
+    def render_outline(self, query: str, token_budget: int) -> str:
+        """
+        AST outlines of the codebase within `token_budget` tokens. If they do
+        not all fit, the outlines of the files most relevant to `query` come
+        first and the remaining file names are listed, as in render_context.
+        """
+        full = self.snapshot.outline_summary()
+        if estimate_tokens(full) <= token_budget:
+            return full
+
+        files = self.snapshot.files()
+        ranked: Dict[str, float] = {}
+        for score, chunk in self.search(query):
+            ranked[chunk.file] = ranked.get(chunk.file, 0.0) + score
+        # Keep room for the list of files that are left out
+        budget = token_budget - min(estimate_tokens(_others_note(files)), token_budget // 4)
+        parts = []
+        shown = set()
+        for name in sorted(ranked, key=lambda f: -ranked[f]):
+            entry = self.snapshot.get(name)
+            if entry is None:
+                continue
+            cost = estimate_tokens(entry.outline)
+            if cost > budget:
+                continue
+            parts.append(entry.outline)
+            shown.add(name)
+            budget -= cost
+        used = sum(estimate_tokens(p) for p in parts)
+        others = [f for f in files if f not in shown]
+        if others:
+            parts.append(_others_note(others, token_budget - used))
+        logger.info(f"[Index] Packed {len(shown)} outlines into {used}/{token_budget} tokens.")
+        return "".join(parts)
+
+
+def _others_note(names: List[str], token_budget: Optional[int] = None) -> str:
+    """The "Other files ... (not shown)" line, cut short with a count if it would exceed `token_budget`."""
+    note = f"---\nOther files in the codebase (not shown): {', '.join(names)}\n"
+    if token_budget is None or estimate_tokens(note) <= token_budget:
+        return note
+    room = token_budget * 4 - 80
+    listed = []
+    for name in names:
+        room -= len(name) + 2
+        if room < 0:
+            break
+        listed.append(name)
+    return (f"---\nOther files in the codebase (not shown): {', '.join(listed)} "
+            f"and {len(names) - len(listed)} more\n")
+
+
+code_index = CodeIndex()
@@ -0,0 +1,151 @@
+import os
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+from utils.file_ops import CODEBASE_DIR, list_code_files, read_code_file, code_to_outline
+
+logger = logging.getLogger(__name__)
+
+
+# --- Snapshot entry ---
+class FileEntry:
+    """One tracked file: the stat fingerprint it was read at, its hash and its rendered block."""
+
+    __slots__ = ("name", "mtime_ns", "size", "digest", "content", "rendered", "_outline")
+
+    def __init__(self, name: str, mtime_ns: int, size: int, digest: str, content: str, rendered: str):
+        self.name = name
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.content = content
+        self.rendered = rendered
+        self._outline: Optional[str] = None
+
+    @property
+    def outline(self) -> str:
+        """Rendered AST outline block, built once per content hash."""
+        if self._outline is None:
+            if self.content is None:
+                self._outline = render_file_block(self.name, None)
+            else:
+                self._outline = f"---\nFilename: {self.name} (outline)\n{code_to_outline(self.content, self.name)}\n"
+        return self._outline
+
+
+def render_file_block(filename: str, content: Optional[str]) -> str:
+    if content is None:
+        return f"---\nFilename: {filename}\n[Unreadable]\n"
+    return f"---\nFilename: {filename}\n{content}\n"
+
+
+# --- Snapshot service ---
+class CodebaseSnapshot:
+    """
+    Incremental view of the files under CODEBASE_DIR.
+
+    Every refresh re-stats the directory, but only files whose mtime or size
+    changed are read again; a file whose content hash is unchanged keeps its
+    rendered block. The joined summary is rebuilt only when something changed.
+    """
+
+    def __init__(self, root: str = CODEBASE_DIR):
+        self.root = root
+        self._entries: Dict[str, FileEntry] = {}
+        self._summary: Optional[str] = None
+        self._outline_summary: Optional[str] = None
+        self._lock = threading.RLock()
+        self.version = 0
+
+    def _stat(self, filename: str):
+        return os.stat(os.path.join(self.root, filename))
+
+    def _load(self, filename: str, st) -> FileEntry:
+        try:
+            content = "".join(read_code_file(filename))
+        except Exception:
+            content = None
+        digest = hashlib.sha1((content or "").encode("utf-8")).hexdigest()
+        return FileEntry(filename, st.st_mtime_ns, st.st_size, digest, content, render_file_block(filename, content))
+
+    def refresh(self) -> bool:
+        """Bring the snapshot up to date. Returns True if any file was added, changed or removed."""
+        with self._lock:
+            try:
+                files = list_code_files()
+            except Exception:
+                files = []
+            changed = False
+            seen = set()
+            for f in files:
+                try:
+                    st = self._stat(f)
+                except OSError:
+                    continue
+                seen.add(f)
+                entry = self._entries.get(f)
+                if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+                    continue
+                fresh = self._load(f, st)
+                if entry is not None and entry.digest == fresh.digest and entry.content is not None:
+                    # Touched but not modified: keep the rendered block, remember the new stat.
+                    entry.mtime_ns, entry.size = fresh.mtime_ns, fresh.size
+                    continue
+                self._entries[f] = fresh
+                changed = True
+            for f in list(self._entries):
+                if f not in seen:
+                    del self._entries[f]
+                    changed = True
+            if changed:
+                self._summary = None
+                self._outline_summary = None
+                self.version += 1
+                logger.debug(f"[Snapshot] Codebase changed, now version {self.version}")
+            return changed
+
+    def invalidate(self, filename: Optional[str] = None):
+        """Forget one file (or everything) so the next refresh re-reads it."""
+        with self._lock:
+            if filename is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(filename, None)
+            self._summary = None
+            self._outline_summary = None
+
+    def files(self) -> List[str]:
+        self.refresh()
+        with self._lock:
+            return sorted(self._entries)
+
+    def entries(self) -> List[FileEntry]:
+        self.refresh()
+        with self._lock:
+            return [self._entries[f] for f in sorted(self._entries)]
+
+    def get(self, filename: str) -> Optional[FileEntry]:
+        self.refresh()
+        with self._lock:
+            return self._entries.get(filename)
+
+    def summary(self) -> str:
+        """The pre-rendered `Filename:`/content summary of the whole codebase."""
+        self.refresh()
+        with self._lock:
+            if self._summary is None:
+                self._summary = "".join(self._entries[f].rendered for f in sorted(self._entries))
+            return self._summary
+
+    def outline_summary(self) -> str:
+        """Like summary(), but with an AST outline of each file instead of its full body."""
+        self.refresh()
+        with self._lock:
+            if self._outline_summary is None:
+                self._outline_summary = "".join(self._entries[f].outline for f in sorted(self._entries))
+            return self._outline_summary
+
+
+# Shared by the planner and developer subgraphs.
+codebase_snapshot = CodebaseSnapshot()
@@ -0,0 +1,83 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def file_etag(st: os.stat_result) -> str:
+    """Strong validator derived from mtime and size; changes whenever the file is rewritten."""
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+# --- Hot file contents ---
+class FileContentCache:
+    """
+    Small LRU of recently read file bodies, keyed by absolute path.
+
+    An entry is only served while the file's (mtime_ns, size) still matches
+    the stat it was read at, so a stale body is never returned even if an
+    invalidation is missed. Files larger than `max_file_bytes` are not cached.
+    """
+
+    def __init__(self, max_entries: int = 128, max_file_bytes: int = 256 * 1024):
+        self.max_entries = max_entries
+        self.max_file_bytes = max_file_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # path -> (mtime_ns, size, data)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cacheable(self, st: os.stat_result) -> bool:
+        return self.max_entries > 0 and st.st_size <= self.max_file_bytes
+
+    def get(self, path: str, st: os.stat_result) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+
+    def put(self, path: str, st: os.stat_result, data: bytes):
+        if not self.cacheable(st):
+            return
+        with self._lock:
+            self._entries[path] = (st.st_mtime_ns, st.st_size, data)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def read(self, path: str, st: os.stat_result) -> bytes:
+        """The file body, from the cache when the stat still matches."""
+        data = self.get(path, st)
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+            self.put(path, st, data)
+        return data
+
+    def invalidate(self, path: Optional[str] = None):
+        """Drop one path (and anything below it, for directories) or everything."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            path = os.path.abspath(path)
+            prefix = path + os.sep
+            for key in [k for k in self._entries if k == path or k.startswith(prefix)]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+file_cache = FileContentCache(
+    max_entries=int(os.getenv("FS_READ_CACHE_ENTRIES", "128")),
+    max_file_bytes=int(os.getenv("FS_READ_CACHE_MAX_FILE_BYTES", str(256 * 1024))),
+)
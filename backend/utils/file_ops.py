@@ -1,16 +1,29 @@
 import os
+import re
 import ast
-from fastapi import APIRouter, HTTPException
+import fnmatch
+import hashlib
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 import shutil
-from fastapi.responses import PlainTextResponse
+import tempfile
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from fastapi.responses import Response, StreamingResponse
+from utils.file_cache import file_cache, file_etag
 
 router = APIRouter()
 
 class PathRequest(BaseModel):
     path: str
 
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../codebase'))
+# The workspace the agent and the editor operate on (overridable for benchmarks and tests)
+BASE_DIR = os.path.abspath(os.getenv("AGENT_CODEBASE_DIR") or os.path.join(os.path.dirname(__file__), '../../codebase'))
+
+# atomic_write's temp files live next to their target until they are renamed over it
+TEMP_FILE_PREFIX = ".tmp-"
+TEMP_FILE_PATTERN = TEMP_FILE_PREFIX + "*"
 
 
 def safe_join(base, *paths):
@@ -24,14 +37,111 @@ def safe_join(base, *paths):
 def list_dir(path: str = ""):
     try:
         abs_path = safe_join(BASE_DIR, path)
-        items = []
-        for name in os.listdir(abs_path):
-            full_path = os.path.join(abs_path, name)
+        with os.scandir(abs_path) as it:
+            # DirEntry carries the type from the directory listing, no extra stat per entry
+            return [{"name": e.name, "type": "folder" if e.is_dir() else "file"}
+                    for e in it if not e.name.startswith(TEMP_FILE_PREFIX)]
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# --- Recursive tree ---
+DEFAULT_TREE_IGNORE = [p for p in os.getenv("FS_TREE_IGNORE", ".git,node_modules,__pycache__").split(",") if p]
+MAX_TREE_PAGE = 5000
+
+def _walk_tree(abs_dir: str, rel_dir: str, depth: int, max_depth: int, ignore: list[str], after: tuple):
+    """
+    Pre-order walk (entries sorted by name) yielding (rel_path, DirEntry, depth).
+    Subtrees that sort entirely before `after` (the cursor's path components)
+    are skipped without being scanned.
+    """
+    with os.scandir(abs_dir) as it:
+        entries = sorted((e for e in it if not any(fnmatch.fnmatch(e.name, pat) for pat in ignore)),
+                         key=lambda e: e.name)
+    for entry in entries:
+        rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        parts = tuple(rel.split("/"))
+        is_ancestor = after[:len(parts)] == parts and len(parts) < len(after)
+        if after and parts <= after and not is_ancestor:
+            if parts == after and depth < max_depth and entry.is_dir(follow_symlinks=False):
+                # The cursor is this folder itself: everything inside it comes after it
+                yield from _walk_tree(entry.path, rel, depth + 1, max_depth, ignore, ())
+            continue
+        if not is_ancestor:
+            yield rel, entry, depth
+        if depth < max_depth and entry.is_dir(follow_symlinks=False):
+            yield from _walk_tree(entry.path, rel, depth + 1, max_depth, ignore, after if is_ancestor else ())
+
+def _tree_version(abs_dir: str, max_depth: int, ignore: list[str]) -> str:
+    """
+    Hash of the name, size and mtime of every entry the walk lists, so adding,
+    removing, renaming or rewriting anything in the listing (including an
+    in-place write that keeps the directory's mtime) changes it.
+    """
+    digest = hashlib.sha1(f"{max_depth}\0{','.join(ignore)}\n".encode("utf-8"))
+
+    def visit(path: str, rel: str, depth: int):
+        with os.scandir(path) as it:
+            entries = sorted((e for e in it if not any(fnmatch.fnmatch(e.name, pat) for pat in ignore)),
+                             key=lambda e: e.name)
+        for entry in entries:
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            child = f"{rel}/{entry.name}" if rel else entry.name
+            digest.update(f"{child}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8", "surrogateescape"))
+            if depth < max_depth and entry.is_dir(follow_symlinks=False):
+                visit(entry.path, child, depth + 1)
+
+    visit(abs_dir, "", 1)
+    return digest.hexdigest()[:16]
+
+@router.get("/fs/tree")
+def tree(path: str = "", depth: int = 1, cursor: str = "", limit: int = 1000,
+         ignore: str = "", if_version: str = ""):
+    """
+    Entries under `path` down to `depth` levels (1 = direct children), with
+    size and mtime, in pages of `limit`. Pass `next_cursor` back as `cursor`
+    for the next page. The first page carries a `version` that changes
+    whenever an entry is added, removed, renamed or rewritten anywhere in the
+    walked subtree; sending it back as `if_version` returns `unchanged: true`
+    without the entries.
+    """
+    try:
+        abs_path = safe_join(BASE_DIR, path)
+        if not os.path.isdir(abs_path):
+            raise HTTPException(status_code=404, detail="Folder not found")
+        patterns = DEFAULT_TREE_IGNORE + [TEMP_FILE_PATTERN] + [p for p in ignore.split(",") if p]
+        limit = max(1, min(limit, MAX_TREE_PAGE))
+        depth = max(1, depth)
+        after = tuple(cursor.split("/")) if cursor else ()
+
+        version = None
+        if not cursor:
+            # Later pages only cover the rest of the walk; the first page versions the whole listing
+            version = _tree_version(abs_path, depth, patterns)
+            if if_version and if_version == version:
+                return {"path": path, "version": version, "unchanged": True, "entries": [], "next_cursor": None}
+
+        items, next_cursor = [], None
+        for rel, entry, level in _walk_tree(abs_path, "", 1, depth, patterns, after):
+            if len(items) == limit:
+                # One entry past the page: there is more, stop scanning here
+                next_cursor = items[-1]["path"]
+                break
+            st = entry.stat(follow_symlinks=False)
+            is_dir = entry.is_dir()
             items.append({
-                "name": name,
-                "type": "folder" if os.path.isdir(full_path) else "file"
+                "name": entry.name,
+                "path": rel,
+                "type": "folder" if is_dir else "file",
+                "size": None if is_dir else st.st_size,
+                "mtime": st.st_mtime,
+                "depth": level,
             })
-        return items
+        return {"path": path, "version": version, "unchanged": False, "entries": items, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -61,36 +171,90 @@ def delete_path(req: PathRequest):
             shutil.rmtree(abs_path)
         else:
             os.remove(abs_path)
+        file_cache.invalidate(abs_path)
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 
-CODEBASE_DIR = os.path.join(os.path.dirname(__file__), '../../codebase')
+CODEBASE_DIR = BASE_DIR
 
 def list_code_files():
-    return [f for f in os.listdir(CODEBASE_DIR) if os.path.isfile(os.path.join(CODEBASE_DIR, f))]
+    return [f for f in os.listdir(CODEBASE_DIR)
+            if not f.startswith(TEMP_FILE_PREFIX) and os.path.isfile(os.path.join(CODEBASE_DIR, f))]
 
 def read_code_file(filename: str) -> list[str]:
     path = os.path.join(CODEBASE_DIR, filename)
     with open(path, 'r', encoding='utf-8') as f:
         return f.readlines()
 
+def _current_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+# mkstemp creates files as 0600; new files get the mode open() would have given them
+NEW_FILE_MODE = 0o666 & ~_current_umask()
+
+def atomic_write(path: str, data: str):
+    """Write to a temp file next to `path` and move it into place, so readers never see a partial file."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=TEMP_FILE_PREFIX, suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(data)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            os.chmod(tmp_path, NEW_FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def write_code_file(filename: str, lines: list[str]):
     path = os.path.join(CODEBASE_DIR, filename)
-    with open(path, 'w', encoding='utf-8') as f:
-        f.writelines(lines)
+    atomic_write(path, "".join(lines))
 
-def apply_change(filename: str, action: str, line: int, new_code: str = None):
+def resolve_line_edits(lines: list[str], edits: list[dict]) -> list[str]:
+    """
+    Apply several line edits in one pass. Every `line` refers to the
+    original numbering, so edits do not shift each other:
+    - modify/delete target original line N (1-based); the last one wins
+    - insert adds new_code after original line N (0 = top), in edit order
+    """
+    replaced: dict[int, Optional[str]] = {}
+    inserts: dict[int, list[str]] = {}
+    for edit in edits:
+        action, line = edit["action"], edit["line"]
+        if action == "insert":
+            inserts.setdefault(min(max(line, 0), len(lines)), []).append(edit.get("new_code", "") + "\n")
+        elif action in ("modify", "delete"):
+            if not 1 <= line <= len(lines):
+                raise IndexError(f"line {line} out of range (file has {len(lines)} lines)")
+            replaced[line] = edit.get("new_code", "") + "\n" if action == "modify" else None
+        else:
+            raise ValueError(f"Unsupported action: {action}")
+
+    result = list(inserts.get(0, []))
+    for number, original in enumerate(lines, 1):
+        if number in replaced:
+            if replaced[number] is not None:
+                result.append(replaced[number])
+        else:
+            result.append(original)
+        result.extend(inserts.get(number, []))
+    return result
+
+def apply_changes(filename: str, edits: list[dict]):
+    """Apply a list of {action, line, new_code} edits with one read and one atomic write."""
     lines = read_code_file(filename)
-    if action == "modify":
-        lines[line-1] = new_code + "\n"
-    elif action == "insert":
-        lines.insert(line, new_code + "\n")
-    elif action == "delete":
-        lines.pop(line-1)
-    write_code_file(filename, lines)
+    write_code_file(filename, resolve_line_edits(lines, edits))
+
+def apply_change(filename: str, action: str, line: int, new_code: str = None):
+    apply_changes(filename, [{"action": action, "line": line, "new_code": new_code or ""}])
 
 def code_to_ast_string(code: str) -> str:
     try:
@@ -99,6 +263,76 @@ def code_to_ast_string(code: str) -> str:
     except Exception as e:
         return f"Could not parse AST: {e}"
 
+def _first_doc_line(node) -> str:
+    doc = ast.get_docstring(node)
+    return doc.strip().splitlines()[0] if doc else ""
+
+def _python_outline(tree: ast.Module) -> list[str]:
+    lines = []
+    imports = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.extend(f"{node.module or ''}.{alias.name}" for alias in node.names)
+    if imports:
+        lines.append(f"imports: {', '.join(imports)}")
+    doc = _first_doc_line(tree)
+    if doc:
+        lines.append(f'"""{doc}"""')
+
+    def visit(nodes, indent):
+        for node in nodes:
+            pad = "    " * indent
+            span = f"[L{node.lineno}-{node.end_lineno}]" if hasattr(node, "lineno") else ""
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+                returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+                lines.append(f"{pad}{prefix} {node.name}({ast.unparse(node.args)}){returns}  {span}")
+            elif isinstance(node, ast.ClassDef):
+                bases = ", ".join(ast.unparse(b) for b in node.bases)
+                lines.append(f"{pad}class {node.name}({bases})  {span}" if bases else f"{pad}class {node.name}  {span}")
+            else:
+                continue
+            doc = _first_doc_line(node)
+            if doc:
+                lines.append(f'{pad}    """{doc}"""')
+            if isinstance(node, ast.ClassDef):
+                visit(node.body, indent + 1)
+
+    visit(tree.body, 0)
+    return lines
+
+_SIGNATURE_PATTERNS = [
+    # JS/TS: function foo(...), class Foo, const foo = (...) =>
+    re.compile(r"^\s*(export\s+)?(default\s+)?(async\s+)?(function\*?\s+\w+\s*\(.*|class\s+\w+.*)"),
+    re.compile(r"^\s*(export\s+)?(const|let|var)\s+\w+\s*=\s*(async\s+)?(\([^)]*\)|\w+)\s*=>.*"),
+    # C/C++/Java-like: type name(args) {
+    re.compile(r"^\s*[A-Za-z_][\w:<>,\s\*&]*\s+[\*&]?[A-Za-z_][\w:]*\s*\([^;]*\)\s*(const\s*)?\{?\s*$"),
+    # HTML landmarks
+    re.compile(r"^\s*<(title|h1|h2|script|link|form)\b.*", re.IGNORECASE),
+]
+
+def code_to_outline(code: str, filename: str = "") -> str:
+    """
+    Compact structural view of a source file: imports, class and function
+    signatures with line ranges and first docstring lines. Python is parsed
+    with `ast`; other languages fall back to signature-looking lines.
+    """
+    total = len(code.splitlines())
+    if filename.endswith(".py"):
+        try:
+            return "\n".join([f"({total} lines)"] + _python_outline(ast.parse(code)))
+        except SyntaxError:
+            pass
+    lines = [f"({total} lines)"]
+    for number, line in enumerate(code.splitlines(), 1):
+        if any(p.match(line) for p in _SIGNATURE_PATTERNS):
+            lines.append(f"L{number}: {line.strip()[:120]}")
+    if len(lines) == 1:
+        lines.extend(code.splitlines()[:5])
+    return "\n".join(lines)
+
 def delete_code_file(filename: str):
     path = os.path.join(CODEBASE_DIR, filename)
     if os.path.exists(path):
@@ -114,31 +348,216 @@ def rename_path(req: RenameRequest):
         abs_old = safe_join(BASE_DIR, req.old_path)
         abs_new = safe_join(BASE_DIR, req.new_path)
         os.rename(abs_old, abs_new)
+        file_cache.invalidate(abs_old)
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# --- Conditional and ranged reads ---
+READ_CHUNK_SIZE = 64 * 1024
+TEXT_MEDIA_TYPE = "text/plain; charset=utf-8"
+
+def _not_modified(request: Request, etag: str, st) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(st.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def _parse_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """
+    (start, end) inclusive for a single `bytes=` range, or None to serve the
+    whole file (no header, or a multi-range/unknown unit we don't support).
+    Raises ValueError when the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first == "":
+            length = int(last)  # suffix range: the final N bytes
+            if length <= 0:
+                raise ValueError("empty suffix range")
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        raise ValueError(f"Malformed range: {header}")
+    if start >= size or start > end:
+        raise ValueError(f"Range {header} not satisfiable for {size} bytes")
+    return start, end
+
+def _stream_file(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(READ_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
 @router.get("/fs/read")
-def read_file(path: str):
+def read_file(path: str, request: Request):
+    """
+    File contents with ETag/Last-Modified validators. Conditional requests
+    get a 304, `Range: bytes=...` a 206. Small files are served from an
+    in-process LRU; large ones are streamed in chunks.
+    """
     try:
         abs_path = safe_join(BASE_DIR, path)
         if not os.path.isfile(abs_path):
             raise HTTPException(status_code=404, detail="File not found")
-        with open(abs_path, "r", encoding="utf-8") as f:
-            return PlainTextResponse(f.read())
+        st = os.stat(abs_path)
+        etag = file_etag(st)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+            "Accept-Ranges": "bytes",
+            "Cache-Control": "no-cache",
+        }
+        if _not_modified(request, etag, st):
+            return Response(status_code=304, headers=headers)
+
+        size = st.st_size
+        if_range = request.headers.get("if-range")
+        range_header = request.headers.get("range") if if_range in (None, etag) else None
+        try:
+            span = _parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        start, end = span if span else (0, size - 1)
+        status = 206 if span else 200
+        if span:
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+        if file_cache.cacheable(st):
+            data = file_cache.read(abs_path, st)
+            return Response(data[start:end + 1], status_code=status, media_type=TEXT_MEDIA_TYPE, headers=headers)
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(_stream_file(abs_path, start, end - start + 1), status_code=status,
+                                 media_type=TEXT_MEDIA_TYPE, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+class TextEdit(BaseModel):
+    """
+    One replacement, either by offset (Monaco's rangeOffset/rangeLength) or by
+    1-based line/column range (Monaco's IRange). Like Monaco, offsets, lengths
+    and columns count UTF-16 code units, so a character outside the BMP (an
+    emoji) counts as two; they are converted to Python string indices on apply.
+    """
+    text: str = ""
+    offset: Optional[int] = None
+    length: int = 0
+    start_line: Optional[int] = None
+    start_column: Optional[int] = None
+    end_line: Optional[int] = None
+    end_column: Optional[int] = None
+
 class SaveFileRequest(BaseModel):
     path: str
-    content: str
+    content: Optional[str] = None
+    edits: Optional[list[TextEdit]] = None
+    base_etag: Optional[str] = None
+
+_save_lock = threading.Lock()
+
+# Characters outside the BMP take two UTF-16 code units (a surrogate pair)
+_ASTRAL = re.compile("[\U00010000-\U0010FFFF]")
+
+def _utf16_to_index(text: str, units: int, start: int = 0, limit: Optional[int] = None) -> int:
+    """Index into `text` that lies `units` UTF-16 code units after `start`, not past `limit`."""
+    limit = len(text) if limit is None else limit
+    if units < 0:
+        raise ValueError(f"Negative edit position {units}")
+    if not _ASTRAL.search(text, start, limit):
+        if start + units > limit:
+            raise ValueError("Edit position out of bounds")
+        return start + units
+    i = start
+    while units > 0 and i < limit:
+        units -= 2 if ord(text[i]) > 0xFFFF else 1
+        i += 1
+    if units < 0:
+        raise ValueError("Edit position falls inside a surrogate pair")
+    if units > 0:
+        raise ValueError("Edit position out of bounds")
+    return i
+
+def _position_to_offset(line_starts: list[int], text: str, line: int, column: int) -> int:
+    if line < 1 or line > len(line_starts):
+        raise ValueError(f"Line {line} out of range (1-{len(line_starts)})")
+    start = line_starts[line - 1]
+    end = line_starts[line] if line < len(line_starts) else len(text)
+    if column < 1:
+        raise ValueError(f"Column {column} out of range on line {line}")
+    try:
+        return _utf16_to_index(text, column - 1, start, end)
+    except ValueError:
+        raise ValueError(f"Column {column} out of range on line {line}")
+
+def apply_text_edits(text: str, edits: list[TextEdit]) -> str:
+    """Apply edits in order; each one is positioned against the text left by the previous edit."""
+    for edit in edits:
+        if edit.offset is not None:
+            try:
+                start = _utf16_to_index(text, edit.offset)
+                end = _utf16_to_index(text, edit.length, start)
+            except ValueError as e:
+                raise ValueError(f"Edit range {edit.offset}+{edit.length} is invalid: {e}")
+        elif None not in (edit.start_line, edit.start_column, edit.end_line, edit.end_column):
+            line_starts = [0] + [i + 1 for i, ch in enumerate(text) if ch == "\n"]
+            start = _position_to_offset(line_starts, text, edit.start_line, edit.start_column)
+            end = _position_to_offset(line_starts, text, edit.end_line, edit.end_column)
+            if end < start:
+                raise ValueError("Edit range ends before it starts")
+        else:
+            raise ValueError("Each edit needs either offset/length or a full line/column range")
+        text = text[:start] + edit.text + text[end:]
+    return text
 
 @router.post("/fs/save")
-def save_file(req: SaveFileRequest):
+def save_file(req: SaveFileRequest, request: Request):
+    """
+    Save a file from the editor, either as full `content` or as a list of
+    `edits` against the version identified by `base_etag` (or If-Match).
+    A stale base version gets a 409 with the current ETag so the client can
+    re-read and retry; the write itself is an atomic replace.
+    """
     try:
         abs_path = safe_join(BASE_DIR, req.path)
-        with open(abs_path, "w", encoding="utf-8") as f:
-            f.write(req.content)
-        return {"success": True}
+        base_etag = req.base_etag or request.headers.get("if-match")
+        if req.content is None and req.edits is None:
+            raise HTTPException(status_code=400, detail="Provide either content or edits")
+        with _save_lock:
+            st = os.stat(abs_path) if os.path.isfile(abs_path) else None
+            current_etag = file_etag(st) if st else None
+            if base_etag and base_etag != current_etag:
+                raise HTTPException(status_code=409, detail={"error": "Version mismatch", "etag": current_etag})
+            if req.content is not None:
+                text = req.content
+            else:
+                if st is None:
+                    raise HTTPException(status_code=404, detail="File not found")
+                if not base_etag:
+                    raise HTTPException(status_code=428, detail="Delta saves need base_etag or If-Match")
+                text = apply_text_edits(file_cache.read(abs_path, st).decode("utf-8"), req.edits)
+            atomic_write(abs_path, text)
+            st = os.stat(abs_path)
+            file_cache.put(abs_path, st, text.encode("utf-8"))
+        return {"success": True, "etag": file_etag(st)}
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
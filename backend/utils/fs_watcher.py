@@ -0,0 +1,265 @@
+import os
+import time
+import queue
+import asyncio
+import fnmatch
+import logging
+import threading
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from utils.file_ops import BASE_DIR, DEFAULT_TREE_IGNORE, TEMP_FILE_PATTERN
+from utils.file_cache import file_cache
+from utils.codebase_snapshot import codebase_snapshot
+
+try:  # inotify/FSEvents/ReadDirectoryChangesW through the notify crate
+    import watchfiles
+except ImportError:  # pragma: no cover - optional dependency
+    watchfiles = None
+
+logger = logging.getLogger(__name__)
+
+ADDED, MODIFIED, DELETED = "added", "modified", "deleted"
+
+
+def merge_change(previous: Optional[str], current: str) -> Optional[str]:
+    """Coalesce two changes to the same path into one (None means they cancel out)."""
+    if previous is None:
+        return current
+    if previous == ADDED:
+        return None if current == DELETED else ADDED
+    if previous == DELETED:
+        return MODIFIED if current == ADDED else DELETED
+    return DELETED if current == DELETED else MODIFIED
+
+
+# --- Change sources ---
+class PollingSource:
+    """Fallback source: re-stat the tree every `interval` seconds and diff it against the last scan."""
+
+    name = "poll"
+
+    def __init__(self, root: str, ignore: List[str], interval: float = 1.0):
+        self.root = root
+        self.ignore = ignore
+        self.interval = interval
+
+    def _scan(self) -> Dict[str, tuple]:
+        found = {}
+        stack = [("", self.root)]
+        while stack:
+            rel_dir, abs_dir = stack.pop()
+            try:
+                with os.scandir(abs_dir) as it:
+                    for entry in it:
+                        if any(fnmatch.fnmatch(entry.name, pat) for pat in self.ignore):
+                            continue
+                        rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                        try:
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        found[rel] = (is_dir, None if is_dir else st.st_mtime_ns, None if is_dir else st.st_size)
+                        if is_dir:
+                            stack.append((rel, entry.path))
+            except OSError:
+                continue
+        return found
+
+    def run(self, emit: Callable[[Dict[str, str]], None], stop: threading.Event):
+        previous = self._scan()
+        while not stop.wait(self.interval):
+            current = self._scan()
+            changes = {rel: DELETED for rel in previous.keys() - current.keys()}
+            for rel, info in current.items():
+                old = previous.get(rel)
+                if old is None:
+                    changes[rel] = ADDED
+                elif old != info:
+                    changes[rel] = MODIFIED
+            previous = current
+            if changes:
+                emit(changes)
+
+
+class WatchfilesSource:
+    """Native notifications via `watchfiles` (inotify on Linux)."""
+
+    name = "watchfiles"
+    _kinds = {1: ADDED, 2: MODIFIED, 3: DELETED}
+
+    def __init__(self, root: str, ignore: List[str], debounce_ms: int = 50):
+        self.root = root
+        self.ignore = ignore
+        self.debounce_ms = debounce_ms
+
+    def _relative(self, path: str) -> Optional[str]:
+        rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+        if rel.startswith(".."):
+            return None
+        if any(fnmatch.fnmatch(part, pat) for part in rel.split("/") for pat in self.ignore):
+            return None
+        return rel
+
+    def run(self, emit: Callable[[Dict[str, str]], None], stop: threading.Event):
+        for batch in watchfiles.watch(self.root, stop_event=stop, debounce=self.debounce_ms,
+                                      step=50, yield_on_timeout=False, raise_interrupt=False):
+            changes: Dict[str, str] = {}
+            for change, path in batch:
+                rel = self._relative(path)
+                if rel is None:
+                    continue
+                merged = merge_change(changes.get(rel), self._kinds.get(int(change), MODIFIED))
+                if merged is None:
+                    changes.pop(rel, None)
+                else:
+                    changes[rel] = merged
+            if changes:
+                emit(changes)
+
+
+# --- Watcher ---
+class FileWatcher:
+    """
+    Watches BASE_DIR and fans debounced change batches out to listeners.
+
+    A source thread feeds raw change batches into a queue; the dispatcher
+    waits until the tree has been quiet for `debounce` seconds (at most
+    `max_delay`), coalesces the changes per path and then calls every sync
+    listener and pushes the batch to every async subscriber.
+    """
+
+    def __init__(self, source, debounce: float = 0.2, max_delay: float = 1.0):
+        self.source = source
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.version = 0
+        self._raw: "queue.Queue[Dict[str, str]]" = queue.Queue()
+        self._listeners: List[Callable[[List[dict]], None]] = []
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def backend(self) -> str:
+        return self.source.name
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def add_listener(self, listener: Callable[[List[dict]], None]):
+        self._listeners.append(listener)
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run_source, name="fs-watch-source", daemon=True),
+            threading.Thread(target=self._dispatch_loop, name="fs-watch-dispatch", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"[Watcher] Watching {self.source.root} with {self.backend}")
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+
+    def _run_source(self):
+        try:
+            self.source.run(self._raw.put, self._stop)
+        except Exception as e:
+            logger.error(f"[Watcher] {self.backend} source stopped: {e}")
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            try:
+                first = self._raw.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            pending: Dict[str, str] = {}
+            self._merge(pending, first)
+            deadline = time.monotonic() + self.max_delay
+            while time.monotonic() < deadline:
+                try:
+                    self._merge(pending, self._raw.get(timeout=self.debounce))
+                except queue.Empty:
+                    break
+            if pending:
+                self.dispatch(pending)
+
+    @staticmethod
+    def _merge(pending: Dict[str, str], changes: Dict[str, str]):
+        for rel, kind in changes.items():
+            merged = merge_change(pending.get(rel), kind)
+            if merged is None:
+                pending.pop(rel, None)
+            else:
+                pending[rel] = merged
+
+    def dispatch(self, changes: Dict[str, str]) -> dict:
+        with self._lock:
+            self.version += 1
+            event = {
+                "type": "fs_changes",
+                "version": self.version,
+                "changes": [{"path": rel, "change": kind} for rel, kind in sorted(changes.items())],
+            }
+            subscribers = list(self._subscribers)
+        for listener in self._listeners:
+            try:
+                listener(event["changes"])
+            except Exception as e:
+                logger.warning(f"[Watcher] Listener failed: {e}")
+        for loop, q in subscribers:
+            loop.call_soon_threadsafe(q.put_nowait, event)
+        logger.debug(f"[Watcher] Dispatched {len(changes)} change(s), version {self.version}")
+        return event
+
+    async def subscribe(self) -> AsyncIterator[dict]:
+        loop = asyncio.get_running_loop()
+        q: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.append((loop, q))
+        try:
+            while True:
+                yield await q.get()
+        finally:
+            with self._lock:
+                if (loop, q) in self._subscribers:
+                    self._subscribers.remove((loop, q))
+
+
+# --- Cache invalidation ---
+def invalidate_caches(changes: List[dict]):
+    """Drop cached bodies of changed files so the next read or summary picks them up."""
+    for change in changes:
+        rel = change["path"]
+        file_cache.invalidate(os.path.join(BASE_DIR, rel))
+        if "/" not in rel:
+            # The snapshot (and the code index built on it) only tracks top-level files
+            codebase_snapshot.invalidate(rel)
+
+
+def fs_watcher_from_env() -> FileWatcher:
+    root = BASE_DIR
+    # Temp files from atomic writes come and go within one save; only the rename matters
+    ignore = DEFAULT_TREE_IGNORE + [TEMP_FILE_PATTERN]
+    debounce_ms = int(os.getenv("FS_WATCH_DEBOUNCE_MS", "200"))
+    backend = os.getenv("FS_WATCH_BACKEND", "auto").lower()
+    if backend in ("auto", "watchfiles") and watchfiles is not None:
+        source = WatchfilesSource(root, ignore, debounce_ms=min(debounce_ms, 50))
+    else:
+        if backend == "watchfiles":
+            logger.warning("[Watcher] watchfiles is not installed, falling back to polling")
+        source = PollingSource(root, ignore, interval=float(os.getenv("FS_WATCH_POLL_INTERVAL", "1.0")))
+    watcher = FileWatcher(source, debounce=debounce_ms / 1000)
+    watcher.add_listener(invalidate_caches)
+    return watcher
+
+
+fs_watcher = fs_watcher_from_env()
@@ -0,0 +1,120 @@
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit."""
+
+
+# --- Job record ---
+class Job:
+    def __init__(self, job_id: str, name: str):
+        self.id = job_id
+        self.name = name
+        self.status = "queued"  # queued -> running -> succeeded | failed, or queued -> cancelled
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+# --- Job queue ---
+class JobQueue:
+    """
+    Bounded background job queue backed by a thread pool.
+
+    At most `max_workers` jobs run at once; at most `max_queued` jobs may wait
+    for a worker, further submissions raise QueueFullError. Finished jobs are
+    kept (oldest evicted first) so their status and result can be fetched.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queued: int = 16, max_finished: int = 200):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _count(self, status: str) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == status)
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def submit(self, fn: Callable[..., Any], *args, name: str = "job", job_id: Optional[str] = None, **kwargs) -> Job:
+        with self._lock:
+            if self._count("queued") >= self.max_queued:
+                raise QueueFullError(f"Job queue is full ({self.max_queued} jobs waiting)")
+            job = Job(job_id or uuid.uuid4().hex, name)
+            self._jobs[job.id] = job
+            self._evict_finished()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        logger.info(f"[Jobs] Queued {name} job {job.id}")
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict):
+        with self._lock:
+            if job.status != "queued":
+                # Cancelled by shutdown() before a worker picked it up
+                return
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            result, error, status = fn(*args, **kwargs), None, "succeeded"
+        except Exception as e:
+            logger.exception(f"[Jobs] Job {job.id} failed")
+            result, error, status = None, str(e), "failed"
+        with self._lock:
+            job.result, job.error, job.status = result, error, status
+            job.finished_at = time.time()
+        logger.info(f"[Jobs] Job {job.id} {job.status} in {job.finished_at - job.started_at:.2f}s")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "queued": self._count("queued"),
+                "running": self._count("running"),
+                "max_workers": self.max_workers,
+                "max_queued": self.max_queued,
+            }
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting work; jobs still waiting for a worker are marked cancelled."""
+        with self._lock:
+            now = time.time()
+            for job in self._jobs.values():
+                if job.status == "queued":
+                    job.status = "cancelled"
+                    job.error = "Cancelled: the server is shutting down"
+                    job.finished_at = now
+        self._executor.shutdown(wait=wait, cancel_futures=True)
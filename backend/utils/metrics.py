@@ -0,0 +1,233 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+# --- Metric types ---
+class Counter:
+    kind = "counter"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str, labelnames: Iterable[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        if not self.registry.enabled:
+            return
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.labelnames, key)} {value:g}" for key, value in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any):
+        if not self.registry.enabled:
+            return
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: Any):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%g"' % bound
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """Value read at scrape time from a callback returning a number or a {labels: value} dict."""
+
+    kind = "gauge"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str, read: Callable[[], Any],
+                 labelnames: Iterable[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.read = read
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        try:
+            value = self.read()
+        except Exception as e:
+            logger.warning(f"[Metrics] Gauge {self.name} failed: {e}")
+            return []
+        if isinstance(value, dict):
+            return [f"{self.name}{_label_text(self.labelnames, key if isinstance(key, tuple) else (key,))} {v:g}"
+                    for key, v in sorted(value.items())]
+        return [f"{self.name} {value:g}"]
+
+
+# --- Registry ---
+class MetricsRegistry:
+    """
+    Process-wide metrics in Prometheus text exposition format.
+
+    When disabled every inc/observe returns before taking a lock, so
+    instrumented call sites cost a single attribute check.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: List[Any] = []
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        metric = Counter(self, name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(self, name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help: str, read: Callable[[], Any], labelnames: Iterable[str] = ()) -> Gauge:
+        metric = Gauge(self, name, help, read, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry(enabled=os.getenv("METRICS_ENABLED", "1") != "0")
+
+# --- Shared instruments ---
+llm_duration = metrics.histogram(
+    "llm_request_duration_seconds", "LLM call latency by call site.", ("site", "model", "outcome"))
+llm_prompt_chars = metrics.counter(
+    "llm_prompt_chars_total", "Characters sent to the LLM by call site.", ("site",))
+llm_completion_chars = metrics.counter(
+    "llm_completion_chars_total", "Characters received from the LLM by call site.", ("site",))
+llm_cache_hits = metrics.counter(
+    "llm_cache_hits_total", "LLM calls answered from the response cache.", ("site",))
+search_duration = metrics.histogram(
+    "search_request_duration_seconds", "Web search backend latency per attempt.", ("backend", "outcome"))
+search_retries = metrics.counter(
+    "search_retries_total", "Web search attempts retried after a transient error.", ("backend",))
+search_cache_hits = metrics.counter(
+    "search_cache_hits_total", "Web searches answered from the TTL cache.")
+http_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status"))
+
+
+def track_llm(site: str, model: str, prompt: Any, call: Callable[[], str]) -> str:
+    """Run one LLM call, recording its latency, outcome and prompt/completion sizes under `site`."""
+    if not metrics.enabled:
+        return call()
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        result = call()
+        outcome = "ok"
+        llm_completion_chars.inc(len(result or ""), site=site)
+        return result
+    finally:
+        llm_duration.observe(time.perf_counter() - start, site=site, model=model, outcome=outcome)
+        llm_prompt_chars.inc(len(str(prompt)), site=site)
+
+
+# --- HTTP middleware ---
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each HTTP request from arrival to the last body
+    chunk (so streamed responses count in full), labelled by route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            http_duration.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"],
+            )
@@ -0,0 +1,71 @@
+import re
+import difflib
+from typing import List, Optional, Tuple
+
+
+class PatchError(Exception):
+    """A hunk could not be located in the file it targets."""
+
+
+_BLOCK = re.compile(
+    r"<{5,}\s*SEARCH\s*\n(?P<search>.*?)\n?={5,}\s*\n(?P<replace>.*?)\n?>{5,}\s*REPLACE",
+    re.DOTALL,
+)
+
+FUZZY_THRESHOLD = 0.85
+
+
+def parse_search_replace(text: str) -> List[Tuple[str, str]]:
+    """Extract (search, replace) pairs from `<<<<<<< SEARCH / ======= / >>>>>>> REPLACE` blocks."""
+    return [(m.group("search"), m.group("replace")) for m in _BLOCK.finditer(text)]
+
+
+def _find_lines(lines: List[str], needle: List[str]) -> Optional[Tuple[int, int]]:
+    """
+    Locate `needle` in `lines` as whole lines: exactly, then ignoring
+    surrounding whitespace, then by fuzzy similarity. Returns the
+    (start, end) line slice or None; raises PatchError if it is ambiguous.
+    """
+    n = len(needle)
+    if n == 0 or n > len(lines):
+        return None
+    matches = [i for i in range(len(lines) - n + 1) if lines[i:i + n] == needle]
+    if not matches:
+        stripped = [l.strip() for l in needle]
+        matches = [i for i in range(len(lines) - n + 1) if [l.strip() for l in lines[i:i + n]] == stripped]
+    if len(matches) > 1:
+        raise PatchError(f"Hunk starting with {needle[0]!r} matches {len(matches)} places")
+    if matches:
+        return matches[0], matches[0] + n
+    best, best_ratio, tied = None, FUZZY_THRESHOLD, False
+    target = "\n".join(l.strip() for l in needle)
+    for i in range(len(lines) - n + 1):
+        ratio = difflib.SequenceMatcher(None, "\n".join(l.strip() for l in lines[i:i + n]), target).ratio()
+        if ratio > best_ratio:
+            best, best_ratio, tied = (i, i + n), ratio, False
+        elif best is not None and ratio == best_ratio:
+            tied = True
+    if tied:
+        raise PatchError(f"Hunk starting with {needle[0]!r} is equally close to several places")
+    return best
+
+
+def apply_search_replace(content: str, hunks: List[Tuple[str, str]]) -> str:
+    """
+    Apply hunks in order. A SEARCH section only ever matches whole lines, so
+    it cannot be spliced into the middle of a line; raises PatchError if any
+    search text cannot be found or matches more than one place in the file.
+    """
+    for search, replace in hunks:
+        if not search.strip():
+            # Empty search means "append"
+            content = content + ("" if content.endswith("\n") or not content else "\n") + replace + "\n"
+            continue
+        lines = content.split("\n")
+        span = _find_lines(lines, search.split("\n"))
+        if span is None:
+            raise PatchError(f"Could not find hunk starting with {search.splitlines()[0]!r}")
+        start, end = span
+        lines[start:end] = replace.split("\n")
+        content = "\n".join(lines)
+    return content
@@ -0,0 +1,135 @@
+import time
+import asyncio
+import logging
+import threading
+import functools
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, List, Optional
+from utils.tracing import span, trace_run
+
+logger = logging.getLogger(__name__)
+
+
+# --- Event channel for one agent run ---
+class RunEvents:
+    """
+    Append-only event log for one run that async subscribers can follow live.
+
+    Events are emitted from worker threads; each subscriber gets the backlog
+    first and then every new event through its own asyncio queue.
+    """
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.events: List[dict] = []
+        self.closed = False
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def emit(self, event_type: str, **data: Any) -> dict:
+        with self._lock:
+            event = {"seq": len(self.events), "ts": time.time(), "type": event_type, **data}
+            self.events.append(event)
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+        return event
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    async def subscribe(self) -> AsyncIterator[dict]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            backlog = list(self.events)
+            closed = self.closed
+            if not closed:
+                self._subscribers.append((loop, queue))
+        try:
+            for event in backlog:
+                yield event
+            if closed:
+                return
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            with self._lock:
+                if (loop, queue) in self._subscribers:
+                    self._subscribers.remove((loop, queue))
+
+
+# --- Registry of recent runs ---
+class RunEventRegistry:
+    def __init__(self, max_runs: int = 100):
+        self.max_runs = max_runs
+        self._runs: "OrderedDict[str, RunEvents]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, run_id: str) -> RunEvents:
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None:
+                run = self._runs[run_id] = RunEvents(run_id)
+                while len(self._runs) > self.max_runs:
+                    self._runs.popitem(last=False)
+            return run
+
+    def get(self, run_id: str) -> Optional[RunEvents]:
+        with self._lock:
+            return self._runs.get(run_id)
+
+
+run_events = RunEventRegistry()
+
+# The run whose graph is executing in the current context (None outside agent runs).
+current_run: ContextVar[Optional[RunEvents]] = ContextVar("current_run", default=None)
+
+
+@contextmanager
+def run_context(run: RunEvents):
+    token = current_run.set(run)
+    try:
+        with trace_run(run.run_id):
+            yield run
+    finally:
+        current_run.reset(token)
+
+
+def emit(event_type: str, **data: Any):
+    """Emit an event on the current run, if there is one."""
+    run = current_run.get()
+    if run is not None:
+        run.emit(event_type, **data)
+
+
+def node_events(fn: Callable) -> Callable:
+    """
+    Wrap a graph node so it reports node_start/node_finish (with timing) on
+    the current run and is traced as a span.
+    """
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        emit("node_start", node=name)
+        start = time.perf_counter()
+        try:
+            with span(name, "node"):
+                result = fn(*args, **kwargs)
+        except Exception as e:
+            emit("node_error", node=name, duration_ms=(time.perf_counter() - start) * 1000, error=str(e))
+            raise
+        emit("node_finish", node=name, duration_ms=(time.perf_counter() - start) * 1000)
+        return result
+
+    return wrapper
@@ -0,0 +1,200 @@
+import os
+import re
+import time
+import random
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from utils.metrics import search_cache_hits, search_duration, search_retries
+from utils.tracing import span
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class RetryableSearchError(Exception):
+    """A transient backend failure (timeout, connection reset, 429/5xx) worth retrying."""
+
+
+# --- Backends ---
+class TavilyBackend:
+    url = "https://api.tavily.com/search"
+
+    def __init__(self, api_key: Optional[str] = None, timeout: float = 30, pool_size: int = 8):
+        self.api_key = api_key
+        self.timeout = timeout
+        # One pooled session so repeated searches reuse the TLS connection
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+
+    def search(self, query: str, max_results: int) -> List[dict]:
+        payload = {
+            "api_key": self.api_key or os.getenv("TAVILY_API_KEY"),
+            "query": query,
+            "search_depth": "basic",
+            "include_answer": True,
+            "include_images": False,
+            "max_results": max_results
+        }
+        try:
+            resp = self.session.post(self.url, json=payload, timeout=self.timeout)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            raise RetryableSearchError(str(e)) from e
+        if resp.status_code == 429 or resp.status_code >= 500:
+            raise RetryableSearchError(f"Tavily returned HTTP {resp.status_code}")
+        resp.raise_for_status()
+        data = resp.json()
+        logger.debug(f"Tavily response: {data}")
+        return data.get("results", [])
+
+
+class StubSearchBackend:
+    """Deterministic offline backend for tests and benchmarks."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: List[str] = []
+
+    def search(self, query: str, max_results: int) -> List[dict]:
+        self.calls.append(query)
+        if self.latency:
+            time.sleep(self.latency)
+        slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")
+        return [
+            {
+                "title": f"Result {i + 1} for {query}",
+                "url": f"https://example.com/{slug}/{i + 1}",
+                "content": f"Stub content {i + 1} about {query}.",
+            }
+            for i in range(max_results)
+        ]
+
+
+# --- Helpers ---
+def split_queries(text: str) -> List[str]:
+    """Split an LLM-generated 'query, query, ...' (or one-per-line) list into distinct queries."""
+    queries = []
+    for part in re.split(r"[,\n]", text or ""):
+        query = re.sub(r"^\s*(\d+[.)]|[-*])\s*", "", part).strip().strip("\"'")
+        if query and query.lower() not in (q.lower() for q in queries):
+            queries.append(query)
+    return queries
+
+
+def dedupe_by_url(results: List[dict]) -> List[dict]:
+    seen = set()
+    unique = []
+    for res in results:
+        url = res.get("url")
+        if url and url in seen:
+            continue
+        seen.add(url)
+        unique.append(res)
+    return unique
+
+
+# --- Client ---
+class SearchClient:
+    """
+    Web search with per-query TTL caching, jittered exponential backoff on
+    transient errors and concurrent fan-out over several queries.
+    """
+
+    def __init__(self, backend, cache_ttl: float = 3600, max_cache_entries: int = 256,
+                 retries: int = 3, backoff: float = 1.0, max_workers: int = 4):
+        self.backend = backend
+        self.cache_ttl = cache_ttl
+        self.max_cache_entries = max_cache_entries
+        self.retries = retries
+        self.backoff = backoff
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search")
+
+    def _cached(self, key: tuple) -> Optional[List[dict]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[1] > self.cache_ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry[0]
+
+    def _store(self, key: tuple, results: List[dict]):
+        with self._lock:
+            self._cache[key] = (results, time.time())
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+
+    def search(self, query: str, max_results: int = 5) -> List[dict]:
+        with span("search", "search", query=query) as s:
+            results = self._search(query, max_results)
+            if s is not None:
+                s.args["results"] = len(results)
+            return results
+
+    def _search(self, query: str, max_results: int) -> List[dict]:
+        key = (query.strip().lower(), max_results)
+        cached = self._cached(key)
+        if cached is not None:
+            search_cache_hits.inc()
+            return cached
+        backend = type(self.backend).__name__
+        for attempt in range(self.retries):
+            start, outcome, delay = time.perf_counter(), "error", None
+            try:
+                results = self.backend.search(query, max_results)
+                outcome = "ok"
+                logger.info(f"Search returned {len(results)} results for {query!r}.")
+                self._store(key, results)
+                return results
+            except RetryableSearchError as e:
+                outcome = "retryable"
+                if attempt + 1 == self.retries:
+                    logger.error(f"Search failed after {self.retries} attempts: {e}")
+                    break
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning(f"Search error ({e}), retrying in {delay:.1f}s ({attempt + 1}/{self.retries})...")
+            except Exception as e:
+                logger.error(f"Search error: {e}")
+                break
+            finally:
+                search_duration.observe(time.perf_counter() - start, backend=backend, outcome=outcome)
+            search_retries.inc(backend=backend)
+            time.sleep(delay)
+        return []
+
+    def search_many(self, queries: List[str], max_results: int = 5) -> List[dict]:
+        """Run the queries concurrently and merge their results, dropping duplicate URLs."""
+        if len(queries) == 1:
+            return dedupe_by_url(self.search(queries[0], max_results))
+        # Each query runs in a copy of the caller's context so its span joins the caller's trace
+        futures = [self._executor.submit(contextvars.copy_context().run, self.search, q, max_results)
+                   for q in queries]
+        return dedupe_by_url([res for future in futures for res in future.result()])
+
+
+def search_client_from_env() -> SearchClient:
+    if os.getenv("SEARCH_BACKEND", "tavily").lower() == "stub":
+        backend = StubSearchBackend()
+    else:
+        backend = TavilyBackend()
+    return SearchClient(
+        backend,
+        cache_ttl=float(os.getenv("SEARCH_CACHE_TTL", "3600")),
+        max_workers=int(os.getenv("SEARCH_MAX_CONCURRENCY", "4")),
+    )
+
+
+search_client = search_client_from_env()
@@ -0,0 +1,126 @@
+import os
+import time
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") != "0"
+
+
+# --- Spans ---
+class Span:
+    __slots__ = ("name", "cat", "run_id", "span_id", "parent_id", "start_us", "dur_us", "tid", "thread", "args")
+
+    def __init__(self, name: str, cat: str, run_id: str, span_id: int, parent_id: Optional[int], args: Dict[str, Any]):
+        self.name = name
+        self.cat = cat
+        self.run_id = run_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_us = time.time_ns() // 1000
+        self.dur_us = 0
+        thread = threading.current_thread()
+        self.tid = thread.ident
+        self.thread = thread.name
+        self.args = args
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "cat": self.cat,
+            "run_id": self.run_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_us": self.start_us,
+            "dur_us": self.dur_us,
+            "thread": self.thread,
+            "args": self.args,
+        }
+
+
+# The run being traced and the innermost open span in this context. Both are
+# copied into LangGraph's node threads and our own pools with the context.
+current_trace: ContextVar[Optional[str]] = ContextVar("current_trace", default=None)
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Bounded ring buffer of finished spans from all runs; the oldest spans fall off first."""
+
+    def __init__(self, max_spans: int = 20000):
+        self._spans: deque = deque(maxlen=max_spans)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def record(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    def spans_for(self, run_id: str) -> List[Span]:
+        with self._lock:
+            return [s for s in self._spans if s.run_id == run_id]
+
+    def chrome_trace(self, run_id: str) -> dict:
+        """The run's spans in Chrome trace-event format (chrome://tracing, Perfetto, speedscope)."""
+        spans = sorted(self.spans_for(run_id), key=lambda s: s.start_us)
+        pid = os.getpid()
+        events = []
+        for tid, name in sorted({(s.tid, s.thread) for s in spans}):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        for s in spans:
+            events.append({
+                "name": s.name,
+                "cat": s.cat,
+                "ph": "X",
+                "ts": s.start_us,
+                "dur": s.dur_us,
+                "pid": pid,
+                "tid": s.tid,
+                "args": {**s.args, "span_id": s.span_id, "parent_id": s.parent_id},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"run_id": run_id}}
+
+
+tracer = Tracer(max_spans=int(os.getenv("TRACE_MAX_SPANS", "20000")))
+
+
+@contextmanager
+def trace_run(run_id: str) -> Iterator[None]:
+    """Attribute spans opened in this context to `run_id`."""
+    token = current_trace.set(run_id if TRACING_ENABLED else None)
+    try:
+        yield
+    finally:
+        current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, cat: str, **args: Any) -> Iterator[Optional[Span]]:
+    """
+    Time a block as a child of the current span. Outside a traced run this
+    yields None and records nothing; callers can add payload sizes to
+    `span.args` when they get a Span back.
+    """
+    run_id = current_trace.get()
+    if run_id is None:
+        yield None
+        return
+    parent = current_span.get()
+    s = Span(name, cat, run_id, tracer.next_id(), parent.span_id if parent else None, args)
+    token = current_span.set(s)
+    start = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s.args["error"] = str(e) or type(e).__name__
+        raise
+    finally:
+        s.dur_us = int((time.perf_counter() - start) * 1_000_000)
+        current_span.reset(token)
+        tracer.record(s)
@@ -0,0 +1,192 @@
+import os
+import difflib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from utils.file_ops import CODEBASE_DIR, atomic_write, resolve_line_edits
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class WorkspaceConflict(Exception):
+    """Files changed on disk after the overlay first read them; committing would overwrite those changes."""
+
+    def __init__(self, files: List[str]):
+        super().__init__(f"Changed on disk since the run read them: {', '.join(files)}")
+        self.files = files
+
+
+# --- Per-run overlay ---
+class WorkspaceOverlay:
+    """
+    In-memory view of the codebase for one agent run.
+
+    Reads fall through to disk until a file is touched; writes and deletes
+    stay in memory so later steps see earlier edits without disk I/O. The
+    whole change set is written in one batch by commit(), or dropped by
+    discard(). diff() previews the pending changes.
+    """
+
+    def __init__(self, root: str = CODEBASE_DIR):
+        self.root = os.path.abspath(root)
+        self._files: Dict[str, Optional[str]] = {}  # filename -> content, None = deleted
+        self._base: Dict[str, Optional[str]] = {}   # content on disk when first touched
+        self._lock = threading.RLock()
+
+    def _key(self, filename: str) -> str:
+        key = os.path.normpath(filename)
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise PermissionError(f"Access denied: {filename}")
+        return key
+
+    def _disk(self, key: str) -> Optional[str]:
+        path = os.path.join(self.root, key)
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _current(self, key: str) -> Optional[str]:
+        if key in self._files:
+            return self._files[key]
+        if key not in self._base:
+            self._base[key] = self._disk(key)
+        return self._base[key]
+
+    def _touch(self, key: str):
+        if key not in self._base:
+            self._base[key] = self._disk(key)
+
+    # --- File operations (same shapes as utils.file_ops) ---
+    def read_lines(self, filename: str) -> List[str]:
+        with span("read", "file", file=filename) as s, self._lock:
+            content = self._current(self._key(filename))
+            if s is not None:
+                s.args["bytes"] = len(content or "")
+        if content is None:
+            raise FileNotFoundError(filename)
+        return content.splitlines(keepends=True)
+
+    def write_lines(self, filename: str, lines: List[str]):
+        with span("write", "file", file=filename) as s, self._lock:
+            key = self._key(filename)
+            self._touch(key)
+            self._files[key] = "".join(lines)
+            if s is not None:
+                s.args["bytes"] = len(self._files[key])
+
+    def delete(self, filename: str):
+        with span("delete", "file", file=filename), self._lock:
+            key = self._key(filename)
+            self._touch(key)
+            self._files[key] = None
+
+    def apply_changes(self, filename: str, edits: List[dict]):
+        with span("apply_changes", "file", file=filename, edits=len(edits)), self._lock:
+            self.write_lines(filename, resolve_line_edits(self.read_lines(filename), edits))
+
+    def touched(self, filename: str) -> bool:
+        """Whether this run has written or deleted the file (so disk no longer reflects it)."""
+        with self._lock:
+            return self._key(filename) in self._files
+
+    # --- Pending change set ---
+    def pending(self) -> List[dict]:
+        with self._lock:
+            changes = []
+            for key, content in sorted(self._files.items()):
+                base = self._base.get(key)
+                if content == base:
+                    continue
+                status = "deleted" if content is None else "created" if base is None else "modified"
+                changes.append({"file": key, "status": status})
+            return changes
+
+    def diff(self) -> str:
+        """Unified diff of every pending change against what was on disk."""
+        with self._lock:
+            parts = []
+            for key, content in sorted(self._files.items()):
+                base = self._base.get(key)
+                if content == base:
+                    continue
+                parts.extend(difflib.unified_diff(
+                    (base or "").splitlines(keepends=True),
+                    (content or "").splitlines(keepends=True),
+                    fromfile="/dev/null" if base is None else f"a/{key}",
+                    tofile="/dev/null" if content is None else f"b/{key}",
+                ))
+            return "".join(line if line.endswith("\n") else line + "\n" for line in parts)
+
+    def conflicts(self) -> List[str]:
+        """Pending files whose disk content no longer matches what the overlay read."""
+        with self._lock:
+            conflicts = []
+            for change in self.pending():
+                key = change["file"]
+                try:
+                    changed = self._disk(key) != self._base.get(key)
+                except (OSError, UnicodeDecodeError):
+                    changed = True
+                if changed:
+                    conflicts.append(key)
+            return conflicts
+
+    def commit(self) -> List[dict]:
+        """
+        Write every pending change to disk and clear the overlay. Raises
+        WorkspaceConflict, without writing anything, if any of the files
+        changed on disk since the overlay read them.
+        """
+        with span("commit", "file") as s, self._lock:
+            changes = self.pending()
+            if s is not None:
+                s.args["files"] = len(changes)
+            conflicts = self.conflicts()
+            if conflicts:
+                raise WorkspaceConflict(conflicts)
+            for change in changes:
+                key = change["file"]
+                path = os.path.join(self.root, key)
+                if change["status"] == "deleted":
+                    if os.path.exists(path):
+                        os.remove(path)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    atomic_write(path, self._files[key])
+            logger.info(f"[Workspace] Committed {len(changes)} file change(s)")
+            self.discard()
+            return changes
+
+    def discard(self):
+        with self._lock:
+            self._files.clear()
+            self._base.clear()
+
+
+# --- Overlays kept for preview, keyed by run id ---
+class WorkspaceRegistry:
+    def __init__(self, max_pending: int = 50):
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[str, WorkspaceOverlay]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, run_id: str, workspace: WorkspaceOverlay):
+        with self._lock:
+            self._pending[run_id] = workspace
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+
+    def get(self, run_id: str) -> Optional[WorkspaceOverlay]:
+        with self._lock:
+            return self._pending.get(run_id)
+
+    def pop(self, run_id: str) -> Optional[WorkspaceOverlay]:
+        with self._lock:
+            return self._pending.pop(run_id, None)
+
+
+pending_workspaces = WorkspaceRegistry()
@@ -5,11 +5,20 @@ const API = axios.create({
   baseURL: "https://emkc.org/api/v2/piston",
 });
 
+// One chat session per browser tab so conversations are not shared between users
+export const CHAT_SESSION_ID =
+  sessionStorage.getItem("chatSessionId") ||
+  (() => {
+    const id = crypto.randomUUID();
+    sessionStorage.setItem("chatSessionId", id);
+    return id;
+  })();
+
 export async function sendMessageToBackend(message) {
   const response = await fetch("http://localhost:8000/chat", {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ message }),
+    body: JSON.stringify({ message, session_id: CHAT_SESSION_ID }),
   });
   const data = await response.json();
   console.log(data)
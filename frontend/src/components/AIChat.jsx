@@ -1,5 +1,5 @@
 import { useState, useRef, useEffect } from 'react';
-import { sendMessageToBackend } from '../api';
+import { sendMessageToBackend, CHAT_SESSION_ID } from '../api';
 
 export default function AIChat({ refreshFilesAndEditor }) {
   const [messages, setMessages] = useState([]);
@@ -15,7 +15,11 @@ export default function AIChat({ refreshFilesAndEditor }) {
   const handleReset = async () => {
     setResetting(true);
     try {
-      await fetch('http://localhost:8000/reset', { method: 'POST' });
+      await fetch('http://localhost:8000/reset', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ session_id: CHAT_SESSION_ID }),
+      });
       setMessages([]);
       setExecutedTaskIds([]); // Reset executed tasks on conversation reset
     } catch (err) {
@@ -36,6 +40,21 @@ export default function AIChat({ refreshFilesAndEditor }) {
     return task;
   };
 
+  // Poll a background agent run until it finishes
+  const waitForJob = async (jobId) => {
+    while (true) {
+      const res = await fetch(`http://localhost:8000/jobs/${jobId}/result`);
+      if (res.status !== 202) {
+        const job = await res.json();
+        if (!res.ok || job.status === "failed" || job.status === "cancelled") {
+          throw new Error(job.detail || job.error || "Task failed");
+        }
+        return job.result;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
   const handleExecuteWork = async (task) => {
     console.log("task",task);
     const taskWithId = ensureTaskId(task);
@@ -46,7 +65,11 @@ export default function AIChat({ refreshFilesAndEditor }) {
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ task: task }),
       });
-      const data = await response.json();
+      const queued = await response.json();
+      if (!response.ok || !queued.job_id) {
+        throw new Error(queued.detail || queued.error || "Task was not queued");
+      }
+      const data = await waitForJob(queued.job_id);
       setMessages((msgs) => [
         ...msgs,
         { sender: "system", text: "Task executed. Result: " + JSON.stringify(data) },
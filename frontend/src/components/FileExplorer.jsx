@@ -45,6 +45,18 @@ export default function FileExplorer({ onFileOpen, refreshKey }) {
     }
   }, [refreshKey, refetch]);
 
+  // Refresh when the backend reports changes on disk (agent edits, external editors)
+  useEffect(() => {
+    const ws = new WebSocket('ws://localhost:8000/ws/fs');
+    ws.onmessage = (event) => {
+      const data = JSON.parse(event.data);
+      if (data.type === 'fs_changes') {
+        refetch();
+      }
+    };
+    return () => ws.close();
+  }, [refetch]);
+
   // Pass this to FileNode so it can trigger a refresh after mutations
   function refreshTree() {
     refetch();